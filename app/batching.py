@@ -0,0 +1,63 @@
+# app/batching.py
+"""Several operations in one HTTP POST.
+
+A JSON array body is a batch. Its operations run concurrently with the
+request's one context, so they share a session and a set of DataLoaders:
+a lookup repeated across operations (the same `user(id)`, the same owner)
+is loaded once, and sibling lookups are batched into one query. The
+response is an array with one result per operation, in request order.
+
+An operation that can't be run at all (no query, a subscription, an entry
+that is not an object) gets a result carrying just the error; only
+batches over `MAX_BATCH_OPERATIONS` are refused as a whole.
+"""
+import os
+from typing import Optional
+
+from graphql import GraphQLError
+from strawberry.exceptions import MissingQueryError
+from strawberry.http import GraphQLRequestData
+from strawberry.schema.config import BatchingConfig
+from strawberry.schema.exceptions import CannotGetOperationTypeError, InvalidOperationTypeError
+from strawberry.types import ExecutionResult
+from strawberry.types.graphql import OperationType
+
+
+MAX_BATCH_OPERATIONS = int(os.environ.get("MAX_BATCH_OPERATIONS", "50"))
+
+batching_config: BatchingConfig = {"max_operations": MAX_BATCH_OPERATIONS}
+
+# a subscription's stream has no place in an array of results
+BATCHED_OPERATION_TYPES = {OperationType.QUERY, OperationType.MUTATION}
+
+# what `schema.execute` raises for an operation it refuses to run
+REFUSALS = (CannotGetOperationTypeError, InvalidOperationTypeError, MissingQueryError)
+
+# stands in for the query of a batch entry that is not a JSON object
+NOT_AN_OBJECT = object()
+
+
+def invalid_operation(request_data: GraphQLRequestData) -> Optional[str]:
+    """Why one batched operation can't be executed, if it can't."""
+    if request_data.query is NOT_AN_OBJECT:
+        return "Each batched operation must be a JSON object."
+    if not isinstance(request_data.query, (str, type(None))):
+        return "The GraphQL operation's `query` must be a string or null, if provided."
+    if not isinstance(request_data.variables, (dict, type(None))):
+        return "The GraphQL operation's `variables` must be an object or null, if provided."
+    if not isinstance(request_data.extensions, (dict, type(None))):
+        return "The GraphQL operation's `extensions` must be an object or null, if provided."
+    return None
+
+
+def failed(message: str) -> ExecutionResult:
+    return ExecutionResult(data=None, errors=[GraphQLError(message)])
+
+
+def refusal(error: Exception) -> str:
+    """The message for one of `REFUSALS`, worded as Strawberry words it for a single operation."""
+    if isinstance(error, InvalidOperationTypeError):
+        return f"{error.operation_type.value.capitalize()} operations can't be batched."
+    if isinstance(error, CannotGetOperationTypeError):
+        return error.as_http_error_reason()
+    return "No GraphQL query found in the request"
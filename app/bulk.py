@@ -0,0 +1,112 @@
+# app/bulk.py
+import os
+from enum import Enum
+from typing import Dict, Generic, List, Set, Tuple, TypeVar
+
+import strawberry
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.loaders import IN_CLAUSE_LIMIT
+from app.models import User, House, Garage, Car
+
+
+# rows per INSERT ... VALUES (...), (...) RETURNING statement
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", "500"))
+MAX_BULK_ROWS = 10_000
+
+# foreign keys checked before inserting: (column, referenced model, error message)
+REFERENCES = {
+    User: [],
+    House: [("owner_id", User, "Owner not found")],
+    Car: [("owner_id", User, "Owner not found"), ("garage_id", Garage, "Garage not found")],
+}
+
+T = TypeVar("T")
+
+
+# -----------------------
+# GraphQL types
+# -----------------------
+@strawberry.enum
+class BulkMode(Enum):
+    # nothing is written unless every row is valid
+    ALL_OR_NOTHING = "all_or_nothing"
+    # invalid rows are reported and skipped, every chunk commits on its own
+    PARTIAL = "partial"
+
+
+@strawberry.type
+class BulkError:
+    index: int
+    message: str
+
+
+@strawberry.type
+class BulkResult(Generic[T]):
+    created: List[T]
+    errors: List[BulkError]
+
+
+# -----------------------
+# Inserts
+# -----------------------
+def existing_ids(session: Session, model, ids: Set[int]) -> Set[int]:
+    found: Set[int] = set()
+    ids = list(ids)
+    for i in range(0, len(ids), IN_CLAUSE_LIMIT):
+        found.update(session.exec(select(model.id).where(model.id.in_(ids[i : i + IN_CLAUSE_LIMIT]))))
+    return found
+
+
+def invalid_references(session: Session, model, rows: List[dict]) -> Dict[int, str]:
+    """Map row index -> error for rows pointing at missing rows, one IN query per referenced table."""
+    errors: Dict[int, str] = {}
+    for column, target, message in REFERENCES[model]:
+        found = existing_ids(session, target, {row[column] for row in rows if row[column]})
+        for index, row in enumerate(rows):
+            if row[column] and row[column] not in found:
+                errors.setdefault(index, message)
+    return errors
+
+
+def _insert_chunk(session: Session, model, rows: List[dict]) -> List[Row]:
+    table = model.__table__
+    # one multi-row INSERT; SQLite hands out ascending ids in VALUES order,
+    # so sorting by id lines the returned rows up with the input
+    created = session.execute(insert(table).returning(*table.c), rows).all()
+    return sorted(created, key=lambda row: row.id)
+
+
+def bulk_insert(
+    session: Session, model, rows: List[dict], mode: BulkMode, chunk_size: int
+) -> Tuple[List[Row], List[BulkError]]:
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ROWS} rows per request")
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="'chunkSize' must be positive")
+
+    errors = invalid_references(session, model, rows)
+    if errors and mode is BulkMode.ALL_OR_NOTHING:
+        index = min(errors)
+        raise HTTPException(status_code=404, detail=f"Row {index}: {errors[index]}")
+
+    valid = [(index, row) for index, row in enumerate(rows) if index not in errors]
+    created: List[Row] = []
+    for i in range(0, len(valid), chunk_size):
+        chunk = valid[i : i + chunk_size]
+        try:
+            created += _insert_chunk(session, model, [row for _, row in chunk])
+            if mode is BulkMode.PARTIAL:
+                session.commit()
+        except IntegrityError:
+            session.rollback()
+            if mode is BulkMode.ALL_OR_NOTHING:
+                raise HTTPException(status_code=400, detail="Rows violate a database constraint")
+            errors.update((index, "Row violates a database constraint") for index, _ in chunk)
+    session.commit()
+
+    return created, [BulkError(index=index, message=errors[index]) for index in sorted(errors)]
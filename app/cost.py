@@ -0,0 +1,203 @@
+# app/cost.py
+"""Static cost analysis and depth limiting for incoming operations.
+
+The object types reference each other in cycles (user -> cars -> owner ->
+houses -> garages -> cars ...), so a single query can nest arbitrarily deep
+and multiply the rows touched at every list level. Before anything executes,
+the operation is walked once:
+
+- every field costs its weight (`FIELD_WEIGHTS`, else 1 for fields
+  returning objects and 0 for scalars, `MUTATION_WEIGHT` for mutations);
+- a list field multiplies the cost of its selection by its page size when
+  it takes `first`, else by its expected size (`LIST_SIZES`, else
+  `DEFAULT_LIST_SIZE`);
+- the depth is the number of nested selection sets.
+
+Operations over `MAX_QUERY_COST` or `MAX_QUERY_DEPTH` are answered with an
+error without resolving anything, and the figures are reported under
+`extensions.cost`.
+"""
+import os
+from typing import Dict, Iterator, Optional, Tuple
+
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    ExecutionResult as GraphQLExecutionResult,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLNamedType,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    get_named_type,
+    get_nullable_type,
+    value_from_ast_untyped,
+)
+from graphql.utilities import get_operation_ast
+from strawberry.extensions import SchemaExtension
+
+from app.pagination import DEFAULT_PAGE_SIZE
+
+
+MAX_QUERY_COST = int(os.environ.get("MAX_QUERY_COST", "50000"))
+MAX_QUERY_DEPTH = int(os.environ.get("MAX_QUERY_DEPTH", "10"))
+
+# rows expected from a list field without `first`
+DEFAULT_LIST_SIZE = 10
+# root lists return whole tables
+LIST_SIZES: Dict[str, int] = {
+    "Query.allUsers": 100,
+    "Query.allHouses": 100,
+    "Query.allGarages": 100,
+    "Query.allCars": 100,
+}
+
+# every root mutation field is at least a write plus a commit
+MUTATION_WEIGHT = 10
+# overrides, keyed by "Type.field" in GraphQL names
+FIELD_WEIGHTS: Dict[str, int] = {
+    "Mutation.createUsers": 100,
+    "Mutation.createHouses": 100,
+    "Mutation.createCars": 100,
+}
+
+
+class QueryCost:
+    """Computes cost and depth of one operation against a graphql-core schema."""
+
+    def __init__(self, schema, document, operation_name: Optional[str] = None, variables: Optional[dict] = None):
+        self.schema = schema
+        self.fragments: Dict[str, FragmentDefinitionNode] = {
+            d.name.value: d for d in document.definitions if isinstance(d, FragmentDefinitionNode)
+        }
+        self.operation: Optional[OperationDefinitionNode] = get_operation_ast(document, operation_name)
+        self.variables = variables or {}
+
+    def measure(self) -> Tuple[int, int]:
+        """Return (cost, depth) of the operation."""
+        if self.operation is None:
+            return 0, 0
+        root = self.schema.get_root_type(self.operation.operation)
+        return self._selection_set(root, self.operation.selection_set, page_size=None, visited=frozenset())
+
+    def _fields(
+        self, parent: GraphQLNamedType, selection_set: SelectionSetNode, visited: frozenset
+    ) -> Iterator[Tuple[GraphQLNamedType, FieldNode]]:
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield parent, selection
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition
+                target = self.schema.get_type(condition.name.value) if condition else parent
+                yield from self._fields(target, selection.selection_set, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                # validation rejects cycles; guard anyway so this never recurses forever
+                if fragment is None or name in visited:
+                    continue
+                target = self.schema.get_type(fragment.type_condition.name.value)
+                yield from self._fields(target, fragment.selection_set, visited | {name})
+
+    def _selection_set(
+        self, parent, selection_set: SelectionSetNode, page_size: Optional[int], visited: frozenset
+    ) -> Tuple[int, int]:
+        cost, depth = 0, 0
+        for parent_type, node in self._fields(parent, selection_set, visited):
+            field_cost, field_depth = self._field(parent_type, node, page_size, visited)
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth + 1
+
+    def _field(self, parent, node: FieldNode, page_size: Optional[int], visited: frozenset) -> Tuple[int, int]:
+        name = node.name.value
+        # introspection (GraphiQL's schema query) is neither charged nor limited
+        if name.startswith("__") or not isinstance(parent, GraphQLObjectType):
+            return 0, 0
+        field = parent.fields.get(name)
+        if field is None:
+            return 0, 0
+
+        key = f"{parent.name}.{name}"
+        named = get_named_type(field.type)
+        if key in FIELD_WEIGHTS:
+            weight = FIELD_WEIGHTS[key]
+        elif parent is self.schema.mutation_type:
+            weight = MUTATION_WEIGHT
+        else:
+            weight = 1 if isinstance(named, GraphQLObjectType) else 0
+        if node.selection_set is None:
+            return weight, 0
+
+        multiplier = 1
+        if isinstance(get_nullable_type(field.type), GraphQLList):
+            multiplier = page_size if page_size is not None else LIST_SIZES.get(key, DEFAULT_LIST_SIZE)
+            page_size = None
+        elif "first" in field.args:
+            # connection field: its `edges` list holds at most `first` rows
+            page_size = self._argument(node, "first")
+        else:
+            page_size = None
+
+        child_cost, child_depth = self._selection_set(named, node.selection_set, page_size, visited)
+        return weight + multiplier * child_cost, child_depth
+
+    def _argument(self, node: FieldNode, name: str) -> int:
+        for argument in node.arguments:
+            if argument.name.value == name:
+                value = value_from_ast_untyped(argument.value, self.variables)
+                if isinstance(value, int) and value >= 0:
+                    return value
+        return DEFAULT_PAGE_SIZE
+
+
+class CostLimiter(SchemaExtension):
+    """Rejects valid operations over the cost or depth budget before they execute."""
+
+    def __init__(
+        self, *, execution_context=None, max_cost: int = MAX_QUERY_COST, max_depth: int = MAX_QUERY_DEPTH
+    ):
+        self.max_cost = max_cost
+        self.max_depth = max_depth
+        self.cost: Optional[int] = None
+        self.depth: Optional[int] = None
+
+    def on_execute(self) -> Iterator[None]:
+        context = self.execution_context
+        self.cost, self.depth = QueryCost(
+            context.schema._schema, context.graphql_document, context.operation_name, context.variables
+        ).measure()
+        errors = []
+        if self.depth > self.max_depth:
+            errors.append(
+                GraphQLError(
+                    f"Query depth {self.depth} exceeds the maximum of {self.max_depth}",
+                    extensions={"code": "QUERY_TOO_DEEP"},
+                )
+            )
+        if self.cost > self.max_cost:
+            errors.append(
+                GraphQLError(
+                    f"Query cost {self.cost} exceeds the maximum of {self.max_cost}",
+                    extensions={"code": "QUERY_TOO_EXPENSIVE"},
+                )
+            )
+        if errors:
+            # a preset result makes strawberry skip execution entirely
+            context.result = GraphQLExecutionResult(data=None, errors=errors)
+        yield
+
+    def get_results(self) -> Dict[str, dict]:
+        if self.cost is None:
+            return {}
+        return {
+            "cost": {
+                "requested": self.cost,
+                "maximum": self.max_cost,
+                "depth": self.depth,
+                "maxDepth": self.max_depth,
+            }
+        }
@@ -0,0 +1,252 @@
+# app/db.py
+import asyncio
+import itertools
+import os
+import weakref
+from typing import AsyncIterator, Callable, Iterator, List, Tuple, TypeVar, Union
+
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.migrations import migrate
+
+
+# -----------------------
+# Settings
+# -----------------------
+sqlite_url = os.environ.get("DATABASE_URL", "sqlite:///./test_graphql.db")
+
+# "sync" runs resolvers' SQL on a blocking engine, "async" on aiosqlite
+DATABASE_MODE = os.environ.get("DATABASE_MODE", "sync")
+
+# Query operations read through a read-only engine of their own (see
+# `app.routing`): its own pool, and replicas once there are some.
+# READ_DATABASE_URLS is a comma-separated list, taken in turn per request;
+# unset, the writer's database is opened read-only
+READ_ROUTING = os.environ.get("READ_ROUTING", "1") == "1"
+READ_DATABASE_URLS = [url for url in os.environ.get("READ_DATABASE_URLS", "").split(",") if url]
+
+# connection pool, per engine
+POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.environ.get("DATABASE_POOL_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.environ.get("DATABASE_POOL_TIMEOUT", "30"))
+
+# applied to every new SQLite connection; WAL lets readers run while a
+# mutation holds the write lock instead of queueing behind it
+SQLITE_PRAGMAS = {
+    "foreign_keys": "ON",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # ms
+    "cache_size": -64000,  # KiB
+    "mmap_size": 256 * 1024 * 1024,  # bytes
+}
+
+# for read-only connections: no journal mode change (that is a write), and
+# a refusal of any write that gets through anyway
+READ_SQLITE_PRAGMAS = {**{k: v for k, v in SQLITE_PRAGMAS.items() if k != "journal_mode"}, "query_only": "ON"}
+
+T = TypeVar("T")
+
+
+def async_url(url: str) -> str:
+    """Point a plain `sqlite://` URL at the aiosqlite driver."""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://") :]
+    return url
+
+
+def is_memory(url: str) -> bool:
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def read_only_url(url: str) -> str:
+    """Open a SQLite database file as a `mode=ro` URI; other URLs are left to the server's permissions."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or is_memory(url):
+        return url
+    return parsed.set(database=f"file:{parsed.database}", query={"mode": "ro", "uri": "true"}).render_as_string()
+
+
+def _pragma_setter(pragmas: dict):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return set_pragmas
+
+
+set_sqlite_pragmas = _pragma_setter(SQLITE_PRAGMAS)
+set_read_sqlite_pragmas = _pragma_setter(READ_SQLITE_PRAGMAS)
+
+
+def make_engine(url: str = sqlite_url, mode: str = DATABASE_MODE, read_only: bool = False):
+    if read_only:
+        url = read_only_url(url)
+    options = {"echo": False}
+    if not is_memory(url):
+        options.update(pool_size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT)
+
+    if mode == "async":
+        engine = create_async_engine(async_url(url), **options)
+        sync_engine = engine.sync_engine
+    elif mode == "sync":
+        # sessions are opened and closed on different threads by FastAPI
+        engine = sync_engine = create_engine(url, connect_args={"check_same_thread": False}, **options)
+    else:
+        raise ValueError(f"Unknown DATABASE_MODE {mode!r}, expected 'sync' or 'async'")
+
+    if not is_memory(url) and sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", set_read_sqlite_pragmas if read_only else set_sqlite_pragmas)
+    return engine
+
+
+_engine = None
+
+
+def get_engine():
+    """The application's engine: the one given to `set_engine`, or else one built from the settings on first use."""
+    global _engine
+    if _engine is None:
+        _engine = make_engine()
+    return _engine
+
+
+def set_engine(new_engine):
+    """Point the application at `new_engine` (e.g. a per-worker test database); returns the previous one."""
+    global _engine
+    previous, _engine = _engine, new_engine
+    return previous
+
+
+# writer -> (its read engines, handing them out in turn)
+_read_engines: "weakref.WeakKeyDictionary[object, Tuple[List, Iterator]]" = weakref.WeakKeyDictionary()
+
+
+def get_read_engine(engine):
+    """The read-only engine for `engine`'s queries: the next of READ_DATABASE_URLS, or its database opened read-only.
+
+    Read engines are opened once per writer, in the writer's mode. An
+    in-memory database can't be opened a second time, so it is read through
+    `engine` itself.
+    """
+    read_engines = _read_engines.get(engine)
+    if read_engines is None:
+        if READ_DATABASE_URLS:
+            urls = READ_DATABASE_URLS
+        else:
+            url = engine.url
+            if url.get_backend_name() == "sqlite":
+                url = url.set(drivername="sqlite")  # make_engine picks the driver for `mode`
+            url = url.render_as_string(hide_password=False)
+            if is_memory(url):
+                return engine
+            urls = [url]
+        mode = "async" if isinstance(engine, AsyncEngine) else "sync"
+        engines = [make_engine(url, mode, read_only=True) for url in urls]
+        read_engines = _read_engines[engine] = (engines, itertools.cycle(engines))
+    return next(read_engines[1])
+
+
+def read_engines_of(engine) -> List:
+    """The read engines `get_read_engine` opened for `engine`, to dispose of them along with it."""
+    read_engines = _read_engines.get(engine)
+    return list(read_engines[0]) if read_engines else []
+
+
+def _create_and_migrate(conn) -> int:
+    SQLModel.metadata.create_all(conn)
+    return migrate(conn)
+
+
+async def init_db(engine=None) -> int:
+    """Create missing tables and bring existing ones up to the latest schema version."""
+    engine = engine or get_engine()
+    if isinstance(engine, AsyncEngine):
+        async with engine.begin() as conn:
+            return await conn.run_sync(_create_and_migrate)
+    with engine.begin() as conn:
+        return _create_and_migrate(conn)
+
+
+def new_session(engine=None) -> Union[Session, AsyncSession]:
+    engine = engine or get_engine()
+    if isinstance(engine, AsyncEngine):
+        return AsyncSession(engine)
+    return Session(engine)
+
+
+async def close_session(session: Union[Session, AsyncSession]):
+    """Roll back whatever the request left open and return the connection to the pool."""
+    if isinstance(session, AsyncSession):
+        await session.close()
+    else:
+        session.close()
+
+
+# -----------------------
+# FastAPI dependencies
+# -----------------------
+async def get_session(engine=Depends(get_engine)) -> AsyncIterator[Union[Session, AsyncSession]]:
+    session = new_session(engine)
+    try:
+        yield session
+    finally:
+        await close_session(session)
+
+
+async def get_read_session(engine=Depends(get_engine)) -> AsyncIterator[Union[Session, AsyncSession, None]]:
+    """A session on the read engine, or None with READ_ROUTING off; it only connects once a query reads."""
+    if not READ_ROUTING:
+        yield None
+        return
+    session = new_session(get_read_engine(engine))
+    try:
+        yield session
+    finally:
+        await close_session(session)
+
+
+# -----------------------
+# Request-scoped access
+# -----------------------
+class Database:
+    """Runs ORM code against one request's session, whichever mode it is in.
+
+    Data access is written once as plain functions taking a sync `Session`.
+    With an `AsyncSession` they run through `run_sync`, so SQL is awaited on
+    aiosqlite instead of blocking the event loop. Sibling resolvers still
+    run concurrently; only their turns on the shared session are serialized,
+    since a session can't be used by two tasks at once.
+    """
+
+    def __init__(self, session: Union[Session, AsyncSession]):
+        self.session = session
+        self._lock = asyncio.Lock()
+
+    @property
+    def sync_session(self) -> Session:
+        if isinstance(self.session, AsyncSession):
+            return self.session.sync_session
+        return self.session
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        if isinstance(self.session, AsyncSession):
+            async with self._lock:
+                return await self.session.run_sync(fn, *args, **kwargs)
+        return fn(self.session, *args, **kwargs)
+
+    async def release(self):
+        """End the session's transaction and return its connection; the session stays usable.
+
+        For long-lived contexts (a WebSocket connection), so they don't keep
+        a read snapshot open between uses.
+        """
+        async with self._lock:
+            await close_session(self.session)
@@ -0,0 +1,286 @@
+# app/eager.py
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import Session, select
+from strawberry.types import Info
+from strawberry.types.nodes import SelectedField
+from strawberry.utils.str_converters import to_camel_case
+
+from app.db import Database
+from app.entity_cache import snapshot_type
+from app.filters import NO_SPEC, Spec, apply
+from app.loaders import Loaders
+from app.models import User, House, Garage, Car, DriverLicence
+from app.pagination import page_statement
+from app.tracing import current_trace
+
+
+# list queries selecting no relationships read plain column tuples, see `lean_columns`
+LEAN_READS = os.environ.get("LEAN_READS", "1") == "1"
+
+# `user(id)` selections walking houses -> garages load the subtree with one JOIN, see `load_user_trees`
+TREE_READS = os.environ.get("TREE_READS", "1") == "1"
+
+# GraphQL field name -> relationship attribute, per model
+RELATIONSHIPS = {
+    User: {
+        "houses": User.houses,
+        "garages": User.garages,
+        "cars": User.cars,
+        "driverLicense": User.driver_license,
+    },
+    House: {"owner": House.owner, "garages": House.garages},
+    Garage: {"owner": Garage.owner, "house": Garage.house, "cars": Garage.cars},
+    Car: {"owner": Car.owner, "garage": Car.garage},
+    DriverLicence: {"owner": DriverLicence.owner},
+}
+
+# (model, relationship) -> loader keyed by the parent's id
+COLLECTION_LOADERS = {
+    (User, "houses"): "houses_by_owner",
+    (User, "garages"): "garages_by_owner",
+    (User, "cars"): "cars_by_owner",
+    (User, "driver_license"): "driver_licenses_by_user",
+    (House, "garages"): "garages_by_house",
+    (Garage, "cars"): "cars_by_garage",
+}
+
+# (model, relationship) -> count loader keyed by the parent's id
+COUNT_LOADERS = {
+    (User, "houses"): "house_counts_by_owner",
+    (User, "garages"): "garage_counts_by_owner",
+    (User, "cars"): "car_counts_by_owner",
+    (House, "garages"): "garage_counts_by_house",
+    (Garage, "cars"): "car_counts_by_garage",
+}
+
+# GraphQL field name -> column attribute, per model
+COLUMNS = {
+    model: {to_camel_case(column.key): column.key for column in model.__table__.columns}
+    for model in RELATIONSHIPS
+}
+
+# model -> loader keyed by the model's own id
+ROW_LOADERS = {User: "user_by_id", House: "house_by_id", Garage: "garage_by_id"}
+
+
+def _merge_selections(selections) -> Dict[str, list]:
+    """Group selected fields by name, looking through fragments and aliases."""
+    merged: Dict[str, list] = {}
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            merged.setdefault(selection.name, []).extend(selection.selections)
+        else:
+            for name, children in _merge_selections(selection.selections).items():
+                merged.setdefault(name, []).extend(children)
+    return merged
+
+
+def _filtered_names(selections) -> set:
+    """Names of fields selected with `where` or `orderBy` arguments, looking through fragments."""
+    names = set()
+    for selection in selections:
+        if isinstance(selection, SelectedField):
+            if selection.arguments.get("where") is not None or selection.arguments.get("orderBy") is not None:
+                names.add(selection.name)
+        else:
+            names |= _filtered_names(selection.selections)
+    return names
+
+
+def eager_options(model, selections) -> list:
+    """Turn the relationships requested below `model` into loader options."""
+    options = []
+    # filtered lists are resolved by the filtered loaders, not from the relationship
+    filtered = _filtered_names(selections)
+    for name, children in _merge_selections(selections).items():
+        attr = RELATIONSHIPS[model].get(name)
+        if attr is None or name in filtered:
+            continue
+        prop = attr.property
+        option = selectinload(attr) if prop.uselist else joinedload(attr)
+        nested = eager_options(prop.mapper.class_, children)
+        options.append(option.options(*nested) if nested else option)
+    return options
+
+
+def lean_columns(model, selections) -> Optional[List[str]]:
+    """Columns to select when no relationship has to be loaded with the rows, else None.
+
+    Such selections skip the ORM: only the requested columns (and the
+    primary key, which nested loaders and cursors key on) are fetched, as
+    plain row tuples that never enter the session's identity map.
+    """
+    if not LEAN_READS:
+        return None
+    merged = _merge_selections(selections)
+    filtered = _filtered_names(selections)
+    if any(name in RELATIONSHIPS[model] and name not in filtered for name in merged):
+        return None
+    columns = COLUMNS[model]
+    return ["id"] + [columns[name] for name in merged if name in columns and name != "id"]
+
+
+def prime_loaders(loaders: Loaders, rows: list):
+    """Seed the request's DataLoaders with everything eagerly loaded on `rows`."""
+    seen = set()
+    stack = list(rows)
+    while stack:
+        row = stack.pop()
+        if id(row) in seen:
+            continue
+        seen.add(id(row))
+        state = inspect(row)
+        model = state.class_
+        if model in ROW_LOADERS:
+            getattr(loaders, ROW_LOADERS[model]).prime(row.id, row)
+        for rel in state.mapper.relationships:
+            if rel.key in state.unloaded:
+                continue
+            value = getattr(row, rel.key)
+            children = sorted(value, key=lambda c: c.id) if rel.uselist else [c for c in [value] if c is not None]
+            loader_name = COLLECTION_LOADERS.get((model, rel.key))
+            if loader_name:
+                getattr(loaders, loader_name).prime(row.id, children)
+            # a loaded collection answers its count field for free
+            count_loader_name = COUNT_LOADERS.get((model, rel.key))
+            if count_loader_name:
+                getattr(loaders, count_loader_name).prime(row.id, len(children))
+            stack.extend(children)
+
+
+def _fetch_all(session: Session, statement) -> list:
+    return session.exec(statement).all()
+
+
+def _fetch_rows(session: Session, statement) -> list:
+    """Run a column select on the session's connection, bypassing the ORM."""
+    rows = session.connection().execute(statement).all()
+    trace = current_trace.get()
+    if trace is not None:  # no ORM load events to count them
+        trace.rows += len(rows)
+    return rows
+
+
+async def load_selected(info: Info, model, spec: Spec = NO_SPEC) -> List[object]:
+    """Load the rows of `model` matching `spec` together with the relationships the client selected.
+
+    Selections without relationships come back as row tuples of just the
+    selected columns (see `lean_columns`) instead of ORM instances.
+    """
+    db: Database = info.context["db"]
+    selections = info.selected_fields[0].selections
+    columns = lean_columns(model, selections)
+    if columns is not None:
+        # always ordered: with few columns SQLite may scan a covering index instead of the table
+        statement = apply(select(*(getattr(model, column) for column in columns)), model, spec)
+        return await db.run(_fetch_rows, statement)
+
+    statement = select(model).options(*eager_options(model, selections))
+    if spec != NO_SPEC:
+        statement = apply(statement, model, spec)
+    rows = await db.run(_fetch_all, statement)
+    prime_loaders(info.context["loaders"], rows)
+    return rows
+
+
+async def load_selected_page(info: Info, model, limit: int, after_id: int) -> List[object]:
+    """Like `load_selected`, for one keyset page of a connection field."""
+    db: Database = info.context["db"]
+    edges = _merge_selections(info.selected_fields[0].selections).get("edges", [])
+    nodes = _merge_selections(edges).get("node", [])
+    columns = lean_columns(model, nodes)
+    if columns is not None:
+        statement = page_statement(model, limit, after_id).with_only_columns(*(getattr(model, c) for c in columns))
+        return await db.run(_fetch_rows, statement)
+
+    statement = page_statement(model, limit, after_id).options(*eager_options(model, nodes))
+    rows = await db.run(_fetch_all, statement)
+    prime_loaders(info.context["loaders"], rows)
+    return rows
+
+
+# -----------------------
+# Ownership trees
+# -----------------------
+# levels below a user, each with the column joining it to the level above
+TREE = ((House, House.owner_id, "houses"), (Garage, Garage.house_id, "garages"), (Car, Car.garage_id, "cars"))
+TREE_LOADERS = (
+    ("houses_by_owner", "house_counts_by_owner", "house_by_id"),
+    ("garages_by_house", "garage_counts_by_house", "garage_by_id"),
+    ("cars_by_garage", "car_counts_by_garage", None),
+)
+
+
+def tree_depth(selections) -> int:
+    """How many levels of houses -> garages -> cars a user selection walks without filters."""
+    depth = 0
+    for _, _, name in TREE:
+        if name in _filtered_names(selections):
+            break
+        children = _merge_selections(selections).get(name)
+        if children is None:
+            break
+        depth, selections = depth + 1, children
+    return depth
+
+
+def tree_statement(user_ids: List[int], depth: int):
+    """One select of `depth` levels below `user_ids`, LEFT JOINed so childless parents are kept."""
+    models = [model for model, _, _ in TREE[:depth]]
+    statement = select(*(column for model in models for column in model.__table__.columns))
+    for (parent, _, _), (model, column, _) in zip(TREE, TREE[1:depth]):
+        statement = statement.outerjoin(model, column == parent.id)
+    return statement.where(House.owner_id.in_(user_ids)).order_by(*(model.id for model in models))
+
+
+def prime_tree(loaders: Loaders, user_ids: List[int], rows: list, depth: int):
+    """Split joined rows into per-level snapshots and prime the loaders, in one pass.
+
+    Children are gathered into per-parent lists held in dicts, so every row
+    costs a few dict lookups however wide the tree is. Rows are ordered by
+    id level by level, so each list comes out in id order like `load_by_fk`.
+    """
+    levels, start = [], 0
+    for model, column, _ in TREE[:depth]:
+        cls = snapshot_type(model)
+        levels.append((cls, start, start + len(cls._fields), cls._fields.index(column.key)))
+        start += len(cls._fields)
+
+    # children[level]: parent id -> nodes of that level; the last dict only marks leaves seen
+    children: List[Dict[int, list]] = [{id: [] for id in user_ids}] + [{} for _ in range(depth)]
+    for row in rows:
+        for level, (cls, lo, hi, parent_index) in enumerate(levels):
+            id = row[lo]
+            if id is None:  # LEFT JOIN padding: the parent has no children
+                break
+            if id not in children[level + 1]:
+                children[level + 1][id] = []
+                node = cls._make(row[lo:hi])
+                children[level][node[parent_index]].append(node)
+
+    for level, (list_loader, count_loader, row_loader) in enumerate(TREE_LOADERS[:depth]):
+        for parent_id, nodes in children[level].items():
+            getattr(loaders, list_loader).prime(parent_id, nodes)
+            getattr(loaders, count_loader).prime(parent_id, len(nodes))
+            if row_loader is not None:
+                for node in nodes:
+                    getattr(loaders, row_loader).prime(node.id, node)
+
+
+async def load_user_trees(info: Info, user_ids: List[int]):
+    """Load the houses -> garages -> cars selected below `user_ids` with one JOIN, into the loaders.
+
+    Without it each level is one more query (houses, then their garages,
+    then their cars); with it the nested resolvers find everything primed.
+    Selections reaching only `houses` are left to the loaders.
+    """
+    depth = tree_depth(info.selected_fields[0].selections) if TREE_READS else 0
+    if depth < 2:
+        return
+    db: Database = info.context["db"]
+    rows = await db.run(_fetch_rows, tree_statement(user_ids, depth))
+    prime_tree(info.context["loaders"], user_ids, rows, depth)
@@ -0,0 +1,143 @@
+# app/entity_cache.py
+"""Process-wide cache of rows looked up by primary key.
+
+Primary-key lookups (`Query.user`, every back-reference, the existence
+checks of each mutation) repeat across requests for the same few rows. The
+cache keeps an immutable snapshot per `(model, id)` — a named tuple of the
+column values, far smaller than a session-bound ORM instance — in a
+bounded LRU, and is read through by the primary-key loaders.
+
+Writes invalidate after they commit. A read may only fill the cache when no
+invalidation happened since its transaction began: SQLite readers keep the
+snapshot they started with, so a row read in an older transaction could
+otherwise be stored after the write that replaced it.
+
+The cache lives in one process; run with `ENTITY_CACHE_SIZE=0` when several
+processes write to the same database.
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+
+ENTITY_CACHE_SIZE = int(os.environ.get("ENTITY_CACHE_SIZE", "100000"))
+
+# session.info key holding the invalidation count seen when its transaction began
+TOKEN = "entity_cache_token"
+
+Key = Tuple[str, int]
+
+
+@lru_cache(maxsize=None)
+def snapshot_type(model):
+    """Named tuple with one field per column of `model`."""
+    return namedtuple(f"{model.__name__}Snapshot", [column.key for column in model.__table__.columns])
+
+
+def snapshot(model, row):
+    cls = snapshot_type(model)
+    return cls._make(getattr(row, name) for name in cls._fields)
+
+
+class EntityCache:
+    """Thread-safe LRU of row snapshots keyed by (table name, id)."""
+
+    def __init__(self, maxsize: int = ENTITY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # bumped by every invalidation; fills are refused once it has moved
+        self.invalidations = 0
+        self._entries: "OrderedDict[Key, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get_many(self, model, ids: Iterable[int]) -> Dict[int, tuple]:
+        table = model.__tablename__
+        found: Dict[int, tuple] = {}
+        with self._lock:
+            for id in ids:
+                entry = self._entries.get((table, id))
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end((table, id))
+                self.hits += 1
+                found[id] = entry
+        return found
+
+    def fill(self, model, snapshots: Iterable[tuple], token: Optional[int]):
+        """Store `snapshots`, read in a transaction that began after `token` invalidations."""
+        if not self.enabled:
+            return
+        table = model.__tablename__
+        with self._lock:
+            if token != self.invalidations:
+                return
+            for entry in snapshots:
+                self._entries[(table, entry.id)] = entry
+                self._entries.move_to_end((table, entry.id))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Key]):
+        with self._lock:
+            self.invalidations += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += 1
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+entity_cache = EntityCache()
+
+
+# -----------------------
+# Session hooks
+# -----------------------
+def watch(session: Session, cache: EntityCache = entity_cache):
+    """Record each transaction's starting token and invalidate rows its ORM flushes change.
+
+    Core `UPDATE ... RETURNING` writes invalidate explicitly, see
+    `app.writes.update_returning`.
+    """
+    changed: List[Key] = []
+
+    def on_begin(session, transaction, connection):
+        session.info[TOKEN] = cache.invalidations
+
+    def on_flush(session, flush_context):
+        for obj in (*session.dirty, *session.deleted):
+            changed.append((obj.__tablename__, obj.id))
+
+    def on_commit(session):
+        if changed:
+            cache.invalidate(changed)
+            changed.clear()
+
+    def on_rollback(session):
+        changed.clear()
+
+    event.listen(session, "after_begin", on_begin)
+    event.listen(session, "after_flush", on_flush)
+    event.listen(session, "after_commit", on_commit)
+    event.listen(session, "after_rollback", on_rollback)
+
@@ -0,0 +1,22 @@
+# app/execution.py
+from typing import Dict
+
+from strawberry.schema.schema import StrawberryGraphQLCoreExecutionContext
+
+
+class ExecutionContext(StrawberryGraphQLCoreExecutionContext):
+    """Execution context that keeps graphql-core's sub-selection memo sound.
+
+    graphql-core 3.3 memoizes `collect_subfields` by the `id()` of the field
+    details it is given. With async resolvers interleaving, some of those
+    objects are freed before the operation ends and their ids get reused, so
+    a field could be completed with another field's sub-selection. Holding a
+    reference to every field details object for the duration of the
+    operation keeps the ids unique.
+    """
+
+    def collect_subfields(self, return_type, field_details_list):
+        pinned: Dict[int, object] = self.__dict__.setdefault("_pinned_field_details", {})
+        for field_details in field_details_list:
+            pinned.setdefault(id(field_details), field_details)
+        return super().collect_subfields(return_type, field_details_list)
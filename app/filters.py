@@ -0,0 +1,216 @@
+# app/filters.py
+"""`where` / `orderBy` arguments of list fields, compiled into SQL.
+
+GraphQL inputs are first frozen into a `Spec` (plain tuples), which is
+hashable, so nested list fields can use it as part of a DataLoader key and
+batch every parent asking for the same filter into one query. `apply` then
+turns a spec into WHERE / ORDER BY clauses on a select.
+
+`startsWith` compiles to a range (`model >= 'Te' AND model < 'Tf'`) rather
+than `LIKE 'Te%'`: SQLite's LIKE is case-insensitive and cannot use the
+plain (BINARY) indexes on text columns, while the range can.
+"""
+from enum import Enum
+from typing import List, NamedTuple, Optional, Tuple
+
+import strawberry
+from sqlalchemy import false
+from strawberry.dataloader import DataLoader
+
+
+# -----------------------
+# Inputs
+# -----------------------
+@strawberry.input
+class IntFilter:
+    eq: Optional[int] = None
+    in_: Optional[List[int]] = strawberry.field(default=None, name="in")
+    gt: Optional[int] = None
+    gte: Optional[int] = None
+    lt: Optional[int] = None
+    lte: Optional[int] = None
+    is_null: Optional[bool] = None
+
+
+@strawberry.input
+class StringFilter:
+    eq: Optional[str] = None
+    in_: Optional[List[str]] = strawberry.field(default=None, name="in")
+    starts_with: Optional[str] = None
+
+
+@strawberry.input
+class UserWhere:
+    id: Optional[IntFilter] = None
+    email: Optional[StringFilter] = None
+    is_active: Optional[bool] = None
+
+
+@strawberry.input
+class HouseWhere:
+    id: Optional[IntFilter] = None
+    title: Optional[StringFilter] = None
+    owner_id: Optional[IntFilter] = None
+
+
+@strawberry.input
+class GarageWhere:
+    id: Optional[IntFilter] = None
+    title: Optional[StringFilter] = None
+    owner_id: Optional[IntFilter] = None
+    house_id: Optional[IntFilter] = None
+
+
+@strawberry.input
+class CarWhere:
+    id: Optional[IntFilter] = None
+    model: Optional[StringFilter] = None
+    owner_id: Optional[IntFilter] = None
+    garage_id: Optional[IntFilter] = None
+
+
+@strawberry.enum
+class SortDirection(Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+# enum values are model attribute names
+@strawberry.enum
+class UserOrderField(Enum):
+    ID = "id"
+    EMAIL = "email"
+    IS_ACTIVE = "is_active"
+
+
+@strawberry.enum
+class HouseOrderField(Enum):
+    ID = "id"
+    TITLE = "title"
+    OWNER_ID = "owner_id"
+
+
+@strawberry.enum
+class GarageOrderField(Enum):
+    ID = "id"
+    TITLE = "title"
+    OWNER_ID = "owner_id"
+    HOUSE_ID = "house_id"
+
+
+@strawberry.enum
+class CarOrderField(Enum):
+    ID = "id"
+    MODEL = "model"
+    OWNER_ID = "owner_id"
+    GARAGE_ID = "garage_id"
+
+
+@strawberry.input
+class UserOrder:
+    field: UserOrderField
+    direction: SortDirection = SortDirection.ASC
+
+
+@strawberry.input
+class HouseOrder:
+    field: HouseOrderField
+    direction: SortDirection = SortDirection.ASC
+
+
+@strawberry.input
+class GarageOrder:
+    field: GarageOrderField
+    direction: SortDirection = SortDirection.ASC
+
+
+@strawberry.input
+class CarOrder:
+    field: CarOrderField
+    direction: SortDirection = SortDirection.ASC
+
+
+# -----------------------
+# Specs
+# -----------------------
+class Spec(NamedTuple):
+    # (column, operator, value); values are tuples for `in`
+    conditions: Tuple[Tuple[str, str, object], ...] = ()
+    # (column, direction)
+    order: Tuple[Tuple[str, str], ...] = ()
+
+
+NO_SPEC = Spec()
+
+
+def freeze(where=None, order_by=None) -> Spec:
+    """Turn `where` / `orderBy` inputs into a hashable `Spec`."""
+    conditions = []
+    for column, value in vars(where).items() if where is not None else ():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            conditions.append((column, "eq", value))
+            continue
+        for operator, operand in vars(value).items():
+            if operand is not None:
+                conditions.append((column, operator, tuple(operand) if isinstance(operand, list) else operand))
+    order = tuple((item.field.value, item.direction.value) for item in order_by or ())
+    return Spec(tuple(conditions), order)
+
+
+# -----------------------
+# Compilation
+# -----------------------
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string above every string starting with `prefix`, if there is one."""
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            # surrogates can't be encoded for the database; the next code point is U+E000
+            following = 0xE000 if last == 0xD7FF else last + 1
+            return prefix[:-1] + chr(following)
+        prefix = prefix[:-1]
+    return None
+
+
+def condition(model, column: str, operator: str, value):
+    attr = getattr(model, column)
+    if operator == "eq":
+        return attr == value
+    if operator == "in_":
+        return attr.in_(value) if value else false()
+    if operator == "gt":
+        return attr > value
+    if operator == "gte":
+        return attr >= value
+    if operator == "lt":
+        return attr < value
+    if operator == "lte":
+        return attr <= value
+    if operator == "is_null":
+        return attr.is_(None) if value else attr.is_not(None)
+    if operator == "starts_with":
+        upper = prefix_upper_bound(value)
+        return attr >= value if upper is None else (attr >= value) & (attr < upper)
+    raise ValueError(f"Unknown filter operator {operator!r}")
+
+
+def apply(statement, model, spec: Spec):
+    """Add `spec`'s conditions and ordering to `statement`; ties are broken by primary key."""
+    statement = statement.where(*(condition(model, *c) for c in spec.conditions))
+    order = [getattr(getattr(model, column), direction)() for column, direction in spec.order]
+    if not any(column == "id" for column, _ in spec.order):
+        order.append(model.id.asc())
+    return statement.order_by(*order)
+
+
+# -----------------------
+# Nested lists
+# -----------------------
+async def load_list(loader: DataLoader, filtered_loader: DataLoader, parent_id: int, where=None, order_by=None) -> list:
+    """Resolve a nested list field: unfiltered through `loader`, else through its `filtered_*` loader."""
+    spec = freeze(where, order_by)
+    if spec == NO_SPEC:
+        return await loader.load(parent_id)
+    return await filtered_loader.load((parent_id, spec))
@@ -0,0 +1,224 @@
+# app/loaders.py
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+from strawberry.dataloader import DataLoader
+
+from app.db import Database
+from app.entity_cache import TOKEN, EntityCache, entity_cache, snapshot
+from app.filters import Spec, apply
+from app.models import User, House, Garage, Car, DriverLicence
+
+
+# SQLite refuses statements with more than 32766 bound parameters,
+# so very large batches are split into several IN (...) queries.
+IN_CLAUSE_LIMIT = 10_000
+
+
+def _chunks(keys: List[int]):
+    for i in range(0, len(keys), IN_CLAUSE_LIMIT):
+        yield keys[i : i + IN_CLAUSE_LIMIT]
+
+
+# -----------------------
+# Batch functions
+# -----------------------
+def load_by_pk(session: Session, model, keys: List[int]) -> List[Optional[object]]:
+    """Fetch rows of `model` by primary key, one row (or None) per key."""
+    rows: Dict[int, object] = {}
+    for chunk in _chunks(list(set(keys))):
+        for row in session.exec(select(model).where(model.id.in_(chunk))):
+            rows[row.id] = row
+    return [rows.get(key) for key in keys]
+
+
+def load_by_pk_cached(
+    session: Session, model, keys: List[int], cache: EntityCache = entity_cache
+) -> List[Optional[tuple]]:
+    """`load_by_pk` reading through the entity cache: only ids it lacks go to the database."""
+    found = cache.get_many(model, keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        snapshots = [snapshot(model, row) for row in load_by_pk(session, model, missing) if row is not None]
+        cache.fill(model, snapshots, session.info.get(TOKEN))
+        found.update((entry.id, entry) for entry in snapshots)
+    return [found.get(key) for key in keys]
+
+
+def load_by_fk(session: Session, model, column, keys: List[int]) -> List[List[object]]:
+    """Fetch rows of `model` grouped by a foreign key column, one list per key."""
+    groups: Dict[int, List[object]] = defaultdict(list)
+    for chunk in _chunks(list(set(keys))):
+        statement = select(model).where(column.in_(chunk)).order_by(model.id)
+        for row in session.exec(statement):
+            groups[getattr(row, column.key)].append(row)
+    return [groups.get(key, []) for key in keys]
+
+
+def load_filtered_by_fk(session: Session, model, column, keys: List[Tuple[int, Spec]]) -> List[List[object]]:
+    """Fetch rows of `model` per `(parent id, spec)` key, filtered and ordered by the spec.
+
+    Parents asking for the same spec (every parent of a list selecting the
+    same `where` / `orderBy`) share one query.
+    """
+    groups: Dict[Tuple[int, Spec], List[object]] = defaultdict(list)
+    parents_by_spec: Dict[Spec, set] = defaultdict(set)
+    for parent_id, spec in keys:
+        parents_by_spec[spec].add(parent_id)
+
+    for spec, parent_ids in parents_by_spec.items():
+        for chunk in _chunks(list(parent_ids)):
+            for row in session.exec(apply(select(model).where(column.in_(chunk)), model, spec)):
+                groups[(getattr(row, column.key), spec)].append(row)
+    return [groups.get(key, []) for key in keys]
+
+
+def count_by_fk(session: Session, column, keys: List[int]) -> List[int]:
+    """Count rows per foreign key with one `COUNT ... GROUP BY` query per chunk of keys."""
+    counts: Dict[int, int] = {}
+    for chunk in _chunks(list(set(keys))):
+        statement = select(column, func.count()).where(column.in_(chunk)).group_by(column)
+        counts.update(session.exec(statement).all())
+    return [counts.get(key, 0) for key in keys]
+
+
+# totals behind `Query.stats`, by name
+STATS = {
+    "users": select(func.count()).select_from(User),
+    "active_users": select(func.count()).select_from(User).where(User.is_active),
+    "houses": select(func.count()).select_from(House),
+    "garages": select(func.count()).select_from(Garage),
+    "cars": select(func.count()).select_from(Car),
+    "parked_cars": select(func.count()).select_from(Car).where(Car.garage_id.is_not(None)),
+    "driver_licences": select(func.count()).select_from(DriverLicence),
+}
+
+
+def load_stats(session: Session, names: List[str]) -> List[int]:
+    """Compute the requested `STATS` in one statement, as scalar subqueries of a single SELECT."""
+    # `execute`, not `exec`: with one name `exec` would return a bare scalar
+    row = session.execute(select(*(STATS[name].scalar_subquery() for name in names))).one()
+    return list(row)
+
+
+def load_pages_by_fk(session: Session, model, column, keys: List[Tuple[int, int, int]]) -> List[List[object]]:
+    """Fetch one keyset page per `(parent id, limit, after id)` key.
+
+    Keys sharing the same page arguments (the usual case: every parent in a
+    list asks for the same `first`/`after`) are served by one query that
+    numbers rows per parent with ROW_NUMBER() and keeps the first `limit`.
+    """
+    pages: Dict[Tuple[int, int, int], List[object]] = defaultdict(list)
+    parents_by_args: Dict[Tuple[int, int], set] = defaultdict(set)
+    for parent_id, limit, after_id in keys:
+        parents_by_args[(limit, after_id)].add(parent_id)
+
+    for (limit, after_id), parent_ids in parents_by_args.items():
+        for chunk in _chunks(list(parent_ids)):
+            position = func.row_number().over(partition_by=column, order_by=model.id).label("position")
+            numbered = select(model, position).where(column.in_(chunk), model.id > after_id).subquery()
+            row = aliased(model, numbered)
+            statement = select(row).where(numbered.c.position <= limit).order_by(numbered.c.id)
+            for r in session.exec(statement):
+                pages[(getattr(r, column.key), limit, after_id)].append(r)
+    return [pages.get(key, []) for key in keys]
+
+
+# -----------------------
+# Per-request loaders
+# -----------------------
+class Loaders:
+    """DataLoaders for one request, sharing the request's database session.
+
+    Sibling lookups issued in the same tick (e.g. `houses` of every user in
+    `allUsers`) are gathered into a single `WHERE ... IN (...)` query.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+
+        # by primary key
+        self.user_by_id = self._pk_loader(User)
+        self.house_by_id = self._pk_loader(House)
+        self.garage_by_id = self._pk_loader(Garage)
+
+        # by foreign key
+        self.houses_by_owner = self._fk_loader(House, House.owner_id)
+        self.garages_by_owner = self._fk_loader(Garage, Garage.owner_id)
+        self.garages_by_house = self._fk_loader(Garage, Garage.house_id)
+        self.cars_by_owner = self._fk_loader(Car, Car.owner_id)
+        self.cars_by_garage = self._fk_loader(Car, Car.garage_id)
+        self.driver_licenses_by_user = self._fk_loader(DriverLicence, DriverLicence.user_id)
+
+        # by foreign key, filtered and ordered; keyed by (parent id, spec)
+        self.filtered_houses_by_owner = self._filtered_loader(House, House.owner_id)
+        self.filtered_garages_by_owner = self._filtered_loader(Garage, Garage.owner_id)
+        self.filtered_garages_by_house = self._filtered_loader(Garage, Garage.house_id)
+        self.filtered_cars_by_owner = self._filtered_loader(Car, Car.owner_id)
+        self.filtered_cars_by_garage = self._filtered_loader(Car, Car.garage_id)
+
+        # row counts by foreign key
+        self.house_counts_by_owner = self._count_loader(House.owner_id)
+        self.garage_counts_by_owner = self._count_loader(Garage.owner_id)
+        self.garage_counts_by_house = self._count_loader(Garage.house_id)
+        self.car_counts_by_owner = self._count_loader(Car.owner_id)
+        self.car_counts_by_garage = self._count_loader(Car.garage_id)
+
+        # table-wide totals, keyed by `STATS` name
+        self.stats = DataLoader(load_fn=self._load_stats)
+
+        # keyset pages by foreign key, keyed by (parent id, limit, after id)
+        self.house_pages_by_owner = self._page_loader(House, House.owner_id)
+        self.garage_pages_by_owner = self._page_loader(Garage, Garage.owner_id)
+        self.garage_pages_by_house = self._page_loader(Garage, Garage.house_id)
+        self.car_pages_by_owner = self._page_loader(Car, Car.owner_id)
+        self.car_pages_by_garage = self._page_loader(Car, Car.garage_id)
+
+        # results are only valid until the session writes something
+        event.listen(db.sync_session, "after_commit", self._on_commit)
+
+    def _pk_loader(self, model) -> DataLoader:
+        async def load(keys: List[int]):
+            if entity_cache.enabled:
+                return await self.db.run(load_by_pk_cached, model, keys)
+            return await self.db.run(load_by_pk, model, keys)
+
+        return DataLoader(load_fn=load)
+
+    def _fk_loader(self, model, column) -> DataLoader:
+        async def load(keys: List[int]):
+            return await self.db.run(load_by_fk, model, column, keys)
+
+        return DataLoader(load_fn=load)
+
+    def _filtered_loader(self, model, column) -> DataLoader:
+        async def load(keys: List[Tuple[int, Spec]]):
+            return await self.db.run(load_filtered_by_fk, model, column, keys)
+
+        return DataLoader(load_fn=load)
+
+    def _count_loader(self, column) -> DataLoader:
+        async def load(keys: List[int]):
+            return await self.db.run(count_by_fk, column, keys)
+
+        return DataLoader(load_fn=load)
+
+    async def _load_stats(self, names: List[str]) -> List[int]:
+        return await self.db.run(load_stats, names)
+
+    def _page_loader(self, model, column) -> DataLoader:
+        async def load(keys: List[Tuple[int, int, int]]):
+            return await self.db.run(load_pages_by_fk, model, column, keys)
+
+        return DataLoader(load_fn=load)
+
+    def _on_commit(self, session: Session):
+        self.clear_all()
+
+    def clear_all(self):
+        for loader in vars(self).values():
+            if isinstance(loader, DataLoader):
+                loader.clear_all()
@@ -1,202 +1,325 @@
 # app/main.py
-from typing import List, Optional
+import asyncio
+import dataclasses
+from contextlib import asynccontextmanager
+from functools import cache
+from typing import AsyncGenerator, AsyncIterator, List, Optional, Union
+import orjson
 import strawberry
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
 from strawberry.fastapi import GraphQLRouter
-from sqlmodel import SQLModel, Field, Relationship, create_engine, Session, select
+from strawberry.http.exceptions import WebSocketDisconnected
+from strawberry.schema.config import StrawberryConfig
+from starlette.requests import HTTPConnection
+from starlette.websockets import WebSocketDisconnect
+from strawberry.asgi import ASGIWebSocketAdapter
+from strawberry.types import Info
+from sqlalchemy.engine import Row
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import pubsub, write_queue, writes
+from app.batching import (
+    BATCHED_OPERATION_TYPES,
+    NOT_AN_OBJECT,
+    REFUSALS,
+    batching_config,
+    failed,
+    invalid_operation,
+    refusal,
+)
+from app.bulk import BULK_CHUNK_SIZE, BulkMode, BulkResult, bulk_insert
+from app.cost import CostLimiter
+from app.db import Database, get_engine, get_read_session, get_session, init_db
+from app.eager import load_selected, load_selected_page, load_user_trees
+from app.entity_cache import watch
+from app.execution import ExecutionContext
+from app.filters import (
+    CarOrder,
+    CarWhere,
+    GarageOrder,
+    GarageWhere,
+    HouseOrder,
+    HouseWhere,
+    UserOrder,
+    UserWhere,
+    freeze,
+    load_list,
+)
+from app.loaders import Loaders
+from app.metrics import registry
+from app.models import User, House, Garage, Car
+from app.pagination import Connection, build_connection, decode_cursor, load_connection, page_size
+from app.persisted_queries import PersistedQueries
+from app.response_cache import ResponseCaching, response_cache, track_writes
+from app.routing import READER, ReadRouting
+from app.tracing import DEBUG_HEADER, Tracing, instrument
 
 
 # -----------------------
-# DB models (SQLModel)
-# -----------------------
-class User(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    email: str
-    is_active: bool = True
-
-    houses: List["House"] = Relationship(back_populates="owner")
-    garages: List["Garage"] = Relationship(back_populates="owner")
-    cars: List["Car"] = Relationship(back_populates="owner")
-    driver_license: Optional["DriverLicence"] = Relationship(
-        back_populates="owner", sa_relationship_kwargs={"uselist": False}
-    )
-
-
-class House(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    title: str
-    owner_id: Optional[int] = Field(default=None, foreign_key="user.id")
-
-    owner: Optional[User] = Relationship(back_populates="houses")
-    garages: List["Garage"] = Relationship(back_populates="house")
-
-
-class Garage(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    title: str
-    owner_id: Optional[int] = Field(default=None, foreign_key="user.id")
-    house_id: Optional[int] = Field(default=None, foreign_key="house.id")
-
-    owner: Optional[User] = Relationship(back_populates="garages")
-    house: Optional[House] = Relationship(back_populates="garages")
-    cars: List["Car"] = Relationship(back_populates="garage")
-
-
-class Car(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    model: str
-    owner_id: Optional[int] = Field(default=None, foreign_key="user.id")
-    garage_id: Optional[int] = Field(default=None, foreign_key="garage.id")
-
-    owner: Optional[User] = Relationship(back_populates="cars")
-    garage: Optional[Garage] = Relationship(back_populates="cars")
-
-
-class DriverLicence(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    number: str
-    user_id: int = Field(foreign_key="user.id")
-
-    owner: Optional[User] = Relationship(back_populates="driver_license")
-
-
-# -----------------------
-# DB setup
+# GraphQL types (Strawberry)
 # -----------------------
-sqlite_url = "sqlite:///./test_graphql.db"
-engine = create_engine(sqlite_url, echo=False)
-
-
-def init_db():
-    SQLModel.metadata.create_all(engine)
+class RowType:
+    """Base for types mirroring a SQLModel table.
+
+    Every init field (exposed or `strawberry.Private`) is read off the row by
+    name, so foreign keys travel with the object and back-references can go
+    straight to the target row. Rows from the lean read path only carry the
+    selected columns; fields nobody selected are left as None. Column
+    mappings (decoded change events) are read the same way.
+    """
+
+    @classmethod
+    @cache
+    def _row_fields(cls) -> tuple:
+        return tuple(f.name for f in dataclasses.fields(cls) if f.init)
+
+    @classmethod
+    def from_row(cls, row):
+        if isinstance(row, Row):
+            row = row._asdict()
+        if isinstance(row, dict):
+            return cls(**{name: row.get(name) for name in cls._row_fields()})
+        return cls(**{name: getattr(row, name) for name in cls._row_fields()})
+
+    @classmethod
+    def from_rows(cls, rows) -> list:
+        return [cls.from_row(row) for row in rows]
 
 
-# -----------------------
-# GraphQL types (Strawberry)
-# -----------------------
 @strawberry.type
-class DriverLicenceType:
+class DriverLicenceType(RowType):
     id: int
     number: str
+    user_id: strawberry.Private[int]
 
     @strawberry.field
-    def owner(self, info) -> Optional["UserType"]:
-        session: Session = info.context["session"]
-        dl = session.get(DriverLicence, self.id)
-        if not dl:
-            return None
-        u = session.get(User, dl.user_id)
-        if not u:
-            return None
-        return UserType(id=u.id, email=u.email, is_active=u.is_active)
+    async def owner(self, info: Info) -> Optional["UserType"]:
+        loaders: Loaders = info.context["loaders"]
+        u = await loaders.user_by_id.load(self.user_id)
+        return UserType.from_row(u) if u else None
 
 
 @strawberry.type
-class CarType:
+class CarType(RowType):
     id: int
     model: str
+    owner_id: strawberry.Private[Optional[int]]
+    garage_id: strawberry.Private[Optional[int]]
 
     @strawberry.field
-    def owner(self, info) -> Optional["UserType"]:
-        session: Session = info.context["session"]
-        c = session.get(Car, self.id)
-        if not c or not c.owner_id:
+    async def owner(self, info: Info) -> Optional["UserType"]:
+        if not self.owner_id:
             return None
-        u = session.get(User, c.owner_id)
-        return UserType(id=u.id, email=u.email, is_active=u.is_active)
+        loaders: Loaders = info.context["loaders"]
+        u = await loaders.user_by_id.load(self.owner_id)
+        return UserType.from_row(u) if u else None
 
     @strawberry.field
-    def garage(self, info) -> Optional["GarageType"]:
-        session: Session = info.context["session"]
-        c = session.get(Car, self.id)
-        if not c or not c.garage_id:
+    async def garage(self, info: Info) -> Optional["GarageType"]:
+        if not self.garage_id:
             return None
-        g = session.get(Garage, c.garage_id)
-        return GarageType(id=g.id, title=g.title)
+        loaders: Loaders = info.context["loaders"]
+        g = await loaders.garage_by_id.load(self.garage_id)
+        return GarageType.from_row(g) if g else None
 
 
 @strawberry.type
-class GarageType:
+class GarageType(RowType):
     id: int
     title: str
+    owner_id: strawberry.Private[Optional[int]]
+    house_id: strawberry.Private[Optional[int]]
 
     @strawberry.field
-    def owner(self, info) -> Optional["UserType"]:
-        session: Session = info.context["session"]
-        g = session.get(Garage, self.id)
-        if not g or not g.owner_id:
+    async def owner(self, info: Info) -> Optional["UserType"]:
+        if not self.owner_id:
             return None
-        u = session.get(User, g.owner_id)
-        return UserType(id=u.id, email=u.email, is_active=u.is_active)
+        loaders: Loaders = info.context["loaders"]
+        u = await loaders.user_by_id.load(self.owner_id)
+        return UserType.from_row(u) if u else None
 
     @strawberry.field
-    def house(self, info) -> Optional["HouseType"]:
-        session: Session = info.context["session"]
-        g = session.get(Garage, self.id)
-        if not g or not g.house_id:
+    async def house(self, info: Info) -> Optional["HouseType"]:
+        if not self.house_id:
             return None
-        h = session.get(House, g.house_id)
-        return HouseType(id=h.id, title=h.title)
+        loaders: Loaders = info.context["loaders"]
+        h = await loaders.house_by_id.load(self.house_id)
+        return HouseType.from_row(h) if h else None
 
     @strawberry.field
-    def cars(self, info) -> List[CarType]:
-        session: Session = info.context["session"]
-        cars = session.exec(select(Car).where(Car.garage_id == self.id)).all()
-        return [CarType(id=c.id, model=c.model) for c in cars]
+    async def cars(
+        self, info: Info, where: Optional[CarWhere] = None, order_by: Optional[List[CarOrder]] = None
+    ) -> List[CarType]:
+        loaders: Loaders = info.context["loaders"]
+        rows = await load_list(loaders.cars_by_garage, loaders.filtered_cars_by_garage, self.id, where, order_by)
+        return CarType.from_rows(rows)
+
+    @strawberry.field
+    async def car_count(self, info: Info) -> int:
+        loaders: Loaders = info.context["loaders"]
+        return await loaders.car_counts_by_garage.load(self.id)
+
+    @strawberry.field
+    async def cars_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[CarType]:
+        loaders: Loaders = info.context["loaders"]
+        return await load_connection(loaders.car_pages_by_garage, self.id, first, after, CarType.from_row)
 
 
 @strawberry.type
-class HouseType:
+class HouseType(RowType):
     id: int
     title: str
+    owner_id: strawberry.Private[Optional[int]]
 
     @strawberry.field
-    def owner(self, info) -> Optional["UserType"]:
-        session: Session = info.context["session"]
-        h = session.get(House, self.id)
-        if not h or not h.owner_id:
+    async def owner(self, info: Info) -> Optional["UserType"]:
+        if not self.owner_id:
             return None
-        u = session.get(User, h.owner_id)
-        return UserType(id=u.id, email=u.email, is_active=u.is_active)
+        loaders: Loaders = info.context["loaders"]
+        u = await loaders.user_by_id.load(self.owner_id)
+        return UserType.from_row(u) if u else None
+
+    @strawberry.field
+    async def garages(
+        self, info: Info, where: Optional[GarageWhere] = None, order_by: Optional[List[GarageOrder]] = None
+    ) -> List[GarageType]:
+        loaders: Loaders = info.context["loaders"]
+        rows = await load_list(loaders.garages_by_house, loaders.filtered_garages_by_house, self.id, where, order_by)
+        return GarageType.from_rows(rows)
 
     @strawberry.field
-    def garages(self, info) -> List[GarageType]:
-        session: Session = info.context["session"]
-        garages = session.exec(select(Garage).where(Garage.house_id == self.id)).all()
-        return [GarageType(id=g.id, title=g.title) for g in garages]
+    async def garage_count(self, info: Info) -> int:
+        loaders: Loaders = info.context["loaders"]
+        return await loaders.garage_counts_by_house.load(self.id)
+
+    @strawberry.field
+    async def garages_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[GarageType]:
+        loaders: Loaders = info.context["loaders"]
+        return await load_connection(loaders.garage_pages_by_house, self.id, first, after, GarageType.from_row)
 
 
 @strawberry.type
-class UserType:
+class UserType(RowType):
     id: int
     email: str
     is_active: bool
 
     @strawberry.field
-    def houses(self, info) -> List[HouseType]:
-        session: Session = info.context["session"]
-        houses = session.exec(select(House).where(House.owner_id == self.id)).all()
-        return [HouseType(id=h.id, title=h.title) for h in houses]
+    async def houses(
+        self, info: Info, where: Optional[HouseWhere] = None, order_by: Optional[List[HouseOrder]] = None
+    ) -> List[HouseType]:
+        loaders: Loaders = info.context["loaders"]
+        rows = await load_list(loaders.houses_by_owner, loaders.filtered_houses_by_owner, self.id, where, order_by)
+        return HouseType.from_rows(rows)
 
     @strawberry.field
-    def garages(self, info) -> List[GarageType]:
-        session: Session = info.context["session"]
-        garages = session.exec(select(Garage).where(Garage.owner_id == self.id)).all()
-        return [GarageType(id=g.id, title=g.title) for g in garages]
+    async def garages(
+        self, info: Info, where: Optional[GarageWhere] = None, order_by: Optional[List[GarageOrder]] = None
+    ) -> List[GarageType]:
+        loaders: Loaders = info.context["loaders"]
+        rows = await load_list(loaders.garages_by_owner, loaders.filtered_garages_by_owner, self.id, where, order_by)
+        return GarageType.from_rows(rows)
 
     @strawberry.field
-    def cars(self, info) -> List[CarType]:
-        session: Session = info.context["session"]
-        cars = session.exec(select(Car).where(Car.owner_id == self.id)).all()
-        return [CarType(id=c.id, model=c.model) for c in cars]
+    async def cars(
+        self, info: Info, where: Optional[CarWhere] = None, order_by: Optional[List[CarOrder]] = None
+    ) -> List[CarType]:
+        loaders: Loaders = info.context["loaders"]
+        rows = await load_list(loaders.cars_by_owner, loaders.filtered_cars_by_owner, self.id, where, order_by)
+        return CarType.from_rows(rows)
 
     @strawberry.field
-    def driver_license(self, info) -> Optional[DriverLicenceType]:
-        session: Session = info.context["session"]
-        dl = session.exec(select(DriverLicence).where(DriverLicence.user_id == self.id)).first()
-        if not dl:
+    async def driver_license(self, info: Info) -> Optional[DriverLicenceType]:
+        loaders: Loaders = info.context["loaders"]
+        licences = await loaders.driver_licenses_by_user.load(self.id)
+        if not licences:
             return None
-        return DriverLicenceType(id=dl.id, number=dl.number)
+        return DriverLicenceType.from_row(licences[0])
+
+    @strawberry.field
+    async def house_count(self, info: Info) -> int:
+        loaders: Loaders = info.context["loaders"]
+        return await loaders.house_counts_by_owner.load(self.id)
+
+    @strawberry.field
+    async def garage_count(self, info: Info) -> int:
+        loaders: Loaders = info.context["loaders"]
+        return await loaders.garage_counts_by_owner.load(self.id)
+
+    @strawberry.field
+    async def car_count(self, info: Info) -> int:
+        loaders: Loaders = info.context["loaders"]
+        return await loaders.car_counts_by_owner.load(self.id)
+
+    @strawberry.field
+    async def houses_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[HouseType]:
+        loaders: Loaders = info.context["loaders"]
+        return await load_connection(loaders.house_pages_by_owner, self.id, first, after, HouseType.from_row)
+
+    @strawberry.field
+    async def garages_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[GarageType]:
+        loaders: Loaders = info.context["loaders"]
+        return await load_connection(loaders.garage_pages_by_owner, self.id, first, after, GarageType.from_row)
+
+    @strawberry.field
+    async def cars_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[CarType]:
+        loaders: Loaders = info.context["loaders"]
+        return await load_connection(loaders.car_pages_by_owner, self.id, first, after, CarType.from_row)
+
+
+def stat(name: str):
+    """A `StatsType` field; sibling stats are gathered into one statement by the `stats` loader."""
+
+    async def resolve(info: Info) -> int:
+        loaders: Loaders = info.context["loaders"]
+        return await loaders.stats.load(name)
+
+    return strawberry.field(resolver=resolve)
+
+
+@strawberry.type
+class StatsType:
+    users: int = stat("users")
+    active_users: int = stat("active_users")
+    houses: int = stat("houses")
+    garages: int = stat("garages")
+    cars: int = stat("cars")
+    parked_cars: int = stat("parked_cars")
+    driver_licences: int = stat("driver_licences")
+
+
+# -----------------------
+# Inputs
+# -----------------------
+@strawberry.input
+class UserInput:
+    email: str
+    is_active: bool = True
+
+
+@strawberry.input
+class HouseInput:
+    title: str
+    owner_id: Optional[int] = None
+
+
+@strawberry.input
+class CarInput:
+    model: str
+    owner_id: Optional[int] = None
+    garage_id: Optional[int] = None
 
 
 # -----------------------
@@ -205,155 +328,350 @@ class UserType:
 @strawberry.type
 class Query:
     @strawberry.field
-    def all_users(self, info) -> List[UserType]:
-        session: Session = info.context["session"]
-        users = session.exec(select(User)).all()
-        return [UserType(id=u.id, email=u.email, is_active=u.is_active) for u in users]
+    async def all_users(
+        self, info: Info, where: Optional[UserWhere] = None, order_by: Optional[List[UserOrder]] = None
+    ) -> List[UserType]:
+        return UserType.from_rows(await load_selected(info, User, freeze(where, order_by)))
 
     @strawberry.field
-    def user(self, info, id: int) -> Optional[UserType]:
-        session: Session = info.context["session"]
-        u = session.get(User, id)
+    async def user(self, info: Info, id: int) -> Optional[UserType]:
+        loaders: Loaders = info.context["loaders"]
+        u = await loaders.user_by_id.load(id)
         if not u:
             return None
-        return UserType(id=u.id, email=u.email, is_active=u.is_active)
+        await load_user_trees(info, [id])
+        return UserType.from_row(u)
+
+    @strawberry.field
+    async def all_houses(
+        self, info: Info, where: Optional[HouseWhere] = None, order_by: Optional[List[HouseOrder]] = None
+    ) -> List[HouseType]:
+        return HouseType.from_rows(await load_selected(info, House, freeze(where, order_by)))
+
+    @strawberry.field
+    async def all_garages(
+        self, info: Info, where: Optional[GarageWhere] = None, order_by: Optional[List[GarageOrder]] = None
+    ) -> List[GarageType]:
+        return GarageType.from_rows(await load_selected(info, Garage, freeze(where, order_by)))
+
+    @strawberry.field
+    async def all_cars(
+        self, info: Info, where: Optional[CarWhere] = None, order_by: Optional[List[CarOrder]] = None
+    ) -> List[CarType]:
+        return CarType.from_rows(await load_selected(info, Car, freeze(where, order_by)))
+
+    @strawberry.field
+    def stats(self) -> StatsType:
+        return StatsType()
+
+    @strawberry.field
+    async def users_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[UserType]:
+        limit, after_id = page_size(first), decode_cursor(after)
+        rows = await load_selected_page(info, User, limit, after_id)
+        return build_connection(rows, limit, after_id, UserType.from_row)
 
     @strawberry.field
-    def all_houses(self, info) -> List[HouseType]:
-        session: Session = info.context["session"]
-        hs = session.exec(select(House)).all()
-        return [HouseType(id=h.id, title=h.title) for h in hs]
+    async def houses_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[HouseType]:
+        limit, after_id = page_size(first), decode_cursor(after)
+        rows = await load_selected_page(info, House, limit, after_id)
+        return build_connection(rows, limit, after_id, HouseType.from_row)
 
     @strawberry.field
-    def all_garages(self, info) -> List[GarageType]:
-        session: Session = info.context["session"]
-        gs = session.exec(select(Garage)).all()
-        return [GarageType(id=g.id, title=g.title) for g in gs]
+    async def garages_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[GarageType]:
+        limit, after_id = page_size(first), decode_cursor(after)
+        rows = await load_selected_page(info, Garage, limit, after_id)
+        return build_connection(rows, limit, after_id, GarageType.from_row)
 
     @strawberry.field
-    def all_cars(self, info) -> List[CarType]:
-        session: Session = info.context["session"]
-        cs = session.exec(select(Car)).all()
-        return [CarType(id=c.id, model=c.model) for c in cs]
+    async def cars_connection(
+        self, info: Info, first: Optional[int] = None, after: Optional[str] = None
+    ) -> Connection[CarType]:
+        limit, after_id = page_size(first), decode_cursor(after)
+        rows = await load_selected_page(info, Car, limit, after_id)
+        return build_connection(rows, limit, after_id, CarType.from_row)
+
+
+async def write(info: Info, fn, *args):
+    """Run a single-row write from `app.writes`: committed on its own, or in a group by the write queue."""
+    db: Database = info.context["db"]
+    if not write_queue.WRITE_QUEUE_ENABLED:
+        return await db.run(fn, *args)
+    row = await write_queue.submit(db.session.bind, fn, *args)
+    # committed on the writer's connection: drop what this request read before it
+    info.context["loaders"].clear_all()
+    await db.release()
+    return row
 
 
 @strawberry.type
 class Mutation:
     @strawberry.mutation
-    def create_user(self, info, email: str, is_active: bool = True) -> UserType:
-        session: Session = info.context["session"]
-        u = User(email=email, is_active=is_active)
-        session.add(u)
-        session.commit()
-        session.refresh(u)
-        return UserType(id=u.id, email=u.email, is_active=u.is_active)
+    async def create_user(self, info: Info, email: str, is_active: bool = True) -> UserType:
+        row = await write(info, writes.create_user, email, is_active)
+        await pubsub.publish(pubsub.USER_CREATED, row)
+        return UserType.from_row(row)
 
     @strawberry.mutation
-    def create_house(self, info, title: str, owner_id: Optional[int] = None) -> HouseType:
-        session: Session = info.context["session"]
-        if owner_id and not session.get(User, owner_id):
-            raise HTTPException(status_code=404, detail="Owner not found")
-        h = House(title=title, owner_id=owner_id)
-        session.add(h)
-        session.commit()
-        session.refresh(h)
-        return HouseType(id=h.id, title=h.title)
+    async def create_house(self, info: Info, title: str, owner_id: Optional[int] = None) -> HouseType:
+        row = await write(info, writes.create_house, title, owner_id)
+        await pubsub.publish(pubsub.HOUSE_CREATED, row)
+        return HouseType.from_row(row)
 
     @strawberry.mutation
-    def create_garage(
-        self, info, title: str, owner_id: Optional[int] = None, house_id: Optional[int] = None
+    async def create_garage(
+        self, info: Info, title: str, owner_id: Optional[int] = None, house_id: Optional[int] = None
     ) -> GarageType:
-        session: Session = info.context["session"]
-        if owner_id and not session.get(User, owner_id):
-            raise HTTPException(status_code=404, detail="Owner not found")
-        if house_id and not session.get(House, house_id):
-            raise HTTPException(status_code=404, detail="House not found")
-        g = Garage(title=title, owner_id=owner_id, house_id=house_id)
-        session.add(g)
-        session.commit()
-        session.refresh(g)
-        return GarageType(id=g.id, title=g.title)
+        row = await write(info, writes.create_garage, title, owner_id, house_id)
+        await pubsub.publish(pubsub.GARAGE_CREATED, row)
+        return GarageType.from_row(row)
 
     @strawberry.mutation
-    def create_car(self, info, model: str, owner_id: Optional[int] = None, garage_id: Optional[int] = None) -> CarType:
-        session: Session = info.context["session"]
-        if owner_id and not session.get(User, owner_id):
-            raise HTTPException(status_code=404, detail="Owner not found")
-        if garage_id and not session.get(Garage, garage_id):
-            raise HTTPException(status_code=404, detail="Garage not found")
-        c = Car(model=model, owner_id=owner_id, garage_id=garage_id)
-        session.add(c)
-        session.commit()
-        session.refresh(c)
-        return CarType(id=c.id, model=c.model)
+    async def create_car(self, info: Info, model: str, owner_id: Optional[int] = None, garage_id: Optional[int] = None) -> CarType:
+        row = await write(info, writes.create_car, model, owner_id, garage_id)
+        await pubsub.publish(pubsub.CAR_CREATED, row)
+        return CarType.from_row(row)
 
     @strawberry.mutation
-    def create_driver_license(self, info, number: str, user_id: int) -> DriverLicenceType:
-        session: Session = info.context["session"]
-        if not session.get(User, user_id):
-            raise HTTPException(status_code=404, detail="User not found")
-        # optionally enforce one-per-user
-        existing = session.exec(select(DriverLicence).where(DriverLicence.user_id == user_id)).first()
-        if existing:
-            raise HTTPException(status_code=400, detail="User already has driver licence")
-        dl = DriverLicence(number=number, user_id=user_id)
-        session.add(dl)
-        session.commit()
-        session.refresh(dl)
-        return DriverLicenceType(id=dl.id, number=dl.number)
+    async def create_driver_license(self, info: Info, number: str, user_id: int) -> DriverLicenceType:
+        row = await write(info, writes.create_driver_license, number, user_id)
+        await pubsub.publish(pubsub.DRIVER_LICENCE_CREATED, row)
+        return DriverLicenceType.from_row(row)
 
     @strawberry.mutation
-    def assign_garage_to_house(self, info, garage_id: int, house_id: Optional[int]) -> GarageType:
-        session: Session = info.context["session"]
-        g = session.get(Garage, garage_id)
-        if not g:
-            raise HTTPException(status_code=404, detail="Garage not found")
-        if house_id is not None and not session.get(House, house_id):
-            raise HTTPException(status_code=404, detail="House not found")
-        g.house_id = house_id
-        session.add(g)
-        session.commit()
-        session.refresh(g)
-        return GarageType(id=g.id, title=g.title)
+    async def assign_garage_to_house(self, info: Info, garage_id: int, house_id: Optional[int]) -> GarageType:
+        row = await write(info, writes.assign_garage_to_house, garage_id, house_id)
+        await pubsub.publish(pubsub.GARAGE_ASSIGNED, row)
+        return GarageType.from_row(row)
 
     @strawberry.mutation
-    def transfer_car(
-        self, info, car_id: int, new_owner_id: Optional[int] = None, new_garage_id: Optional[int] = None
+    async def transfer_car(
+        self, info: Info, car_id: int, new_owner_id: Optional[int] = None, new_garage_id: Optional[int] = None
     ) -> CarType:
-        session: Session = info.context["session"]
-        c = session.get(Car, car_id)
-        if not c:
-            raise HTTPException(status_code=404, detail="Car not found")
-        if new_owner_id is not None and not session.get(User, new_owner_id):
-            raise HTTPException(status_code=404, detail="New owner not found")
-        if new_garage_id is not None and not session.get(Garage, new_garage_id):
-            raise HTTPException(status_code=404, detail="Garage not found")
-        c.owner_id = new_owner_id
-        c.garage_id = new_garage_id
-        session.add(c)
-        session.commit()
-        session.refresh(c)
-        return CarType(id=c.id, model=c.model)
+        row = await write(info, writes.transfer_car, car_id, new_owner_id, new_garage_id)
+        await pubsub.publish(pubsub.CAR_TRANSFERRED, row)
+        return CarType.from_row(row)
 
+    @strawberry.mutation
+    async def create_users(
+        self,
+        info: Info,
+        users: List[UserInput],
+        mode: BulkMode = BulkMode.ALL_OR_NOTHING,
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> BulkResult[UserType]:
+        rows = [dataclasses.asdict(u) for u in users]
+        db: Database = info.context["db"]
+        created, errors = await db.run(bulk_insert, User, rows, mode, chunk_size)
+        await pubsub.publish(pubsub.USER_CREATED, *created)
+        return BulkResult(created=UserType.from_rows(created), errors=errors)
 
-# bottom part of same file: schema, router, app, context getter
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+    @strawberry.mutation
+    async def create_houses(
+        self,
+        info: Info,
+        houses: List[HouseInput],
+        mode: BulkMode = BulkMode.ALL_OR_NOTHING,
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> BulkResult[HouseType]:
+        rows = [dataclasses.asdict(h) for h in houses]
+        db: Database = info.context["db"]
+        created, errors = await db.run(bulk_insert, House, rows, mode, chunk_size)
+        await pubsub.publish(pubsub.HOUSE_CREATED, *created)
+        return BulkResult(created=HouseType.from_rows(created), errors=errors)
 
+    @strawberry.mutation
+    async def create_cars(
+        self,
+        info: Info,
+        cars: List[CarInput],
+        mode: BulkMode = BulkMode.ALL_OR_NOTHING,
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> BulkResult[CarType]:
+        rows = [dataclasses.asdict(c) for c in cars]
+        db: Database = info.context["db"]
+        created, errors = await db.run(bulk_insert, Car, rows, mode, chunk_size)
+        await pubsub.publish(pubsub.CAR_CREATED, *created)
+        return BulkResult(created=CarType.from_rows(created), errors=errors)
 
-def get_context(request: Request):
-    # create a DB session for the request
-    session = Session(engine)
-    # NOTE: for production you should ensure session is closed after request
-    return {"session": session}
+
+# -----------------------
+# Subscriptions
+# -----------------------
+async def changes(info: Info, type_, topic: str, **filters):
+    """Stream `topic`'s change events as `type_` objects.
+
+    A WebSocket's context lives as long as the connection, so after every
+    event its loaders are cleared and its session released: nested fields
+    of the next event read current rows, and no transaction stays open in
+    between.
+    """
+    db: Database = info.context["db"]
+    loaders: Loaders = info.context["loaders"]
+    async for event in pubsub.events(topic, **filters):
+        yield type_.from_row(event)
+        loaders.clear_all()
+        await db.release()
 
 
-graphql_app = GraphQLRouter(schema, context_getter=get_context)
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def user_created(self, info: Info) -> AsyncGenerator[UserType, None]:
+        async for user in changes(info, UserType, pubsub.USER_CREATED):
+            yield user
+
+    @strawberry.subscription
+    async def house_created(self, info: Info, owner_id: Optional[int] = None) -> AsyncGenerator[HouseType, None]:
+        async for house in changes(info, HouseType, pubsub.HOUSE_CREATED, owner_id=owner_id):
+            yield house
+
+    @strawberry.subscription
+    async def garage_created(
+        self, info: Info, owner_id: Optional[int] = None, house_id: Optional[int] = None
+    ) -> AsyncGenerator[GarageType, None]:
+        async for garage in changes(info, GarageType, pubsub.GARAGE_CREATED, owner_id=owner_id, house_id=house_id):
+            yield garage
+
+    @strawberry.subscription
+    async def car_created(
+        self, info: Info, owner_id: Optional[int] = None, garage_id: Optional[int] = None
+    ) -> AsyncGenerator[CarType, None]:
+        async for car in changes(info, CarType, pubsub.CAR_CREATED, owner_id=owner_id, garage_id=garage_id):
+            yield car
+
+    @strawberry.subscription
+    async def driver_license_created(
+        self, info: Info, user_id: Optional[int] = None
+    ) -> AsyncGenerator[DriverLicenceType, None]:
+        async for licence in changes(info, DriverLicenceType, pubsub.DRIVER_LICENCE_CREATED, user_id=user_id):
+            yield licence
+
+    @strawberry.subscription
+    async def garage_assigned(
+        self, info: Info, garage_id: Optional[int] = None, house_id: Optional[int] = None
+    ) -> AsyncGenerator[GarageType, None]:
+        """A garage moved to another house (or out of one), with its new `houseId`."""
+        async for garage in changes(info, GarageType, pubsub.GARAGE_ASSIGNED, id=garage_id, house_id=house_id):
+            yield garage
+
+    @strawberry.subscription
+    async def car_transferred(
+        self, info: Info, car_id: Optional[int] = None, owner_id: Optional[int] = None, garage_id: Optional[int] = None
+    ) -> AsyncGenerator[CarType, None]:
+        """A car changed owner or garage; `ownerId` / `garageId` filter on the new ones."""
+        async for car in changes(
+            info, CarType, pubsub.CAR_TRANSFERRED, id=car_id, owner_id=owner_id, garage_id=garage_id
+        ):
+            yield car
 
-app = FastAPI()
+
+# bottom part of same file: schema, router, app, context getter
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    subscription=Subscription,
+    execution_context_class=ExecutionContext,
+    extensions=[Tracing, ReadRouting, CostLimiter, PersistedQueries, ResponseCaching],
+    config=StrawberryConfig(batching_config=batching_config),
+)
+
+
+def build_context(session: Union[Session, AsyncSession], debug: bool = False) -> dict:
+    db = Database(session)
+    watch(db.sync_session)
+    if response_cache.enabled:
+        track_writes(db.sync_session)
+    return {"db": db, "loaders": Loaders(db), "debug": debug}
+
+
+def get_context(
+    request: HTTPConnection,
+    session: Union[Session, AsyncSession] = Depends(get_session),
+    read_session: Optional[Union[Session, AsyncSession]] = Depends(get_read_session),
+) -> dict:
+    # an HTTP request or a WebSocket connection; the dependencies close the sessions once it is over
+    debug = request.headers.get(DEBUG_HEADER) == "1"
+    context = build_context(session, debug=debug)
+    if read_session is not None:
+        # taken up by `ReadRouting` if the operation turns out to be a query
+        context[READER] = lambda: build_context(read_session, debug=debug)
+    return context
+
+
+class TextWebSocketAdapter(ASGIWebSocketAdapter):
+    async def send_json(self, message) -> None:
+        # subscription clients only parse text frames, and `Router.encode_json` returns bytes
+        try:
+            await self.ws.send_text(self.view.encode_json_string(message))
+        except WebSocketDisconnect as exc:
+            raise WebSocketDisconnected from exc
+
+
+class Router(GraphQLRouter):
+    websocket_adapter_class = TextWebSocketAdapter
+
+    def encode_json(self, data: object) -> bytes:
+        # several times faster than json.dumps on large list responses
+        return orjson.dumps(data)
+
+    def decode_json(self, data):
+        data = super().decode_json(data)
+        if isinstance(data, list):
+            # entries that are not objects fail on their own, see `execute_operation`
+            return [item if isinstance(item, dict) else {"query": NOT_AN_OBJECT} for item in data]
+        return data
+
+    async def execute_operation(self, request, request_adapter, request_data, context, root_value, sub_response):
+        if not isinstance(request_data, list):
+            return await super().execute_operation(
+                request, request_adapter, request_data, context, root_value, sub_response
+            )
+
+        # a batch: one shared context, and an operation that can't run only fails its own result;
+        # it may mix queries and mutations, so it stays on the writer
+        context.pop(READER, None)
+
+        async def execute_one(data):
+            problem = invalid_operation(data)
+            if problem is not None:
+                return failed(problem)
+            try:
+                return await self.schema.execute(
+                    data.query,
+                    root_value=root_value,
+                    variable_values=data.variables,
+                    context_value=context,
+                    operation_name=data.operation_name,
+                    allowed_operation_types=BATCHED_OPERATION_TYPES,
+                    operation_extensions=data.extensions,
+                )
+            except REFUSALS as e:
+                return failed(refusal(e))
+
+        return await asyncio.gather(*(execute_one(data) for data in request_data))
+
+
+graphql_app = Router(schema, context_getter=get_context)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # initialize DB on startup, on the same engine requests will be served from
+    await init_db(app.dependency_overrides.get(get_engine, get_engine)())
+    yield
+    await write_queue.close_all()
+
+
+instrument()
+app = FastAPI(lifespan=lifespan)
 app.include_router(graphql_app, prefix="/graphql")
 
 
-# initialize DB on startup
-@app.on_event("startup")
-def on_startup():
-    init_db()
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    return registry.render()
@@ -0,0 +1,97 @@
+# app/migrations.py
+"""Versioned schema changes for databases created before the models changed.
+
+`create_all` only creates missing tables, so indexes and constraints added
+to existing tables ship here. The schema version is kept in SQLite's
+`PRAGMA user_version`; version N means the first N migrations are applied.
+Every statement is idempotent, so a fresh database built by `create_all`
+(which already has everything) is simply stamped with the latest version.
+A migration that existing rows would make fail is preceded by a check
+that stops the upgrade with `MigrationError`, saying which rows to fix.
+
+Upgrade a database in place with:
+
+    python -m app.migrations
+"""
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+MIGRATIONS: List[List[str]] = [
+    # 1: foreign-key lookup indexes, one driver licence per user
+    [
+        "CREATE INDEX IF NOT EXISTS ix_house_owner_id ON house (owner_id)",
+        "CREATE INDEX IF NOT EXISTS ix_garage_owner_id ON garage (owner_id)",
+        "CREATE INDEX IF NOT EXISTS ix_garage_house_id ON garage (house_id)",
+        "CREATE INDEX IF NOT EXISTS ix_car_owner_id ON car (owner_id)",
+        "CREATE INDEX IF NOT EXISTS ix_car_garage_id ON car (garage_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_driverlicence_user_id ON driverlicence (user_id)",
+    ],
+    # 2: indexes behind `where` / `orderBy` on list fields
+    [
+        'CREATE INDEX IF NOT EXISTS ix_user_email ON "user" (email)',
+        'CREATE INDEX IF NOT EXISTS ix_user_is_active ON "user" (is_active)',
+        "CREATE INDEX IF NOT EXISTS ix_house_title ON house (title)",
+        "CREATE INDEX IF NOT EXISTS ix_garage_title ON garage (title)",
+        "CREATE INDEX IF NOT EXISTS ix_car_model ON car (model)",
+    ],
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+class MigrationError(Exception):
+    """Rows in the database keep a migration from being applied."""
+
+
+def duplicate_driver_licences(conn: Connection) -> Optional[str]:
+    rows = conn.execute(
+        text(
+            "SELECT user_id, group_concat(id, ', ') FROM driverlicence"
+            " GROUP BY user_id HAVING count(*) > 1 ORDER BY user_id"
+        )
+    ).all()
+    if not rows:
+        return None
+    shown = "; ".join(f"user {user_id}: licences {ids}" for user_id, ids in rows[:10])
+    more = f" and {len(rows) - 10} more users" if len(rows) > 10 else ""
+    return (
+        f"users with more than one driver licence ({shown}{more}) keep the unique index on"
+        " driverlicence.user_id from being created; delete all but one licence of each, then start again"
+    )
+
+
+# migration number -> a check run before it, returning what must be fixed first, if anything
+CHECKS: Dict[int, Callable[[Connection], Optional[str]]] = {
+    1: duplicate_driver_licences,
+}
+
+
+def schema_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def migrate(conn: Connection) -> int:
+    """Apply pending migrations on `conn` and return the resulting version."""
+    version = schema_version(conn)
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        check = CHECKS.get(number)
+        problem = check(conn) if check else None
+        if problem:
+            raise MigrationError(f"Can't apply migration {number}: {problem}")
+        for statement in statements:
+            conn.execute(text(statement))
+        # PRAGMA does not accept bound parameters
+        conn.execute(text(f"PRAGMA user_version = {number:d}"))
+        version = number
+    return version
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    from app.db import init_db
+
+    asyncio.run(init_db())
@@ -0,0 +1,57 @@
+# app/models.py
+from typing import List, Optional
+from sqlmodel import SQLModel, Field, Relationship
+
+
+# -----------------------
+# DB models (SQLModel)
+# -----------------------
+class User(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    email: str = Field(index=True)
+    is_active: bool = Field(default=True, index=True)
+
+    houses: List["House"] = Relationship(back_populates="owner")
+    garages: List["Garage"] = Relationship(back_populates="owner")
+    cars: List["Car"] = Relationship(back_populates="owner")
+    driver_license: Optional["DriverLicence"] = Relationship(
+        back_populates="owner", sa_relationship_kwargs={"uselist": False}
+    )
+
+
+class House(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    title: str = Field(index=True)
+    owner_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+
+    owner: Optional[User] = Relationship(back_populates="houses")
+    garages: List["Garage"] = Relationship(back_populates="house")
+
+
+class Garage(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    title: str = Field(index=True)
+    owner_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+    house_id: Optional[int] = Field(default=None, foreign_key="house.id", index=True)
+
+    owner: Optional[User] = Relationship(back_populates="garages")
+    house: Optional[House] = Relationship(back_populates="garages")
+    cars: List["Car"] = Relationship(back_populates="garage")
+
+
+class Car(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    model: str = Field(index=True)
+    owner_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+    garage_id: Optional[int] = Field(default=None, foreign_key="garage.id", index=True)
+
+    owner: Optional[User] = Relationship(back_populates="cars")
+    garage: Optional[Garage] = Relationship(back_populates="cars")
+
+
+class DriverLicence(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    number: str
+    user_id: int = Field(foreign_key="user.id", unique=True, index=True)
+
+    owner: Optional[User] = Relationship(back_populates="driver_license")
@@ -0,0 +1,102 @@
+# app/pagination.py
+import base64
+from typing import Callable, Generic, List, Optional, TypeVar
+
+import strawberry
+from fastapi import HTTPException
+from sqlmodel import select
+from strawberry.dataloader import DataLoader
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+CURSOR_PREFIX = "cursor:"
+
+T = TypeVar("T")
+
+
+# -----------------------
+# Connection types
+# -----------------------
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    has_previous_page: bool
+    start_cursor: Optional[str]
+    end_cursor: Optional[str]
+
+
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node: T
+
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    page_info: PageInfo
+
+
+# -----------------------
+# Cursors and page arguments
+# -----------------------
+def encode_cursor(id: int) -> str:
+    return base64.urlsafe_b64encode(f"{CURSOR_PREFIX}{id}".encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Return the primary key a cursor points at; no cursor starts before the first row."""
+    if cursor is None:
+        return 0
+    try:
+        value = base64.urlsafe_b64decode(cursor.encode()).decode()
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError(value)
+        return int(value[len(CURSOR_PREFIX) :])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_size(first: Optional[int]) -> int:
+    if first is None:
+        return DEFAULT_PAGE_SIZE
+    if first < 0:
+        raise HTTPException(status_code=400, detail="'first' must not be negative")
+    if first > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"'first' must not exceed {MAX_PAGE_SIZE}")
+    return first
+
+
+# -----------------------
+# Keyset paging
+# -----------------------
+def page_statement(model, limit: int, after_id: int):
+    """Select up to `limit + 1` rows with a primary key above `after_id`.
+
+    The extra row only tells whether another page exists; the primary key
+    index serves the range scan, so deep pages cost as much as the first one.
+    """
+    return select(model).where(model.id > after_id).order_by(model.id).limit(limit + 1)
+
+
+def build_connection(rows: list, limit: int, after_id: int, to_node: Callable) -> Connection:
+    page = rows[:limit]
+    edges = [Edge(cursor=encode_cursor(row.id), node=to_node(row)) for row in page]
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=len(rows) > limit,
+            has_previous_page=after_id > 0,
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
+
+
+async def load_connection(loader: DataLoader, parent_id: int, first: Optional[int], after: Optional[str], to_node: Callable) -> Connection:
+    """Resolve a nested connection through one of the `*_pages_by_*` loaders."""
+    limit, after_id = page_size(first), decode_cursor(after)
+    rows = await loader.load((parent_id, limit + 1, after_id))
+    return build_connection(rows, limit, after_id, to_node)
@@ -0,0 +1,174 @@
+# app/persisted_queries.py
+"""Automatic persisted queries and a cache of parsed, validated documents.
+
+Clients following the APQ protocol send `extensions.persistedQuery.sha256Hash`
+and leave `query` out. If the hash is unknown the server answers with a
+`PersistedQueryNotFound` error and the client retries once with the full
+text, which is then registered under its hash.
+
+Every operation, persisted or not, is looked up by the sha256 of its text in
+one bounded LRU holding the parsed document and its validation errors, so
+repeated operations skip both `parse` and `validate`.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, NamedTuple, Optional
+
+from graphql import DocumentNode, GraphQLError, parse
+from strawberry.extensions import SchemaExtension
+
+from app.metrics import CACHE_LOOKUPS
+
+
+# documents kept, least recently used are evicted first
+DOCUMENT_CACHE_SIZE = int(os.environ.get("DOCUMENT_CACHE_SIZE", "1000"))
+
+APQ_VERSION = 1
+
+# parsed in place of a persisted query that could not be resolved
+PLACEHOLDER = parse("{ __typename }")
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+class CachedDocument(NamedTuple):
+    query: str
+    document: DocumentNode
+    # validation errors, empty for a valid document
+    errors: List[GraphQLError]
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class DocumentCache:
+    """Thread-safe LRU of `CachedDocument`s keyed by the sha256 of the query text."""
+
+    def __init__(self, maxsize: int = DOCUMENT_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError("DocumentCache maxsize must be positive")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedDocument]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                CACHE_LOOKUPS.inc("document", "miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.inc("document", "hit")
+            return entry
+
+    def put(self, key: str, entry: CachedDocument):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+document_cache = DocumentCache()
+
+
+# -----------------------
+# Errors (Apollo's wire format, so stock clients retry with the full text)
+# -----------------------
+def persisted_query_not_found() -> GraphQLError:
+    return GraphQLError("PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})
+
+
+def persisted_query_error(message: str) -> GraphQLError:
+    return GraphQLError(message, extensions={"code": "BAD_USER_INPUT"})
+
+
+class PersistedQueries(SchemaExtension):
+    """Resolves APQ hashes and serves parse/validate results from `document_cache`."""
+
+    cache: DocumentCache = document_cache
+
+    def __init__(self, *, execution_context=None, cache: Optional[DocumentCache] = None):
+        if cache is not None:
+            self.cache = cache
+        self._key: Optional[str] = None
+        self._entry: Optional[CachedDocument] = None
+        self._error: Optional[GraphQLError] = None
+
+    def _resolve_key(self) -> Optional[str]:
+        context = self.execution_context
+        persisted = (context.operation_extensions or {}).get("persistedQuery")
+        if persisted is None:
+            return query_hash(context.query) if context.query else None
+
+        if not isinstance(persisted, dict) or persisted.get("version") != APQ_VERSION:
+            raise persisted_query_error("Unsupported persisted query version")
+        key = persisted.get("sha256Hash")
+        if not isinstance(key, str):
+            raise persisted_query_error("persistedQuery.sha256Hash must be a string")
+        if context.query and query_hash(context.query) != key:
+            raise persisted_query_error("provided sha does not match query")
+        return key
+
+    def on_operation(self) -> Iterator[None]:
+        context = self.execution_context
+        try:
+            self._key = self._resolve_key()
+            if self._key is not None:
+                self._entry = self.cache.get(self._key)
+                if self._entry is None and not context.query:
+                    raise persisted_query_not_found()
+        except GraphQLError as error:
+            # raising here would leave earlier extensions' hooks unfinished;
+            # report the error from on_validate on a stand-in document instead
+            self._error = error
+            self._key = None
+            context.graphql_document = PLACEHOLDER
+        if self._entry is not None:
+            context.query = self._entry.query
+            context.graphql_document = self._entry.document
+        yield
+
+    def on_validate(self) -> Iterator[None]:
+        context = self.execution_context
+        if self._error is not None:
+            context.pre_execution_errors = [self._error]
+            yield
+            return
+        if self._entry is not None:
+            # `[]` rather than None tells strawberry validation already ran
+            context.pre_execution_errors = list(self._entry.errors)
+            yield
+            return
+
+        yield
+        # only documents that parsed and went through validation are cached
+        if self._key is not None and context.graphql_document is not None:
+            errors = context.pre_execution_errors or []
+            self.cache.put(self._key, CachedDocument(context.query, context.graphql_document, list(errors)))
@@ -0,0 +1,161 @@
+# app/pubsub.py
+"""Change events behind the Subscription resolvers.
+
+Mutations publish the rows they wrote, once committed, to a topic of the
+process-wide broker, and every subscription reads its topic from a queue
+of its own. The in-process broker hands the very same row objects to
+every queue, so fanning an event out costs one `put_nowait` per
+subscriber and no copying, however many subscribers there are.
+
+Queues hold up to `SUBSCRIPTION_QUEUE_SIZE` events (default 100).
+Publishing never waits for a slow subscriber: one whose queue is full is
+dropped, and its stream ends with `SubscriberTooSlow` so the client can
+resubscribe and refetch instead of silently missing events.
+
+`InProcessBroker` only reaches subscribers in this process. With several
+workers, install a broker relaying through a shared channel (Redis
+pub/sub, Postgres LISTEN/NOTIFY) with `set_broker`. `encode_event` and
+`decode_event` are its wire format: a published batch is serialized once,
+not once per subscriber.
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator, Dict, List, Mapping, Sequence, Set, Tuple
+
+import orjson
+from sqlalchemy.engine import Row
+
+
+SUBSCRIPTION_QUEUE_SIZE = int(os.environ.get("SUBSCRIPTION_QUEUE_SIZE", "100"))
+
+# topics, one per kind of change
+USER_CREATED = "user_created"
+HOUSE_CREATED = "house_created"
+GARAGE_CREATED = "garage_created"
+CAR_CREATED = "car_created"
+DRIVER_LICENCE_CREATED = "driver_licence_created"
+GARAGE_ASSIGNED = "garage_assigned"
+CAR_TRANSFERRED = "car_transferred"
+
+# an event is the written row: a `Row` in process, its columns as a mapping once decoded
+Event = Mapping
+
+
+class SubscriberTooSlow(Exception):
+    def __init__(self, topic: str, queue_size: int):
+        super().__init__(f"Subscriber fell more than {queue_size} events behind on {topic!r}; resubscribe")
+
+
+class Broker(ABC):
+    @abstractmethod
+    async def publish(self, topic: str, events: Sequence[Event]) -> None:
+        """Deliver `events` to every current subscriber of `topic`, without waiting on any of them."""
+
+    @abstractmethod
+    def subscribe(self, topic: str) -> AsyncContextManager[AsyncIterator[Event]]:
+        """Open a stream of `topic`'s events published from now on; leaving the block unsubscribes."""
+
+
+# -----------------------
+# In process
+# -----------------------
+_DROPPED = object()
+
+
+class Subscriber:
+    def __init__(self, topic: str, queue_size: int):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Event:
+        event = await self.queue.get()
+        if event is _DROPPED:
+            raise SubscriberTooSlow(self.topic, self.queue.maxsize)
+        return event
+
+    def offer(self, events: Sequence[Event]) -> bool:
+        """Queue `events`, or replace everything queued with the drop marker when they don't fit."""
+        if self.queue.maxsize - self.queue.qsize() >= len(events):
+            for event in events:
+                self.queue.put_nowait(event)
+            return True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_DROPPED)
+        return False
+
+
+class InProcessBroker(Broker):
+    def __init__(self, queue_size: int = SUBSCRIPTION_QUEUE_SIZE):
+        if queue_size < 1:
+            raise ValueError("SUBSCRIPTION_QUEUE_SIZE must be positive")
+        self.queue_size = queue_size
+        self._topics: Dict[str, Set[Subscriber]] = {}
+
+    async def publish(self, topic: str, events: Sequence[Event]) -> None:
+        subscribers = self._topics.get(topic)
+        if not subscribers or not events:
+            return
+        for subscriber in list(subscribers):
+            if not subscriber.offer(events):
+                subscribers.discard(subscriber)
+
+    @asynccontextmanager
+    async def subscribe(self, topic: str) -> AsyncIterator[Subscriber]:
+        subscriber = Subscriber(topic, self.queue_size)
+        self._topics.setdefault(topic, set()).add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(self._topics.get(topic, ()))
+
+
+# -----------------------
+# Wire format for brokers between processes
+# -----------------------
+def encode_event(topic: str, events: Sequence[Event]) -> bytes:
+    return orjson.dumps({"topic": topic, "events": [e._asdict() if isinstance(e, Row) else dict(e) for e in events]})
+
+
+def decode_event(data: bytes) -> Tuple[str, List[Event]]:
+    message = orjson.loads(data)
+    return message["topic"], message["events"]
+
+
+broker: Broker = InProcessBroker()
+
+
+def set_broker(new: Broker) -> Broker:
+    """Install the broker mutations publish to and subscriptions read from; returns the previous one."""
+    global broker
+    previous, broker = broker, new
+    return previous
+
+
+async def publish(topic: str, *events: Event):
+    await broker.publish(topic, events)
+
+
+async def events(topic: str, **filters) -> AsyncIterator[Event]:
+    """`topic`'s events whose columns equal every non-None `filters` value."""
+    wanted = [(column, value) for column, value in filters.items() if value is not None]
+    async with broker.subscribe(topic) as stream:
+        async for event in stream:
+            if all(_column(event, column) == value for column, value in wanted):
+                yield event
+
+
+def _column(event: Event, column: str):
+    return getattr(event, column) if isinstance(event, Row) else event.get(column)
@@ -0,0 +1,324 @@
+# app/response_cache.py
+"""Opt-in cache of whole query responses, invalidated by table versions.
+
+A query's result is stored under a key built from its normalized document
+(`print_ast`), operation name, variables and the current version of every
+table it reads. Every committed write bumps the versions of the tables it
+touched, so later lookups build a different key and never see a stale
+result; superseded entries simply age out of the LRU.
+
+Enable with `RESPONSE_CACHE=1`. Entries live for the smallest TTL among the
+types and fields an operation selects (`RESPONSE_CACHE_TTLS`, else
+`RESPONSE_CACHE_TTL`); a TTL of 0 keeps an operation out of the cache.
+Storage goes through a `CacheBackend`, in-process by default.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterator, NamedTuple, Optional, Set
+
+from graphql import (
+    DocumentNode,
+    ExecutionResult as GraphQLExecutionResult,
+    GraphQLSchema,
+    OperationType,
+    TypeInfo,
+    TypeInfoVisitor,
+    Visitor,
+    get_named_type,
+    print_ast,
+    visit,
+)
+from graphql.utilities import get_operation_ast
+from sqlalchemy import event
+from sqlmodel import Session
+from strawberry.extensions import SchemaExtension
+
+from app.metrics import CACHE_LOOKUPS
+from app.models import User, House, Garage, Car, DriverLicence
+
+
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "10000"))
+# seconds
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "60"))
+
+
+def parse_ttls(setting: str) -> Dict[str, float]:
+    """`"UserType=5,Query.allCars=1"` -> `{"UserType": 5.0, "Query.allCars": 1.0}`."""
+    ttls: Dict[str, float] = {}
+    for item in filter(None, (item.strip() for item in setting.split(","))):
+        name, sep, seconds = item.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"RESPONSE_CACHE_TTLS entries must look like Type=seconds or Type.field=seconds, got {item!r}")
+        ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+# TTL overrides, keyed by GraphQL type ("UserType") or field ("Query.allUsers")
+RESPONSE_CACHE_TTLS = parse_ttls(os.environ.get("RESPONSE_CACHE_TTLS", ""))
+
+# table read by each GraphQL object type
+TYPE_TABLES = {
+    "UserType": User.__tablename__,
+    "HouseType": House.__tablename__,
+    "GarageType": Garage.__tablename__,
+    "CarType": Car.__tablename__,
+    "DriverLicenceType": DriverLicence.__tablename__,
+}
+
+
+# fields reading a table other than their own type's, keyed by "Type.field"
+FIELD_TABLES = {
+    "UserType.houseCount": (House.__tablename__,),
+    "UserType.garageCount": (Garage.__tablename__,),
+    "UserType.carCount": (Car.__tablename__,),
+    "HouseType.garageCount": (Garage.__tablename__,),
+    "GarageType.carCount": (Car.__tablename__,),
+    "StatsType.users": (User.__tablename__,),
+    "StatsType.activeUsers": (User.__tablename__,),
+    "StatsType.houses": (House.__tablename__,),
+    "StatsType.garages": (Garage.__tablename__,),
+    "StatsType.cars": (Car.__tablename__,),
+    "StatsType.parkedCars": (Car.__tablename__,),
+    "StatsType.driverLicences": (DriverLicence.__tablename__,),
+}
+
+
+# -----------------------
+# Backends
+# -----------------------
+class CacheBackend(ABC):
+    """Storage for cached responses and table versions.
+
+    Values are JSON-compatible, so a shared store (e.g. Redis) can implement
+    this for several workers; `incr` must then be atomic in that store.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """The value stored under `key`, or None when it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store `value` under `key` for `ttl` seconds (for good when None)."""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Add one to the counter `key` (starting from 0) and return the new value."""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every entry and counter."""
+
+
+class InMemoryBackend(CacheBackend):
+    """Thread-safe LRU with per-entry expiry. Versions are never evicted."""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError("InMemoryBackend maxsize must be positive")
+        self.maxsize = maxsize
+        # key -> (expires at, value)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# -----------------------
+# Cache
+# -----------------------
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend] = None, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.backend = backend or InMemoryBackend()
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # table versions
+    def version(self, table: str) -> int:
+        return self.backend.get(f"version:{table}") or 0
+
+    def bump(self, *tables: str):
+        for table in tables:
+            self.backend.incr(f"version:{table}")
+
+    # responses
+    def key(self, document: DocumentNode, operation_name: Optional[str], variables: Optional[dict], tables) -> str:
+        versions = {table: self.version(table) for table in sorted(tables)}
+        payload = json.dumps(
+            [print_ast(document), operation_name, variables or {}, versions], sort_keys=True, default=str
+        )
+        return "response:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        CACHE_LOOKUPS.inc("response", "miss" if value is None else "hit")
+        return value
+
+    def set(self, key: str, data: dict, ttl: float):
+        self.backend.set(key, data, ttl)
+
+    def stats(self) -> CacheStats:
+        total = self.hits + self.misses
+        return CacheStats(self.hits, self.misses, self.hits / total if total else 0.0)
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+response_cache = ResponseCache()
+
+
+# -----------------------
+# Write tracking
+# -----------------------
+def track_writes(session: Session, cache: ResponseCache = response_cache):
+    """Bump versions of the tables `session` writes to, once each write commits.
+
+    Covers Core `insert/update/delete` run through `session.execute` as well
+    as ORM objects flushed by the unit of work. Versions move after the
+    commit: bumping earlier would let a concurrent read cache pre-commit
+    rows under the new version.
+    """
+    written: Set[str] = set()
+
+    def on_execute(state):
+        if state.is_insert or state.is_update or state.is_delete:
+            written.add(state.statement.table.name)
+
+    def on_flush(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            written.add(obj.__table__.name)
+
+    def on_commit(session):
+        cache.bump(*written)
+        written.clear()
+
+    def on_rollback(session):
+        written.clear()
+
+    event.listen(session, "do_orm_execute", on_execute)
+    event.listen(session, "after_flush", on_flush)
+    event.listen(session, "after_commit", on_commit)
+    event.listen(session, "after_rollback", on_rollback)
+
+
+# -----------------------
+# Schema extension
+# -----------------------
+class Plan(NamedTuple):
+    tables: FrozenSet[str]
+    ttl: float
+
+
+def plan(schema: GraphQLSchema, document: DocumentNode, operation_name: Optional[str]) -> Plan:
+    """Tables an operation reads and how long its result may be cached."""
+    operation = get_operation_ast(document, operation_name)
+    tables: Set[str] = set()
+    ttl = RESPONSE_CACHE_TTL
+    type_info = TypeInfo(schema)
+
+    class Collect(Visitor):
+        def enter_field(self, node, *args):
+            nonlocal ttl
+            parent, field = type_info.get_parent_type(), type_info.get_field_def()
+            if parent is None or field is None:
+                return
+            named, qualified = get_named_type(field.type), f"{parent.name}.{node.name.value}"
+            for name in (named.name, qualified):
+                ttl = min(ttl, RESPONSE_CACHE_TTLS.get(name, ttl))
+            if named.name in TYPE_TABLES:
+                tables.add(TYPE_TABLES[named.name])
+            tables.update(FIELD_TABLES.get(qualified, ()))
+
+    # fragments are visited where they are defined; they can only add tables
+    visit(document, TypeInfoVisitor(type_info, Collect()))
+    if operation is None or operation.operation is not OperationType.QUERY:
+        ttl = 0
+    return Plan(frozenset(tables), ttl)
+
+
+class ResponseCaching(SchemaExtension):
+    """Answers repeated queries from `response_cache` without executing them."""
+
+    cache: ResponseCache = response_cache
+
+    def __init__(self, *, execution_context=None, cache: Optional[ResponseCache] = None):
+        if cache is not None:
+            self.cache = cache
+        self._key: Optional[str] = None
+        self._ttl = 0.0
+
+    def on_execute(self) -> Iterator[None]:
+        context = self.execution_context
+        # skip when disabled or when an earlier extension already answered
+        if not self.cache.enabled or context.result is not None:
+            yield
+            return
+
+        tables, self._ttl = plan(context.schema._schema, context.graphql_document, context.operation_name)
+        if self._ttl > 0:
+            self._key = self.cache.key(context.graphql_document, context.operation_name, context.variables, tables)
+            data = self.cache.get(self._key)
+            if data is not None:
+                context.result = GraphQLExecutionResult(data=data, errors=None)
+                self._key = None
+        yield
+
+        result = context.result
+        if self._key is not None and result is not None and not result.errors:
+            self.cache.set(self._key, result.data, self._ttl)
@@ -0,0 +1,34 @@
+# app/routing.py
+"""Read/write routing: Query operations run on a read-only session.
+
+Every context starts on the writer's session. The context getter also
+opens a session on the read engine (`app.db.get_read_engine`), which holds
+no connection until something reads through it. Once an operation is
+parsed and known to be a `query`, `ReadRouting` moves the context onto that
+session: a pool of its own, connections opened `mode=ro` with
+`PRAGMA query_only=ON` on SQLite, and replicas wherever READ_DATABASE_URLS
+points. Mutations (and subscriptions) stay on the writer, so a write never
+reaches a read connection and reads done by a mutation see its own writes.
+
+Operations of one batch share their context, so a batch stays on the
+writer; see `app.main.Router.execute_operation`.
+"""
+from typing import Iterator
+
+from strawberry.extensions import SchemaExtension
+from strawberry.types.graphql import OperationType
+
+
+# context key: builds the context entries (`db`, `loaders`) for the read session
+READER = "reader"
+
+
+class ReadRouting(SchemaExtension):
+    """Moves query operations onto the context's read session before they execute."""
+
+    def on_execute(self) -> Iterator[None]:
+        context = self.execution_context
+        reader = context.context.pop(READER, None)
+        if reader is not None and context.operation_type == OperationType.QUERY:
+            context.context.update(reader())
+        yield
@@ -0,0 +1,199 @@
+# app/tracing.py
+"""Per-operation tracing, Prometheus metrics and a slow-query log.
+
+`Tracing` opens a `Trace` for every operation and keeps it in a context
+variable, so the engine hooks below can charge each SQL statement to the
+operation that issued it, including statements run through `run_sync` in
+async mode. Every finished trace feeds the histograms served on `/metrics`.
+When the request carries `DEBUG_HEADER: 1` the trace is also returned under
+`extensions.tracing`.
+
+Statements slower than `SLOW_QUERY_MS` are logged to `app.slow_queries`
+together with SQLite's `EXPLAIN QUERY PLAN`.
+"""
+import inspect
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+from strawberry.extensions import SchemaExtension
+
+from app.metrics import COUNT_BUCKETS, Histogram, registry
+
+
+DEBUG_HEADER = "X-GraphQL-Debug"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+
+logger = logging.getLogger("app.slow_queries")
+
+OPERATION_SECONDS = registry.register(
+    Histogram("graphql_operation_duration_seconds", "Time spent executing GraphQL operations", ["operation"])
+)
+RESOLVER_SECONDS = registry.register(
+    Histogram("graphql_resolver_duration_seconds", "Time spent in async resolvers", ["field"])
+)
+SQL_STATEMENTS = registry.register(
+    Histogram("graphql_sql_statements", "SQL statements per operation", ["operation"], buckets=COUNT_BUCKETS)
+)
+SQL_SECONDS = registry.register(
+    Histogram("graphql_sql_duration_seconds", "Time spent in SQL per operation", ["operation"])
+)
+ROWS_LOADED = registry.register(
+    Histogram("graphql_rows_loaded", "ORM rows loaded per operation", ["operation"], buckets=COUNT_BUCKETS)
+)
+
+
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.resolvers: List[dict] = []
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        return {
+            "durationMs": round(self.duration * 1000, 3),
+            "resolvers": self.resolvers,
+            "sql": {
+                "statements": self.statements,
+                "durationMs": round(self.sql_seconds * 1000, 3),
+                "rows": self.rows,
+            },
+        }
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+# -----------------------
+# SQLAlchemy hooks
+# -----------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:  # hooks installed while the statement was running
+        return
+    elapsed = time.perf_counter() - started.pop()
+    trace = current_trace.get()
+    if trace is not None:
+        trace.statements += 1
+        trace.sql_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "slow query (%.1f ms): %s %s\n%s",
+            elapsed * 1000,
+            statement,
+            describe_parameters(parameters, executemany),
+            explain(conn, statement, parameters, executemany),
+        )
+
+
+def describe_parameters(parameters, executemany: bool = False) -> str:
+    """Parameters for the log; of an executemany batch only the first set is shown."""
+    if executemany and parameters:
+        return f"{parameters[0]!r} (1 of {len(parameters)} parameter sets)"
+    return repr(parameters)
+
+
+def explain(conn, statement: str, parameters, executemany: bool = False) -> str:
+    """SQLite's query plan for `statement`, one step per line."""
+    if conn.dialect.name != "sqlite":
+        return ""
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    # a separate cursor: the statement's own cursor still holds its rows
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    except Exception as exc:  # the plan is diagnostics only, never fail the query over it
+        return f"(no plan: {exc})"
+    finally:
+        cursor.close()
+
+
+def _on_load(target, context):
+    trace = current_trace.get()
+    if trace is not None:
+        trace.rows += 1
+
+
+def instrument():
+    """Install the hooks on every engine and mapper; safe to call more than once."""
+    hooks = {"before_cursor_execute": _before_cursor_execute, "after_cursor_execute": _after_cursor_execute}
+    for name, hook in hooks.items():
+        if not event.contains(Engine, name, hook):
+            event.listen(Engine, name, hook)
+    if not event.contains(Mapper, "load", _on_load):
+        event.listen(Mapper, "load", _on_load)
+
+
+# -----------------------
+# Schema extension
+# -----------------------
+class Tracing(SchemaExtension):
+    def __init__(self, *, execution_context=None):
+        self.trace: Optional[Trace] = None
+        self.debug = False
+
+    def on_operation(self) -> Iterator[None]:
+        context = self.execution_context.context
+        self.debug = isinstance(context, dict) and bool(context.get("debug"))
+        self.trace = Trace()
+        token = current_trace.set(self.trace)
+        try:
+            yield
+        finally:
+            try:
+                current_trace.reset(token)
+            except ValueError:  # a subscription can be closed from another task than the one it started in
+                pass
+            self.trace.finish()
+            operation = self._operation_type()
+            OPERATION_SECONDS.observe(self.trace.duration, operation)
+            SQL_STATEMENTS.observe(self.trace.statements, operation)
+            SQL_SECONDS.observe(self.trace.sql_seconds, operation)
+            ROWS_LOADED.observe(self.trace.rows, operation)
+
+    def _operation_type(self) -> str:
+        try:
+            return self.execution_context.operation_type.value
+        except RuntimeError:  # the document did not parse
+            return "invalid"
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        result = _next(root, info, *args, **kwargs)
+        # default resolvers are attribute reads; only async resolvers do work worth timing
+        if not inspect.isawaitable(result):
+            return result
+        return self._timed(result, info)
+
+    async def _timed(self, awaitable, info):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            elapsed = time.perf_counter() - started
+            field = f"{info.parent_type.name}.{info.field_name}"
+            RESOLVER_SECONDS.observe(elapsed, field)
+            if self.debug:
+                path = ".".join(map(str, info.path.as_list()))
+                self.trace.resolvers.append({"path": path, "field": field, "durationMs": round(elapsed * 1000, 3)})
+
+    def get_results(self) -> Dict[str, dict]:
+        if self.trace is None or not self.debug:
+            return {}
+        return {"tracing": self.trace.as_dict()}
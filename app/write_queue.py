@@ -0,0 +1,167 @@
+# app/write_queue.py
+"""Group commit: single-row mutations of many requests in one transaction.
+
+With `WRITE_QUEUE=1` the Mutation resolvers don't commit on their own
+request's session. They hand their `app.writes` function to the writer of
+their engine: one asyncio task, so the process never has two of its own
+transactions competing for SQLite's write lock. The writer takes every
+write queued by then (up to `WRITE_BATCH_SIZE`, waiting up to
+`WRITE_BATCH_WINDOW_MS` for more when the batch is not full) and runs them
+in one `BEGIN IMMEDIATE` transaction: one lock acquisition and one commit
+(one fsync) for the whole group.
+
+Each write runs in a SAVEPOINT. One that raises (a 404 for a missing
+owner, a 400 for a second driver licence) is rolled back alone and only
+its caller gets the error; the rest of the group still commits. If the
+commit itself fails, every caller of the group gets that error.
+
+Each write runs in a copy of its caller's context, so `app.tracing`
+charges its statements to the request that submitted it. The writer task
+itself runs in an empty context. Each event loop gets a writer of its own.
+"""
+import asyncio
+import contextvars
+import os
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.db import Database, close_session, new_session
+from app.entity_cache import entity_cache, watch
+from app.response_cache import response_cache, track_writes
+from app.writes import GROUP
+
+
+WRITE_QUEUE_ENABLED = os.environ.get("WRITE_QUEUE", "0") == "1"
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", "128"))
+WRITE_BATCH_WINDOW_MS = float(os.environ.get("WRITE_BATCH_WINDOW_MS", "0"))
+
+# (write function, its arguments after the session, the caller's context, the caller's future)
+Job = Tuple[Callable, tuple, contextvars.Context, asyncio.Future]
+# (returned row, raised error)
+Outcome = Tuple[object, Optional[BaseException]]
+
+
+def run_group(session: Session, jobs: List[Job]) -> List[Outcome]:
+    """Run `jobs` in one transaction, each in a savepoint of its own, and commit once."""
+    invalidated = session.info[GROUP] = []
+    if session.bind.dialect.name == "sqlite":
+        # pysqlite would only BEGIN at the first write, and a SAVEPOINT opened
+        # outside a transaction commits on RELEASE; take the write lock up front
+        session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+    outcomes: List[Outcome] = []
+    for fn, args, context, _ in jobs:
+        try:
+            outcomes.append((context.run(run_job, session, fn, args), None))
+        except Exception as error:
+            outcomes.append((None, error))
+    session.commit()
+    if invalidated:
+        entity_cache.invalidate(invalidated)
+    return outcomes
+
+
+def run_job(session: Session, fn: Callable, args: tuple):
+    with session.begin_nested():
+        return fn(session, *args)
+
+
+class WriteQueue:
+    """The writers of one engine: one task per event loop that submitted to it."""
+
+    def __init__(self, engine, batch_size: int = WRITE_BATCH_SIZE, window_ms: float = WRITE_BATCH_WINDOW_MS):
+        if batch_size < 1:
+            raise ValueError("WRITE_BATCH_SIZE must be positive")
+        # weak, so the queue (kept per engine in `_queues`) does not keep its engine alive
+        self._engine = weakref.ref(engine)
+        self.batch_size = batch_size
+        self.window = window_ms / 1000
+        self.groups = 0
+        # event loop -> (its queue, its writer task); a queue's futures belong to its loop
+        self._workers: Dict[asyncio.AbstractEventLoop, Tuple[asyncio.Queue, asyncio.Task]] = {}
+
+    async def submit(self, fn: Callable, *args):
+        """Run `fn(session, *args)` in the next group and return its result once the group committed."""
+        loop = asyncio.get_running_loop()
+        queue, task = self._workers.get(loop, (None, None))
+        if task is None or task.done():
+            for closed in [other for other in self._workers if other.is_closed()]:
+                del self._workers[closed]
+            queue = asyncio.Queue()
+            # not a copy of this caller's context: the writer serves every caller
+            task = loop.create_task(self._work(queue), context=contextvars.Context())
+            self._workers[loop] = (queue, task)
+        future = loop.create_future()
+        queue.put_nowait((fn, args, contextvars.copy_context(), future))
+        return await future
+
+    async def close(self):
+        """Stop the writer of the running event loop."""
+        _, task = self._workers.pop(asyncio.get_running_loop(), (None, None))
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _next_group(self, queue: asyncio.Queue) -> List[Job]:
+        loop = asyncio.get_running_loop()
+        jobs = [await queue.get()]
+        deadline = loop.time() + self.window
+        while len(jobs) < self.batch_size:
+            if not queue.empty():
+                jobs.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                jobs.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return jobs
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            jobs = await self._next_group(queue)
+            session = new_session(self._engine())
+            db = Database(session)
+            # the same cache hooks as a request's session, see `app.main.build_context`
+            watch(db.sync_session)
+            if response_cache.enabled:
+                track_writes(db.sync_session)
+            try:
+                outcomes = await db.run(run_group, jobs)
+            except Exception as error:  # the commit failed: nothing of the group was written
+                outcomes = [(None, error)] * len(jobs)
+            finally:
+                await close_session(session)
+            self.groups += 1
+            for (*_, future), (result, error) in zip(jobs, outcomes):
+                if future.done():  # the caller went away
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+
+_queues: "weakref.WeakKeyDictionary[object, WriteQueue]" = weakref.WeakKeyDictionary()
+
+
+def queue_for(engine) -> WriteQueue:
+    queue = _queues.get(engine)
+    if queue is None:
+        queue = _queues[engine] = WriteQueue(engine)
+    return queue
+
+
+async def submit(engine, fn: Callable, *args):
+    return await queue_for(engine).submit(fn, *args)
+
+
+async def close_all():
+    for queue in list(_queues.values()):
+        await queue.close()
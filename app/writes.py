@@ -0,0 +1,136 @@
+# app/writes.py
+"""Single-row writes behind the Mutation resolvers.
+
+Each write checks all of its foreign keys with one `SELECT EXISTS(...), ...`
+statement and gets the written row back from `INSERT/UPDATE ... RETURNING`,
+so a mutation costs at most two statements plus the commit, with no
+`session.get` per reference and no `refresh` afterwards.
+
+Transactions end through `commit_write` / `rollback_write`: on a session
+of the write queue (`app.write_queue`) the group's writer commits, once
+for every write of the group, and undoes a failed write by its savepoint.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import exists, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.entity_cache import Key, entity_cache
+from app.models import User, House, Garage, Car, DriverLicence
+
+
+# (model, id, error message when the row does not exist)
+Check = Tuple[type, Optional[int], str]
+
+# session.info key marking a write-queue session; holds the rows to invalidate once the group commits
+GROUP = "write_group"
+
+
+def commit_write(session: Session, invalidated: Sequence[Key] = ()):
+    """Commit, then drop `invalidated` rows from the entity cache; in a group both wait for the group's commit."""
+    if GROUP in session.info:
+        session.info[GROUP].extend(invalidated)
+        return
+    session.commit()
+    if invalidated:
+        entity_cache.invalidate(invalidated)
+
+
+def rollback_write(session: Session):
+    # in a group, the failed write's savepoint is rolled back by the writer
+    if GROUP not in session.info:
+        session.rollback()
+
+
+def require(session: Session, *checks: Check):
+    """Raise the first failing check's 404, testing every reference in one statement.
+
+    Rows are never deleted, so references found in the entity cache need no query.
+    """
+    checks = tuple(check for check in checks if (check[0].__tablename__, check[1]) not in entity_cache)
+    if not checks:
+        return
+    found = session.execute(select(*[exists().where(model.id == id) for model, id, _ in checks])).one()
+    for (_, _, message), ok in zip(checks, found):
+        if not ok:
+            raise HTTPException(status_code=404, detail=message)
+
+
+def insert_returning(session: Session, model, /, **values) -> Row:
+    table = model.__table__
+    row = session.execute(insert(table).values(**values).returning(*table.c)).one()
+    commit_write(session)
+    return row
+
+
+def update_returning(session: Session, model, id: int, /, **values) -> Row:
+    table = model.__table__
+    row = session.execute(update(table).where(table.c.id == id).values(**values).returning(*table.c)).one()
+    commit_write(session, [(table.name, id)])
+    return row
+
+
+# -----------------------
+# Mutations
+# -----------------------
+def create_user(session: Session, email: str, is_active: bool) -> Row:
+    return insert_returning(session, User, email=email, is_active=is_active)
+
+
+def create_house(session: Session, title: str, owner_id: Optional[int]) -> Row:
+    checks: List[Check] = []
+    if owner_id:
+        checks.append((User, owner_id, "Owner not found"))
+    require(session, *checks)
+    return insert_returning(session, House, title=title, owner_id=owner_id)
+
+
+def create_garage(session: Session, title: str, owner_id: Optional[int], house_id: Optional[int]) -> Row:
+    checks: List[Check] = []
+    if owner_id:
+        checks.append((User, owner_id, "Owner not found"))
+    if house_id:
+        checks.append((House, house_id, "House not found"))
+    require(session, *checks)
+    return insert_returning(session, Garage, title=title, owner_id=owner_id, house_id=house_id)
+
+
+def create_car(session: Session, model: str, owner_id: Optional[int], garage_id: Optional[int]) -> Row:
+    checks: List[Check] = []
+    if owner_id:
+        checks.append((User, owner_id, "Owner not found"))
+    if garage_id:
+        checks.append((Garage, garage_id, "Garage not found"))
+    require(session, *checks)
+    return insert_returning(session, Car, model=model, owner_id=owner_id, garage_id=garage_id)
+
+
+def create_driver_license(session: Session, number: str, user_id: int) -> Row:
+    require(session, (User, user_id, "User not found"))
+    try:
+        # one licence per user is enforced by the unique index on user_id
+        return insert_returning(session, DriverLicence, number=number, user_id=user_id)
+    except IntegrityError:
+        rollback_write(session)
+        raise HTTPException(status_code=400, detail="User already has driver licence")
+
+
+def assign_garage_to_house(session: Session, garage_id: int, house_id: Optional[int]) -> Row:
+    checks: List[Check] = [(Garage, garage_id, "Garage not found")]
+    if house_id is not None:
+        checks.append((House, house_id, "House not found"))
+    require(session, *checks)
+    return update_returning(session, Garage, garage_id, house_id=house_id)
+
+
+def transfer_car(session: Session, car_id: int, new_owner_id: Optional[int], new_garage_id: Optional[int]) -> Row:
+    checks: List[Check] = [(Car, car_id, "Car not found")]
+    if new_owner_id is not None:
+        checks.append((User, new_owner_id, "New owner not found"))
+    if new_garage_id is not None:
+        checks.append((Garage, new_garage_id, "Garage not found"))
+    require(session, *checks)
+    return update_returning(session, Car, car_id, owner_id=new_owner_id, garage_id=new_garage_id)
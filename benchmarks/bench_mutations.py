@@ -0,0 +1,151 @@
+"""Per-mutation latency of the write path, before and after RETURNING writes.
+
+"before" replays the original resolver bodies (a `session.get` per
+reference, `commit()`, then `refresh()`); "after" calls app.writes, which
+checks every reference in one statement and reads the row back through
+RETURNING. Both run against the same file database in WAL mode.
+
+    python -m benchmarks.bench_mutations --iterations 2000 --output bench_mutations.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app import writes
+from app.db import init_db, make_engine
+from app.models import User, House, Garage, Car
+from testing.generators.graph_generator import create_user_graph
+
+
+# -----------------------
+# Original write path
+# -----------------------
+def legacy_create_house(session: Session, title, owner_id):
+    if owner_id and not session.get(User, owner_id):
+        raise HTTPException(status_code=404, detail="Owner not found")
+    h = House(title=title, owner_id=owner_id)
+    session.add(h)
+    session.commit()
+    session.refresh(h)
+    return h
+
+
+def legacy_create_garage(session: Session, title, owner_id, house_id):
+    if owner_id and not session.get(User, owner_id):
+        raise HTTPException(status_code=404, detail="Owner not found")
+    if house_id and not session.get(House, house_id):
+        raise HTTPException(status_code=404, detail="House not found")
+    g = Garage(title=title, owner_id=owner_id, house_id=house_id)
+    session.add(g)
+    session.commit()
+    session.refresh(g)
+    return g
+
+
+def legacy_create_car(session: Session, model, owner_id, garage_id):
+    if owner_id and not session.get(User, owner_id):
+        raise HTTPException(status_code=404, detail="Owner not found")
+    if garage_id and not session.get(Garage, garage_id):
+        raise HTTPException(status_code=404, detail="Garage not found")
+    c = Car(model=model, owner_id=owner_id, garage_id=garage_id)
+    session.add(c)
+    session.commit()
+    session.refresh(c)
+    return c
+
+
+def legacy_transfer_car(session: Session, car_id, new_owner_id, new_garage_id):
+    c = session.get(Car, car_id)
+    if not c:
+        raise HTTPException(status_code=404, detail="Car not found")
+    if new_owner_id is not None and not session.get(User, new_owner_id):
+        raise HTTPException(status_code=404, detail="New owner not found")
+    if new_garage_id is not None and not session.get(Garage, new_garage_id):
+        raise HTTPException(status_code=404, detail="Garage not found")
+    c.owner_id = new_owner_id
+    c.garage_id = new_garage_id
+    session.add(c)
+    session.commit()
+    session.refresh(c)
+    return c
+
+
+# name -> (before, after, arguments for iteration i)
+CASES = {
+    "createHouse": (legacy_create_house, writes.create_house, lambda i: ("House", 1 + i % 50)),
+    "createGarage": (legacy_create_garage, writes.create_garage, lambda i: ("Garage", 1 + i % 50, 1 + i % 50)),
+    "createCar": (legacy_create_car, writes.create_car, lambda i: ("Car", 1 + i % 50, 1 + i % 50)),
+    "transferCar": (legacy_transfer_car, writes.transfer_car, lambda i: (1 + i % 100, 1 + (i + 1) % 50, 1 + i % 50)),
+}
+
+
+def measure(engine, fn, arguments, iterations: int) -> dict:
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    timings = []
+    try:
+        for i in range(iterations):
+            # a fresh session per call, like one request per mutation
+            with Session(engine) as session:
+                start = time.perf_counter()
+                fn(session, *arguments(i))
+                timings.append(time.perf_counter() - start)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95)] * 1000,
+        "statements_per_call": statements / iterations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{tmp}/bench.db", mode="sync")
+        asyncio.run(init_db(engine))
+        with Session(engine) as session:
+            create_user_graph(session, users=50)
+
+        results = {}
+        for name, (before, after, arguments) in CASES.items():
+            results[name] = {
+                "before": measure(engine, before, arguments, args.iterations),
+                "after": measure(engine, after, arguments, args.iterations),
+            }
+        engine.dispose()
+
+    print(f"{'mutation':<14} {'':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'stmts':>6}")
+    for name, result in results.items():
+        for label in ("before", "after"):
+            r = result[label]
+            print(
+                f"{name:<14} {label:>6} {r['mean_ms']:>9.3f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f}"
+                f" {r['statements_per_call']:>6.1f}"
+            )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Latency and throughput of the README operations, in process over ASGI.
+
+Seeds a file database with `--users` user graphs, then sends each operation
+through the FastAPI app with httpx's ASGI transport at every `--concurrency`
+level. Reports p50/p95/p99 latency, requests per second and SQL statements
+per request; `--output` saves the results as JSON so runs can be compared.
+
+    python -m benchmarks.bench_operations --users 1000 --concurrency 1 8 32 --requests 500 --output bench.json
+    python -m benchmarks.bench_operations --users 1000 --baseline bench.json   # exits 1 on a regression
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app import db
+from app.db import get_engine, get_read_engine, init_db, make_engine, read_engines_of
+from app.main import app
+from testing.generators.graph_generator import create_user_graph
+
+
+# -----------------------
+# Operations (README examples)
+# -----------------------
+ALL_API_DATA = """
+query {
+  allUsers {
+    id email isActive
+    houses { id title }
+    garages { id title }
+    cars { id model }
+    driverLicense { id number }
+  }
+}
+"""
+
+USER_TREE = """
+query ($id: Int!) {
+  user(id: $id) {
+    email
+    houses { id title garages { id title cars { id model } } }
+  }
+}
+"""
+
+ALIASED_USERS = """
+query ($a: Int!, $b: Int!) {
+  Alex: user(id: $a) { id email }
+  Bob: user(id: $b) { id email isActive }
+}
+"""
+
+FRAGMENTS = """
+query ($a: Int!, $b: Int!) {
+  Alex: user(id: $a) { ...UserInfo }
+  Bob: user(id: $b) { ...UserInfo }
+}
+
+fragment UserInfo on UserType { id email isActive }
+"""
+
+CREATE_USER = "mutation ($email: String!) { createUser(email: $email) { id email isActive } }"
+
+CREATE_HOUSE = """
+mutation ($ownerId: Int!) {
+  createHouse(title: "Main House", ownerId: $ownerId) {
+    id title owner { id email } garages { id title }
+  }
+}
+"""
+
+CREATE_CAR = """
+mutation ($ownerId: Int!, $garageId: Int!) {
+  createCar(model: "Bench", ownerId: $ownerId, garageId: $garageId) { id model owner { id } garage { id } }
+}
+"""
+
+
+def operations(users: int) -> Dict[str, Callable[[int], dict]]:
+    """name -> payload for the i-th request; ids cycle over the seeded users."""
+
+    def user_id(i: int) -> int:
+        return 1 + i % users
+
+    return {
+        "allApiData": lambda i: {"query": ALL_API_DATA},
+        "userTree": lambda i: {"query": USER_TREE, "variables": {"id": user_id(i)}},
+        "aliasedUsers": lambda i: {"query": ALIASED_USERS, "variables": {"a": user_id(i), "b": user_id(i + 1)}},
+        "fragments": lambda i: {"query": FRAGMENTS, "variables": {"a": user_id(i), "b": user_id(i + 1)}},
+        "createUser": lambda i: {"query": CREATE_USER, "variables": {"email": f"bench{time.time_ns()}-{i}@mail.com"}},
+        "createHouse": lambda i: {"query": CREATE_HOUSE, "variables": {"ownerId": user_id(i)}},
+        # create_user_graph gives every user one garage with the same id
+        "createCar": lambda i: {"query": CREATE_CAR, "variables": {"ownerId": user_id(i), "garageId": user_id(i)}},
+    }
+
+
+# -----------------------
+# Measurement
+# -----------------------
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run_level(client: httpx.AsyncClient, payload: Callable[[int], dict], requests: int, concurrency: int) -> dict:
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            start = time.perf_counter()
+            response = await client.post("/graphql", json=payload(i))
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200 or response.json().get("errors"):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def run(args, engine, only: Optional[List[str]]) -> dict:
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    if db.READ_ROUTING:
+        get_read_engine(engine)  # opens the read engines queries run on, see app.routing
+    engines = {getattr(e, "sync_engine", e) for e in (engine, *read_engines_of(engine))}
+    for sync_engine in engines:
+        event.listen(sync_engine, "before_cursor_execute", count)
+    results: Dict[str, dict] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, payload in operations(args.users).items():
+            if only and name not in only:
+                continue
+            results[name] = {}
+            for concurrency in args.concurrency:
+                # warm up (document cache, connection pool) outside the measurement
+                for i in range(min(10, args.requests)):
+                    await client.post("/graphql", json=payload(i))
+                statements = 0
+                level = await run_level(client, payload, args.requests, concurrency)
+                level["sql_per_request"] = statements / args.requests
+                results[name][str(concurrency)] = level
+                print(
+                    f"{name:<14} c={concurrency:<4} {level['rps']:>9.1f} rps"
+                    f" p50 {level['p50_ms']:>8.2f} p95 {level['p95_ms']:>8.2f} p99 {level['p99_ms']:>8.2f} ms"
+                    f" {level['sql_per_request']:>6.1f} sql/req {level['errors']:>4} errors"
+                )
+    for sync_engine in engines:
+        event.remove(sync_engine, "before_cursor_execute", count)
+    return results
+
+
+def regressions(baseline: dict, results: dict, tolerance: float) -> List[str]:
+    """Operations/levels whose p95 or throughput got worse than `baseline` by more than `tolerance`."""
+    found = []
+    for name, levels in results.items():
+        for concurrency, level in levels.items():
+            before = baseline["results"].get(name, {}).get(concurrency)
+            if before is None:
+                continue
+            if level["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                found.append(f"{name} c={concurrency}: p95 {before['p95_ms']:.2f} -> {level['p95_ms']:.2f} ms")
+            if level["rps"] < before["rps"] * (1 - tolerance):
+                found.append(f"{name} c={concurrency}: {before['rps']:.1f} -> {level['rps']:.1f} rps")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="user graphs to seed")
+    parser.add_argument("--requests", type=int, default=200, help="requests per operation and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync", help="DATABASE_MODE to run with")
+    parser.add_argument("--operation", action="append", help="only run these operations (repeatable)")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs --baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        seed_engine = make_engine(url, mode="sync")
+        asyncio.run(init_db(seed_engine))
+        with Session(seed_engine) as session:
+            create_user_graph(session, users=args.users)
+        seed_engine.dispose()
+
+        engine = make_engine(url, mode=args.mode)
+        app.dependency_overrides[get_engine] = lambda: engine
+        try:
+            results = asyncio.run(run(args, engine, args.operation))
+        finally:
+            app.dependency_overrides.clear()
+            for e in (engine, *read_engines_of(engine)):
+                if args.mode == "async":
+                    asyncio.run(e.dispose())
+                else:
+                    e.dispose()
+
+    settings = {"users": args.users, "requests": args.requests, "concurrency": args.concurrency, "mode": args.mode}
+    report = {"settings": settings, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.baseline:
+        found = regressions(json.loads(args.baseline.read_text()), results, args.tolerance)
+        for line in found:
+            print("REGRESSION", line)
+        if found:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
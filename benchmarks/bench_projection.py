@@ -0,0 +1,121 @@
+"""CPU time and memory of large list queries, lean read path vs ORM hydration.
+
+Seeds a file database with `--users` user graphs through the bulk seeder,
+then runs each operation in process on both read paths (`eager.LEAN_READS`
+on and off). For every run it reports CPU time per operation, the peak
+memory allocated while executing (tracemalloc, measured in a separate pass
+so it does not skew the timings) and the time to encode the response with
+json and with orjson.
+
+    python -m benchmarks.bench_projection --users 100000 --repeat 5 --output bench_projection.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict
+
+import orjson
+
+from app import eager, tracing
+from app.db import make_engine, new_session
+from app.main import build_context, schema
+from testing.generators.bulk_seeder import seed
+
+
+OPERATIONS = {
+    "userIds": "{ allUsers { id } }",
+    "userEmails": "{ allUsers { id email isActive } }",
+    "carModels": "{ allCars { id model } }",
+    "carPrefix": '{ allCars(where: {model: {startsWith: "T"}}) { id model } }',
+}
+
+
+def execute(engine, query: str) -> dict:
+    async def run():
+        session = new_session(engine)
+        try:
+            result = await schema.execute(query, context_value=build_context(session))
+        finally:
+            session.close()
+        assert result.errors is None, result.errors
+        return {"data": result.data}
+
+    return asyncio.run(run())
+
+
+def cpu_seconds(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.process_time()
+        fn()
+        samples.append(time.process_time() - start)
+    return statistics.median(samples)
+
+
+def peak_bytes(fn: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(engine, query: str, repeat: int) -> dict:
+    response = execute(engine, query)
+    return {
+        "rows": len(next(iter(response["data"].values()))),
+        "cpu_ms": cpu_seconds(lambda: execute(engine, query), repeat) * 1000,
+        "peak_mb": peak_bytes(lambda: execute(engine, query)) / 2**20,
+        "json_ms": cpu_seconds(lambda: json.dumps(response, separators=(",", ":")), repeat) * 1000,
+        "orjson_ms": cpu_seconds(lambda: orjson.dumps(response), repeat) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50_000, help="user graphs to seed (about 5.5 rows each)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per operation and path (median is kept)")
+    parser.add_argument("--operation", action="append", help="only run these operations (repeatable)")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    # whole-table reads are "slow"; keep EXPLAIN and logging out of the measurement
+    tracing.SLOW_QUERY_MS = float("inf")
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        seed(url, users=args.users, seed=0, workers=1)
+        engine = make_engine(url, mode="sync")
+        try:
+            for name, query in OPERATIONS.items():
+                if args.operation and name not in args.operation:
+                    continue
+                results[name] = {}
+                for path, lean in (("orm", False), ("lean", True)):
+                    eager.LEAN_READS = lean
+                    run = results[name][path] = measure(engine, query, args.repeat)
+                    print(
+                        f"{name:<11} {path:<5} {run['rows']:>8} rows {run['cpu_ms']:>9.1f} ms cpu"
+                        f" {run['peak_mb']:>8.1f} MB peak"
+                        f"  encode json {run['json_ms']:>7.1f} ms orjson {run['orjson_ms']:>6.1f} ms"
+                    )
+        finally:
+            eager.LEAN_READS = True
+            engine.dispose()
+
+    if args.output:
+        settings = {"users": args.users, "repeat": args.repeat}
+        args.output.write_text(json.dumps({"settings": settings, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Event delivery latency of subscriptions as the number of subscribers grows.
+
+For every `--subscribers` count, opens that many `carTransferred`
+subscriptions in process (each with a context of its own, as separate
+WebSocket connections would have), then runs the `transferCar` mutation
+`--events` times. Each event is awaited by every subscriber before the next
+mutation. Reports how long the mutation itself took (the publisher never
+waits for subscribers), and the delay from the start of the mutation to
+each subscriber's GraphQL result: p50/p95/p99 over all deliveries, and the
+time until the last subscriber had it.
+
+    python -m benchmarks.bench_subscriptions --subscribers 1 100 1000 5000 --events 50 --output bench_subscriptions.json
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from sqlmodel import Session
+
+from app import pubsub, tracing
+from app.db import init_db, make_engine, new_session
+from app.main import build_context, schema
+from app.pubsub import InProcessBroker
+from testing.generators.graph_generator import create_user_graph
+
+
+SUBSCRIPTION = "subscription { carTransferred { id model } }"
+TRANSFER = "mutation ($owner: Int!) { transferCar(carId: 1, newOwnerId: $owner) { id } }"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run(engine, subscribers: int, events: int) -> dict:
+    broker = InProcessBroker(queue_size=max(events, 1))
+    previous = pubsub.set_broker(broker)
+    sessions = [new_session(engine) for _ in range(subscribers)]
+    streams = [await schema.subscribe(SUBSCRIPTION, context_value=build_context(s)) for s in sessions]
+    assert all(hasattr(stream, "__anext__") for stream in streams), streams[0]
+    publisher = new_session(engine)
+    delays: List[float] = []
+    last: List[float] = []
+    mutation: List[float] = []
+    try:
+        for i in range(events):
+            received = [asyncio.ensure_future(anext(stream)) for stream in streams]
+            while broker.subscriber_count(pubsub.CAR_TRANSFERRED) < subscribers:
+                await asyncio.sleep(0)  # first round: let every subscription register
+            arrivals = []
+            for future in received:
+                future.add_done_callback(lambda _: arrivals.append(time.perf_counter()))
+
+            started = time.perf_counter()
+            result = await schema.execute(TRANSFER, variable_values={"owner": 1 + i % 2}, context_value=build_context(publisher))
+            mutation.append(time.perf_counter() - started)
+            assert result.errors is None, result.errors
+            results = await asyncio.gather(*received)
+            assert all(r.errors is None for r in results), results[0].errors
+
+            delays.extend(arrival - started for arrival in arrivals)
+            last.append(max(arrivals) - started)
+    finally:
+        for stream in streams:
+            await stream.aclose()
+        for session in sessions + [publisher]:
+            session.close()
+        pubsub.set_broker(previous)
+
+    delays.sort()
+    return {
+        "mutation_ms": sorted(mutation)[len(mutation) // 2] * 1000,
+        "p50_ms": percentile(delays, 0.50) * 1000,
+        "p95_ms": percentile(delays, 0.95) * 1000,
+        "p99_ms": percentile(delays, 0.99) * 1000,
+        "all_delivered_ms": sorted(last)[len(last) // 2] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 100, 1000, 5000])
+    parser.add_argument("--events", type=int, default=50, help="mutations per subscriber count")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    tracing.SLOW_QUERY_MS = float("inf")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{tmp}/bench.db", mode="sync")
+        asyncio.run(init_db(engine))
+        with Session(engine) as session:
+            create_user_graph(session, users=2)
+        try:
+            for subscribers in args.subscribers:
+                level = results[str(subscribers)] = asyncio.run(run(engine, subscribers, args.events))
+                print(
+                    f"{subscribers:>6} subscribers  mutation {level['mutation_ms']:>6.2f} ms"
+                    f"  delivery p50 {level['p50_ms']:>8.2f} p95 {level['p95_ms']:>8.2f} p99 {level['p99_ms']:>8.2f}"
+                    f"  all delivered {level['all_delivered_ms']:>8.2f} ms"
+                )
+        finally:
+            engine.dispose()
+
+    if args.output:
+        settings = {"subscribers": args.subscribers, "events": args.events}
+        args.output.write_text(json.dumps({"settings": settings, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
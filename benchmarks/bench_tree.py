@@ -0,0 +1,131 @@
+"""Query count and latency of deep `user -> houses -> garages -> cars` trees.
+
+Seeds `--users` users, each owning `--houses` houses of `--garages` garages
+of `--cars` cars, then fetches every user's whole tree (README example 6)
+with the single-JOIN tree loader and with one loader query per level
+(`eager.TREE_READS` off), in process. Reports SQL statements per request and
+p50/p95 latency for each tree size given.
+
+    python -m benchmarks.bench_tree --users 20 --houses 10 --garages 100 --cars 10 --requests 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from sqlalchemy import event, insert
+
+from app import eager, tracing
+from app.db import init_db, make_engine, new_session
+from app.main import build_context, schema
+from app.models import User, House, Garage, Car
+
+
+USER_TREE = """
+query ($id: Int!) {
+  user(id: $id) {
+    email
+    houses { id title garages { id title cars { id model } } }
+  }
+}
+"""
+
+
+def seed_trees(engine, users: int, houses: int, garages: int, cars: int):
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": u, "email": f"tree{u}@mail.com"} for u in range(1, users + 1)])
+        house_rows, garage_rows, car_rows = [], [], []
+        for u in range(1, users + 1):
+            for _ in range(houses):
+                house_rows.append({"id": len(house_rows) + 1, "title": f"House {len(house_rows)}", "owner_id": u})
+                for _ in range(garages):
+                    garage_id = len(garage_rows) + 1
+                    garage_rows.append({"id": garage_id, "title": f"Garage {garage_id}", "owner_id": u, "house_id": len(house_rows)})
+                    car_rows.extend(
+                        {"model": f"Model {garage_id}-{c}", "owner_id": u, "garage_id": garage_id} for c in range(cars)
+                    )
+        conn.execute(insert(House), house_rows)
+        conn.execute(insert(Garage), garage_rows)
+        conn.execute(insert(Car), car_rows)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def run(engine, users: int, requests: int) -> dict:
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    async def fetch(user_id: int):
+        session = new_session(engine)
+        try:
+            result = await schema.execute(USER_TREE, variable_values={"id": user_id}, context_value=build_context(session))
+        finally:
+            session.close()
+        assert result.errors is None, result.errors
+
+    asyncio.run(fetch(1))  # warm up
+    event.listen(engine, "before_cursor_execute", count)
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        asyncio.run(fetch(1 + i % users))
+        latencies.append(time.perf_counter() - start)
+    event.remove(engine, "before_cursor_execute", count)
+
+    latencies.sort()
+    return {
+        "sql_per_request": statements / requests,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--houses", type=int, default=5, help="houses per user")
+    parser.add_argument("--garages", type=int, nargs="+", default=[1, 10, 100], help="garages per house (one tree size each)")
+    parser.add_argument("--cars", type=int, default=10, help="cars per garage")
+    parser.add_argument("--requests", type=int, default=30, help="tree requests per size and strategy")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    tracing.SLOW_QUERY_MS = float("inf")
+    results = {}
+    for garages in args.garages:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(f"sqlite:///{tmp}/bench.db", mode="sync")
+            asyncio.run(init_db(engine))
+            seed_trees(engine, args.users, args.houses, garages, args.cars)
+            size = args.houses * garages * args.cars
+            results[str(garages)] = {}
+            try:
+                for strategy, tree in (("per_level", False), ("join", True)):
+                    eager.TREE_READS = tree
+                    level = results[str(garages)][strategy] = run(engine, args.users, args.requests)
+                    print(
+                        f"{args.houses}x{garages}x{args.cars} ({size} cars/user) {strategy:<9}"
+                        f" {level['sql_per_request']:>4.1f} sql/req"
+                        f" p50 {level['p50_ms']:>8.2f} p95 {level['p95_ms']:>8.2f} ms"
+                    )
+            finally:
+                eager.TREE_READS = True
+                engine.dispose()
+
+    if args.output:
+        settings = {k: getattr(args, k) for k in ("users", "houses", "garages", "cars", "requests")}
+        args.output.write_text(json.dumps({"settings": settings, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
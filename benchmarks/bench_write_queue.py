@@ -0,0 +1,104 @@
+"""Mutation throughput with and without the group-commit write queue.
+
+Seeds a file database with `--users` user graphs, then sends `--requests`
+`createCar` mutations through the FastAPI app over httpx's ASGI transport
+at every `--concurrency` level, once committing on each request's own
+session (`WRITE_QUEUE=0`) and once through the write queue. Reports
+requests per second, p50/p95/p99 latency and commits per request, which
+shows how many writes each group commit carried.
+
+    python -m benchmarks.bench_write_queue --concurrency 1 16 128 --requests 1000 --output bench_write_queue.json
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+import httpx
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app import tracing, write_queue
+from app.db import get_engine, init_db, make_engine
+from app.main import app
+from benchmarks.bench_operations import CREATE_CAR, run_level
+from testing.generators.graph_generator import create_user_graph
+
+
+async def run(args, engine) -> dict:
+    commits = 0
+
+    def count(*_):
+        nonlocal commits
+        commits += 1
+
+    def payload(i: int) -> dict:
+        user_id = 1 + i % args.users
+        # create_user_graph gives every user one garage with the same id
+        return {"query": CREATE_CAR, "variables": {"ownerId": user_id, "garageId": user_id}}
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "commit", count)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for queued in (False, True):
+                write_queue.WRITE_QUEUE_ENABLED = queued
+                name = "queue" if queued else "direct"
+                results[name] = {}
+                for concurrency in args.concurrency:
+                    for i in range(min(10, args.requests)):
+                        await client.post("/graphql", json=payload(i))
+                    commits = 0
+                    level = await run_level(client, payload, args.requests, concurrency)
+                    level["commits_per_request"] = commits / args.requests
+                    results[name][str(concurrency)] = level
+                    print(
+                        f"{name:<7} c={concurrency:<4} {level['rps']:>9.1f} rps"
+                        f" p50 {level['p50_ms']:>8.2f} p95 {level['p95_ms']:>8.2f} p99 {level['p99_ms']:>8.2f} ms"
+                        f" {level['commits_per_request']:>6.3f} commits/req {level['errors']:>4} errors"
+                    )
+            await write_queue.close_all()
+    finally:
+        event.remove(sync_engine, "commit", count)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="user graphs to seed")
+    parser.add_argument("--requests", type=int, default=1000, help="mutations per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 128])
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync", help="DATABASE_MODE to run with")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    args = parser.parse_args()
+
+    tracing.SLOW_QUERY_MS = float("inf")
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        seed_engine = make_engine(url, mode="sync")
+        asyncio.run(init_db(seed_engine))
+        with Session(seed_engine) as session:
+            create_user_graph(session, users=args.users)
+        seed_engine.dispose()
+
+        engine = make_engine(url, mode=args.mode)
+        app.dependency_overrides[get_engine] = lambda: engine
+        try:
+            results = asyncio.run(run(args, engine))
+        finally:
+            app.dependency_overrides.clear()
+            if args.mode == "async":
+                asyncio.run(engine.dispose())
+            else:
+                engine.dispose()
+
+    if args.output:
+        settings = {"users": args.users, "requests": args.requests, "concurrency": args.concurrency, "mode": args.mode}
+        args.output.write_text(json.dumps({"settings": settings, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,156 @@
+import asyncio
+import os
+
 import pytest
-import requests
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.db import get_engine, make_engine, read_engines_of, set_engine
+from app.entity_cache import entity_cache
+from app.main import app, build_context, schema
+from app.response_cache import response_cache
 
 
-BASE_URL = "http://localhost:8000/graphql"
+@pytest.fixture(scope="session")
+def app_engine(tmp_path_factory):
+    """A database of this pytest(-xdist) worker's own, installed as the application's engine."""
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    engine = make_engine(f"sqlite:///{tmp_path_factory.mktemp('db') / f'{worker}.db'}")
+    previous = set_engine(engine)
+    yield engine
+    set_engine(previous)
 
 
 @pytest.fixture(scope="session")
-def graphql_client():
-    def _post(query: str, variables: dict = None, headers: dict = None):
-        payload = {"query": query}
-        if variables:
-            payload["variables"] = variables
-        response = requests.post(BASE_URL, json=payload, headers=headers or {})
-        response.raise_for_status()
-        return response.json()
-
-    return _post
+def graphql_client(app_engine):
+    """Posts operations to the app in-process over ASGI; no server needs to be running."""
+    # entering the client runs the app's lifespan, which creates the tables
+    with TestClient(app) as client:
+
+        def _post(query: str, variables: dict = None, headers: dict = None):
+            payload = {"query": query}
+            if variables:
+                payload["variables"] = variables
+            response = client.post("/graphql", json=payload, headers=headers or {})
+            response.raise_for_status()
+            return response.json()
+
+        yield _post
+        # async connections belong to the client's event loop
+        for engine in (app_engine, *read_engines_of(app_engine)):
+            if isinstance(engine, AsyncEngine):
+                client.portal.call(engine.dispose)
+            else:
+                engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    """Every test gets a fresh database, so cached rows and responses must not leak between tests."""
+    monkeypatch.setattr(response_cache, "enabled", False)
+    entity_cache.clear()
+    yield
+    response_cache.clear()
+    entity_cache.clear()
+
+
+@pytest.fixture
+def db_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(db_engine):
+    with Session(db_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def client_engine(db_engine):
+    """The engine `client` runs the app on; override it in a module to use another database."""
+    return db_engine
+
+
+@pytest.fixture
+def client(client_engine):
+    """A TestClient on the app with `client_engine` as its engine."""
+    app.dependency_overrides[get_engine] = lambda: client_engine
+    try:
+        # entering the client runs the app's lifespan, which creates the tables
+        with TestClient(app) as client:
+            yield client
+            # async connections belong to the client's event loop; read engines belong to no fixture
+            for engine in (client_engine, *read_engines_of(client_engine)):
+                if isinstance(engine, AsyncEngine):
+                    client.portal.call(engine.dispose)
+                elif engine is not client_engine:
+                    engine.dispose()
+    finally:
+        app.dependency_overrides.clear()
+
+
+# the BEGIN IMMEDIATE and savepoints `app.write_queue` wraps writes in; not counted,
+# so a mutation sends the same statements with WRITE_QUEUE=1 as without
+TRANSACTION_CONTROL = ("BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK TO")
+
+
+@pytest.fixture
+def sql_counter_for():
+    """Starts collecting the SQL statements sent through an engine from now on."""
+    listeners = []
+
+    def _count(engine):
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if not statement.startswith(TRANSACTION_CONTROL):
+                statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        listeners.append((engine, _record))
+        return statements
+
+    yield _count
+    for engine, listener in listeners:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+@pytest.fixture
+def sql_counter(db_engine, sql_counter_for):
+    """Collects every SQL statement sent through `db_engine`."""
+    return sql_counter_for(db_engine)
+
+
+@pytest.fixture
+def execute_raw(db_session):
+    """Runs a GraphQL operation in-process against `db_session`, returning the full result."""
+
+    def _execute(query: str, variables: dict = None, extensions: dict = None):
+        return asyncio.run(
+            schema.execute(
+                query,
+                variable_values=variables,
+                context_value=build_context(db_session),
+                operation_extensions=extensions,
+            )
+        )
+
+    return _execute
+
+
+@pytest.fixture
+def execute(execute_raw):
+    """Runs a GraphQL operation in-process and returns its data, failing on errors."""
+
+    def _execute(query: str, variables: dict = None):
+        result = execute_raw(query, variables)
+        assert result.errors is None, f"GraphQL returned errors: {result.errors}"
+        return result.data
+
+    return _execute
@@ -0,0 +1,229 @@
+"""Fill the database with a large synthetic user graph, straight into the tables.
+
+Users are generated in fixed-size chunks, in parallel worker processes. Each
+chunk draws from its own `random.Random(seed, chunk)`, and Faker only fills
+small value pools once per process (names, domains, streets, words) that
+rows then pick from, so a run is reproducible for a given `--seed` and
+`--chunk-size` whatever the number of workers. Chunks are inserted in order
+with `executemany`, one transaction per chunk; ids are numbered locally
+by the workers and shifted by the table's current max id in SQL.
+
+Fan-out per user: 0-3 houses, 0-2 garages per house plus sometimes one
+garage on its own, 0-6 cars (most parked in one of the user's garages),
+and a driver licence for 80% of users.
+
+    python -m testing.generators.bulk_seeder --users 1000000 --seed 42 --workers 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from faker import Faker
+from sqlalchemy import text
+
+from app.db import init_db, make_engine, sqlite_url
+from app.models import User, House, Garage, Car, DriverLicence
+
+
+CHUNK_SIZE = 10_000
+POOL_SIZE = 500
+
+HOUSES_PER_USER = ((0, 1, 2, 3), (20, 55, 18, 7))
+GARAGES_PER_HOUSE = ((0, 1, 2), (30, 60, 10))
+CARS_PER_USER = ((0, 1, 2, 3, 4, 5, 6), (15, 40, 25, 10, 5, 3, 2))
+ACTIVE_RATIO = 0.9
+LICENCE_RATIO = 0.8
+STANDALONE_GARAGE_RATIO = 0.1
+PARKED_RATIO = 0.7
+
+CAR_MAKES = (
+    "Audi", "BMW", "Citroen", "Fiat", "Ford", "Honda", "Hyundai", "Kia", "Mazda", "Mercedes",
+    "Nissan", "Opel", "Peugeot", "Renault", "Skoda", "Tesla", "Toyota", "Volkswagen", "Volvo",
+)
+
+# columns in insert order; ids and foreign keys are chunk-local, see `insert_chunk`
+STATEMENTS = {
+    User.__tablename__: 'INSERT INTO "user" (id, email, is_active) VALUES (? + {user}, ?, ?)',
+    House.__tablename__: "INSERT INTO house (id, title, owner_id) VALUES (? + {house}, ?, ? + {user})",
+    Garage.__tablename__: "INSERT INTO garage (id, title, owner_id, house_id) VALUES (? + {garage}, ?, ? + {user}, ? + {house})",
+    Car.__tablename__: "INSERT INTO car (id, model, owner_id, garage_id) VALUES (? + {car}, ?, ? + {user}, ? + {garage})",
+    DriverLicence.__tablename__: "INSERT INTO driverlicence (id, number, user_id) VALUES (? + {driverlicence}, ?, ? + {user})",
+}
+
+
+class Pools(NamedTuple):
+    first_names: List[str]
+    last_names: List[str]
+    domains: List[str]
+    streets: List[str]
+    words: List[str]
+
+
+# this process's pools, and the seed they were drawn with
+_pools: Optional[Pools] = None
+_pools_seed: Optional[int] = None
+
+
+def make_pools(seed: int) -> Pools:
+    """Faker values drawn once and reused by every row, instead of one Faker call per row."""
+    fake = Faker()
+    fake.seed_instance(seed)
+    return Pools(
+        first_names=[fake.first_name().lower() for _ in range(POOL_SIZE)],
+        last_names=[fake.last_name().lower() for _ in range(POOL_SIZE)],
+        domains=sorted({fake.free_email_domain() for _ in range(50)}),
+        streets=[fake.street_name() for _ in range(POOL_SIZE)],
+        words=[fake.word().title() for _ in range(POOL_SIZE)],
+    )
+
+
+def _init_worker(seed: int):
+    global _pools, _pools_seed
+    _pools, _pools_seed = make_pools(seed), seed
+
+
+# -----------------------
+# Generation
+# -----------------------
+class Chunk(NamedTuple):
+    users: List[tuple]
+    houses: List[tuple]
+    garages: List[tuple]
+    cars: List[tuple]
+    licences: List[tuple]
+
+    def rows(self) -> Dict[str, List[tuple]]:
+        return {
+            "user": self.users,
+            "house": self.houses,
+            "garage": self.garages,
+            "car": self.cars,
+            "driverlicence": self.licences,
+        }
+
+
+def generate_chunk(args: Tuple[int, int, int, int]) -> Chunk:
+    """Rows for users `start + 1 .. start + count` (chunk number `index`), with ids counted from 1 within the chunk."""
+    seed, index, start, count = args
+    pools = _pools if _pools_seed == seed else make_pools(seed)
+    rng = random.Random(f"{seed}:{index}")
+    chunk = Chunk([], [], [], [], [])
+
+    house_counts = rng.choices(*HOUSES_PER_USER, k=count)
+    car_counts = rng.choices(*CARS_PER_USER, k=count)
+    firsts = rng.choices(pools.first_names, k=count)
+    lasts = rng.choices(pools.last_names, k=count)
+    domains = rng.choices(pools.domains, k=count)
+
+    for user in range(1, count + 1):
+        # the user's number in the run keeps emails and licence numbers unique
+        chunk.users.append(
+            (user, f"{firsts[user - 1]}.{lasts[user - 1]}.{start + user}@{domains[user - 1]}",
+             rng.random() < ACTIVE_RATIO)
+        )
+
+        garages = []
+        for _ in range(house_counts[user - 1]):
+            house = len(chunk.houses) + 1
+            street = rng.choice(pools.streets)
+            chunk.houses.append((house, f"{rng.randint(1, 300)} {street}", user))
+            for _ in range(rng.choices(*GARAGES_PER_HOUSE)[0]):
+                garages.append(len(chunk.garages) + 1)
+                chunk.garages.append((garages[-1], f"{street} garage {len(garages)}", user, house))
+        if rng.random() < STANDALONE_GARAGE_RATIO:
+            garages.append(len(chunk.garages) + 1)
+            chunk.garages.append((garages[-1], f"Garage {len(garages)}", user, None))
+
+        for _ in range(car_counts[user - 1]):
+            garage = rng.choice(garages) if garages and rng.random() < PARKED_RATIO else None
+            model = f"{rng.choice(CAR_MAKES)} {rng.choice(pools.words)}"
+            chunk.cars.append((len(chunk.cars) + 1, model, user, garage))
+
+        if rng.random() < LICENCE_RATIO:
+            chunk.licences.append((len(chunk.licences) + 1, f"DL-{start + user:09d}", user))
+    return chunk
+
+
+def chunks(seed: int, users: int, chunk_size: int) -> Iterator[Tuple[int, int, int, int]]:
+    for index, start in enumerate(range(0, users, chunk_size)):
+        yield seed, index, start, min(chunk_size, users - start)
+
+
+# -----------------------
+# Insertion
+# -----------------------
+def max_ids(conn) -> Dict[str, int]:
+    return {table: conn.execute(text(f'SELECT coalesce(max(id), 0) FROM "{table}"')).scalar() for table in STATEMENTS}
+
+
+def insert_chunk(conn, chunk: Chunk, offsets: Dict[str, int]):
+    """Insert `chunk`, shifting its local ids by `offsets` (NULL foreign keys stay NULL)."""
+    for table, rows in chunk.rows().items():
+        if rows:
+            conn.exec_driver_sql(STATEMENTS[table].format(**offsets), rows)
+    for table, rows in chunk.rows().items():
+        offsets[table] += len(rows)
+
+
+def seed(url: str, users: int, seed: int = 0, workers: int = 1, chunk_size: int = CHUNK_SIZE) -> Dict[str, int]:
+    """Append `users` user graphs to the database at `url`; returns rows inserted per table."""
+    engine = make_engine(url, mode="sync")
+    asyncio.run(init_db(engine))
+    inserted = dict.fromkeys(STATEMENTS, 0)
+    specs = list(chunks(seed, users, chunk_size))
+
+    with engine.connect() as conn:
+        # the data is consistent by construction; skip per-row checks and fsyncs
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        offsets = max_ids(conn)
+        conn.commit()
+
+        if workers > 1:
+            pool = Pool(workers, initializer=_init_worker, initargs=(seed,))
+        else:
+            pool = None
+            _init_worker(seed)  # chunks are generated in this process
+        try:
+            generated = pool.imap(generate_chunk, specs) if pool else map(generate_chunk, specs)
+            for chunk in generated:
+                insert_chunk(conn, chunk, offsets)
+                conn.commit()
+                for table, rows in chunk.rows().items():
+                    inserted[table] += len(rows)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+            # pooled connections get the engine's pragmas back
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+            conn.exec_driver_sql("PRAGMA synchronous=NORMAL")
+    engine.dispose()
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="users per generated chunk and transaction")
+    parser.add_argument("--database-url", default=sqlite_url)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    inserted = seed(args.database_url, args.users, args.seed, args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    total = sum(inserted.values())
+    for table, rows in inserted.items():
+        print(f"{table:<14} {rows:>12,}")
+    print(f"{'total':<14} {total:>12,} rows in {elapsed:.1f} s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
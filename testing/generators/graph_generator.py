@@ -0,0 +1,20 @@
+from sqlmodel import Session
+
+from app.models import User, House, Garage, Car, DriverLicence
+from testing.generators.user_email_generator import generate_user_email
+
+
+def create_user_graph(session: Session, users: int, cars_per_garage: int = 2) -> list:
+    """Creates `users` users, each owning a house with a garage full of cars and a licence."""
+    created = []
+    for i in range(users):
+        user = User(email=generate_user_email())
+        house = House(title=f"House {i}", owner=user)
+        garage = Garage(title=f"Garage {i}", owner=user, house=house)
+        for j in range(cars_per_garage):
+            Car(model=f"Model {i}-{j}", owner=user, garage=garage)
+        DriverLicence(number=f"DL-{i:06d}", owner=user)
+        session.add(user)
+        created.append(user)
+    session.commit()
+    return created
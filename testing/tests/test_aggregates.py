@@ -0,0 +1,108 @@
+import pytest
+from graphql import parse
+
+from app.main import schema
+from app.models import Car, Garage
+from app.response_cache import plan
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.aggregates
+
+
+COUNTS_QUERY = """
+    query {
+    allUsers {
+        id
+        houseCount
+        garageCount
+        carCount
+        houses { garageCount }
+        garages { carCount }
+    }
+    }
+"""
+
+STATS_QUERY = """
+    query {
+    stats { users activeUsers houses garages cars parkedCars driverLicences }
+    }
+"""
+
+
+def test_count_fields_match_the_lists(db_session, execute):
+    create_user_graph(db_session, users=3, cars_per_garage=2)
+    db_session.add(Car(model="Loose", owner_id=1))
+    db_session.add(Garage(title="Spare", owner_id=2))
+    db_session.commit()
+
+    users = execute(COUNTS_QUERY)["allUsers"]
+
+    assert [(u["houseCount"], u["garageCount"], u["carCount"]) for u in users] == [(1, 1, 3), (1, 2, 2), (1, 1, 2)]
+    assert [h["garageCount"] for u in users for h in u["houses"]] == [1, 1, 1]
+    assert [g["carCount"] for g in users[1]["garages"]] == [2, 0]
+
+
+def test_counts_are_one_grouped_query_per_field(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=50)
+    sql_counter.clear()
+
+    users = execute("query { allUsers { carCount houseCount } }")["allUsers"]
+
+    assert len(users) == 50
+    assert all(u["carCount"] == 2 and u["houseCount"] == 1 for u in users)
+    # users, then one COUNT ... GROUP BY per count field
+    assert len(sql_counter) == 3
+    assert sum("count(*)" in s and "GROUP BY car.owner_id" in s for s in sql_counter) == 1
+    assert not any("SELECT car.id" in s for s in sql_counter)
+
+
+def test_counts_of_eagerly_loaded_lists_need_no_query(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=5)
+    sql_counter.clear()
+
+    users = execute("query { allUsers { carCount cars { id } } }")["allUsers"]
+
+    assert [u["carCount"] for u in users] == [len(u["cars"]) for u in users] == [2] * 5
+    assert not any("count(*)" in s for s in sql_counter)
+
+
+def test_stats_are_one_statement(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=4, cars_per_garage=3)
+    db_session.add(Car(model="Loose"))
+    db_session.commit()
+    sql_counter.clear()
+
+    stats = execute(STATS_QUERY)["stats"]
+
+    assert stats == {
+        "users": 4,
+        "activeUsers": 4,
+        "houses": 4,
+        "garages": 4,
+        "cars": 13,
+        "parkedCars": 12,
+        "driverLicences": 4,
+    }
+    assert len(sql_counter) == 1
+
+
+def test_stats_through_fragments_and_aliases(db_session, execute):
+    create_user_graph(db_session, users=2)
+
+    data = execute("query { stats { ...Totals n: users } } fragment Totals on StatsType { cars }")
+
+    assert data["stats"] == {"cars": 4, "n": 2}
+
+
+def test_single_stat(db_session, execute):
+    create_user_graph(db_session, users=2)
+
+    assert execute("{ stats { users } }") == {"stats": {"users": 2}}
+
+
+def test_cached_counts_depend_on_the_counted_table():
+    document = parse("{ user(id: 1) { carCount } stats { houses } }")
+
+    tables = plan(schema._schema, document, None).tables
+
+    assert tables == {"user", "car", "house"}
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from sqlmodel import SQLModel, Session
+
+from app.db import make_engine, new_session
+from app.main import build_context, schema
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.async_mode
+
+
+ALL_API_DATA_QUERY = """
+    query {
+    allUsers {
+        id
+        email
+        houses { id title garages { id cars { id model } } }
+        garages { id title owner { id } }
+        cars { id model garage { id house { id } } }
+        driverLicense { id number owner { id } }
+    }
+    allCars { id owner { email } }
+    usersConnection(first: 3) { edges { node { id carsConnection(first: 1) { edges { node { id } } } } } }
+    }
+"""
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = make_engine(url, mode="sync")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        create_user_graph(session, users=5)
+    engine.dispose()
+    return url
+
+
+def run(url, mode, query, variables=None):
+    async def _run():
+        engine = make_engine(url, mode=mode)
+        session = new_session(engine)
+        try:
+            return await schema.execute(query, variable_values=variables, context_value=build_context(session))
+        finally:
+            if mode == "async":
+                await session.close()
+                await engine.dispose()
+            else:
+                session.close()
+                engine.dispose()
+
+    return asyncio.run(_run())
+
+
+def test_async_mode_returns_the_same_data_as_sync_mode(db_url):
+    sync_result = run(db_url, "sync", ALL_API_DATA_QUERY)
+    async_result = run(db_url, "async", ALL_API_DATA_QUERY)
+
+    assert async_result.errors is None, async_result.errors
+    assert async_result.data == sync_result.data
+    assert len(async_result.data["allUsers"]) == 5
+
+
+def test_async_mode_results_are_stable_across_runs(db_url):
+    expected = run(db_url, "sync", ALL_API_DATA_QUERY).data
+
+    for _ in range(25):
+        assert run(db_url, "async", ALL_API_DATA_QUERY).data == expected
+
+
+def test_async_mode_mutations_commit_and_report_errors(db_url):
+    query = """
+        mutation CreateCar($ownerId: Int) {
+        createCar(model: "Async", ownerId: $ownerId) {
+            id
+            model
+            owner { id }
+        }
+        }
+    """
+
+    created = run(db_url, "async", query, {"ownerId": 1})
+    missing_owner = run(db_url, "async", query, {"ownerId": 10_000})
+
+    assert created.errors is None, created.errors
+    assert created.data["createCar"]["owner"] == {"id": 1}
+    assert "Owner not found" in missing_owner.errors[0].message
+    cars = run(db_url, "sync", "query { allCars { model } }").data["allCars"]
+    assert [c["model"] for c in cars].count("Async") == 1
@@ -0,0 +1,102 @@
+import pytest
+from testing.generators.graph_generator import create_user_graph
+from testing.generators.user_email_generator import generate_user_email
+
+pytestmark = pytest.mark.bulk
+
+
+CREATE_USERS_MUTATION = """
+    mutation CreateUsers($users: [UserInput!]!, $chunkSize: Int!) {
+    createUsers(users: $users, chunkSize: $chunkSize) {
+        created {
+            id
+            email
+            isActive
+        }
+        errors {
+            index
+            message
+        }
+    }
+    }
+"""
+
+CREATE_CARS_MUTATION = """
+    mutation CreateCars($cars: [CarInput!]!, $mode: BulkMode!) {
+    createCars(cars: $cars, mode: $mode) {
+        created {
+            id
+            model
+            owner { id }
+            garage { id }
+        }
+        errors {
+            index
+            message
+        }
+    }
+    }
+"""
+
+
+def statements_like(sql_counter, prefix):
+    return [s for s in sql_counter if s.lstrip().upper().startswith(prefix)]
+
+
+def test_create_users_inserts_in_chunks_without_refresh(execute, sql_counter):
+    users = [{"email": generate_user_email(), "isActive": i % 2 == 0} for i in range(50)]
+    sql_counter.clear()
+
+    result = execute(CREATE_USERS_MUTATION, {"users": users, "chunkSize": 20})["createUsers"]
+
+    assert len(statements_like(sql_counter, "INSERT")) == 3
+    assert all("RETURNING" in s for s in statements_like(sql_counter, "INSERT"))
+    assert statements_like(sql_counter, "SELECT") == []
+    assert result["errors"] == []
+    assert [u["email"] for u in result["created"]] == [u["email"] for u in users]
+    assert [u["isActive"] for u in result["created"]] == [u["isActive"] for u in users]
+    ids = [u["id"] for u in result["created"]]
+    assert ids == sorted(ids) and len(set(ids)) == 50
+
+
+def test_create_cars_validates_references_with_one_query_per_table(db_session, execute, sql_counter):
+    user_ids = [u.id for u in create_user_graph(db_session, users=3)]
+    cars = [{"model": f"Bulk {i}", "ownerId": user_ids[i % 3], "garageId": 1 + i % 3} for i in range(30)]
+    sql_counter.clear()
+
+    result = execute(CREATE_CARS_MUTATION, {"cars": cars, "mode": "ALL_OR_NOTHING"})["createCars"]
+
+    selects = statements_like(sql_counter, "SELECT")
+    assert any("FROM user" in s for s in selects[:2]) and any("FROM garage" in s for s in selects[:2])
+    assert len(statements_like(sql_counter, "INSERT")) == 1
+    assert [c["owner"]["id"] for c in result["created"]] == [c["ownerId"] for c in cars]
+    assert [c["garage"]["id"] for c in result["created"]] == [c["garageId"] for c in cars]
+
+
+def test_all_or_nothing_writes_nothing_when_a_row_is_invalid(db_session, execute, execute_raw):
+    owner_id = create_user_graph(db_session, users=1)[0].id
+    cars = [{"model": "Valid", "ownerId": owner_id}, {"model": "Orphan", "ownerId": 10_000}]
+
+    result = execute_raw(CREATE_CARS_MUTATION, {"cars": cars, "mode": "ALL_OR_NOTHING"})
+
+    assert "Row 1: Owner not found" in result.errors[0].message
+    models = [c["model"] for c in execute("query { allCars { model } }")["allCars"]]
+    assert "Valid" not in models
+
+
+def test_partial_mode_skips_invalid_rows(db_session, execute):
+    owner_id = create_user_graph(db_session, users=1)[0].id
+    cars = [
+        {"model": "Valid", "ownerId": owner_id},
+        {"model": "No owner", "ownerId": 10_000},
+        {"model": "No garage", "garageId": 10_000},
+        {"model": "Also valid"},
+    ]
+
+    result = execute(CREATE_CARS_MUTATION, {"cars": cars, "mode": "PARTIAL"})["createCars"]
+
+    assert [c["model"] for c in result["created"]] == ["Valid", "Also valid"]
+    assert result["errors"] == [
+        {"index": 1, "message": "Owner not found"},
+        {"index": 2, "message": "Garage not found"},
+    ]
@@ -0,0 +1,101 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy import text
+
+from app.db import make_engine
+from testing.generators import bulk_seeder
+from testing.generators.bulk_seeder import generate_chunk, seed
+
+pytestmark = pytest.mark.seeder
+
+
+TABLES = ["user", "house", "garage", "car", "driverlicence"]
+
+
+def dump(url: str) -> dict:
+    engine = make_engine(url, mode="sync")
+    with engine.connect() as conn:
+        rows = {table: conn.execute(text(f'SELECT * FROM "{table}" ORDER BY id')).all() for table in TABLES}
+    engine.dispose()
+    return rows
+
+
+def test_seeded_graph_is_consistent(tmp_path):
+    url = f"sqlite:///{tmp_path / 'seeded.db'}"
+
+    inserted = seed(url, users=500, seed=7, chunk_size=120)
+    rows = dump(url)
+
+    assert inserted == {table: len(rows[table]) for table in TABLES}
+    assert inserted["user"] == 500
+    engine = make_engine(url, mode="sync")
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA foreign_key_check").all() == []
+        # the seeding connection's shortcuts are not left on pooled connections
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+    engine.dispose()
+
+    assert len({user.email for user in rows["user"]}) == 500
+    assert len({licence.user_id for licence in rows["driverlicence"]}) == len(rows["driverlicence"])
+    houses = {house.id: house for house in rows["house"]}
+    garages = {garage.id: garage for garage in rows["garage"]}
+    for garage in rows["garage"]:
+        if garage.house_id is not None:
+            assert houses[garage.house_id].owner_id == garage.owner_id
+    for car in rows["car"]:
+        if car.garage_id is not None:
+            assert garages[car.garage_id].owner_id == car.owner_id
+
+
+def test_fan_out_stays_within_bounds():
+    chunk = generate_chunk((3, 0, 0, 2000))
+
+    houses = Counter(owner for _, _, owner in chunk.houses)
+    cars = Counter(owner for _, _, owner, _ in chunk.cars)
+    assert max(houses.values()) <= max(bulk_seeder.HOUSES_PER_USER[0])
+    assert max(cars.values()) <= max(bulk_seeder.CARS_PER_USER[0])
+    assert 0.7 < len(chunk.licences) / 2000 < 0.9
+    assert 1 < len(chunk.houses) / 2000 < 1.3
+
+
+def test_same_seed_gives_the_same_rows_whatever_the_worker_count(tmp_path):
+    urls = [f"sqlite:///{tmp_path / f'run{workers}.db'}" for workers in (1, 2)]
+
+    for workers, url in zip((1, 2), urls):
+        seed(url, users=300, seed=11, workers=workers, chunk_size=100)
+
+    assert dump(urls[0]) == dump(urls[1])
+
+
+def test_pools_are_drawn_once_per_run_without_workers(tmp_path, monkeypatch):
+    drawn = []
+    make_pools = bulk_seeder.make_pools
+    monkeypatch.setattr(bulk_seeder, "make_pools", lambda seed: drawn.append(seed) or make_pools(seed))
+
+    seed(f"sqlite:///{tmp_path / 'inline.db'}", users=300, seed=5, chunk_size=50)
+    generate_chunk((6, 0, 0, 10))  # pools of another seed are not reused
+
+    assert drawn == [5, 6]
+
+
+def test_other_seed_gives_other_rows(tmp_path):
+    first, second = f"sqlite:///{tmp_path / 'a.db'}", f"sqlite:///{tmp_path / 'b.db'}"
+
+    seed(first, users=50, seed=1)
+    seed(second, users=50, seed=2)
+
+    assert dump(first)["user"] != dump(second)["user"]
+
+
+def test_seeding_appends_after_existing_rows(tmp_path):
+    url = f"sqlite:///{tmp_path / 'appended.db'}"
+
+    first = seed(url, users=100, seed=5, chunk_size=40)
+    second = seed(url, users=100, seed=6, chunk_size=40)
+    rows = dump(url)
+
+    for table in TABLES:
+        assert [row.id for row in rows[table]] == list(range(1, first[table] + second[table] + 1))
+    owners = {car.owner_id for car in rows["car"][first["car"]:]}
+    assert min(owners) > 100
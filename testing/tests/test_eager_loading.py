@@ -0,0 +1,79 @@
+import pytest
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.batching
+
+
+USER_TREE_QUERY = """
+    query {
+    allUsers {
+        email
+        houses {
+            id
+            title
+            garages {
+                id
+                title
+                cars {
+                    id
+                    model
+                }
+            }
+        }
+    }
+    }
+"""
+
+FRAGMENT_QUERY = """
+    query {
+    allGarages {
+        ...GarageInfo
+    }
+    }
+
+    fragment GarageInfo on GarageType {
+        id
+        owner {
+            email
+        }
+        cars {
+            model
+        }
+    }
+"""
+
+
+@pytest.mark.parametrize("users", [1, 20])
+def test_user_tree_is_loaded_with_one_query_per_level(db_session, execute, sql_counter, users):
+    create_user_graph(db_session, users=users, cars_per_garage=3)
+    sql_counter.clear()
+
+    data = execute(USER_TREE_QUERY)
+
+    # users + houses + garages + cars, nested resolvers reuse the loaded collections
+    assert len(sql_counter) == 4
+    assert len(data["allUsers"]) == users
+    for user in data["allUsers"]:
+        garages = user["houses"][0]["garages"]
+        assert [len(g["cars"]) for g in garages] == [3]
+
+
+def test_relationships_selected_through_fragments_are_eager_loaded(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=5)
+    sql_counter.clear()
+
+    data = execute(FRAGMENT_QUERY)
+
+    # garages joined with owner + cars
+    assert len(sql_counter) == 2
+    assert all(g["owner"]["email"] and len(g["cars"]) == 2 for g in data["allGarages"])
+
+
+def test_unselected_relationships_are_not_loaded(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=5)
+    sql_counter.clear()
+
+    execute("query { allHouses { id title } }")
+
+    assert len(sql_counter) == 1
+    assert "JOIN" not in sql_counter[0]
@@ -0,0 +1,242 @@
+import asyncio
+import random
+import threading
+
+import pytest
+from sqlmodel import SQLModel, Session, select
+
+from app.db import make_engine
+from app.entity_cache import EntityCache, entity_cache, snapshot, snapshot_type, watch
+from app.loaders import load_by_pk_cached
+from app.main import build_context, schema
+from app.models import User, Garage, Car
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.entity_cache
+
+
+USER_TREE = """
+    query ($id: Int!) {
+    user(id: $id) {
+        id
+        cars {
+            id
+            garage { id house { id } }
+        }
+    }
+    }
+"""
+
+ASSIGN_GARAGE = "mutation ($g: Int!, $h: Int) { assignGarageToHouse(garageId: $g, houseId: $h) { id } }"
+TRANSFER_CAR = """
+    mutation ($c: Int!, $o: Int, $g: Int) { transferCar(carId: $c, newOwnerId: $o, newGarageId: $g) { id } }
+"""
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'entities.db'}", mode="sync")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def request(engine, query: str, variables: dict = None):
+    """One GraphQL request on its own session, like one HTTP request."""
+    with Session(engine) as session:
+        result = asyncio.run(schema.execute(query, variable_values=variables, context_value=build_context(session)))
+    assert result.errors is None, result.errors
+    return result.data
+
+
+def expected_tree(engine, user_id: int) -> dict:
+    """USER_TREE's answer read straight from the database."""
+    with Session(engine) as session:
+        cars = session.exec(select(Car).where(Car.owner_id == user_id).order_by(Car.id)).all()
+        garages = {g.id: g for g in session.exec(select(Garage))}
+        return {
+            "user": {
+                "id": user_id,
+                "cars": [
+                    {
+                        "id": car.id,
+                        "garage": car.garage_id
+                        and {
+                            "id": car.garage_id,
+                            "house": garages[car.garage_id].house_id and {"id": garages[car.garage_id].house_id},
+                        },
+                    }
+                    for car in cars
+                ],
+            }
+        }
+
+
+def assert_cache_matches_database(engine):
+    with Session(engine) as session:
+        for (table, id), entry in list(entity_cache._entries.items()):
+            model = {"user": User, "garage": Garage}.get(table)
+            if model is not None:
+                assert entry == snapshot(model, session.get(model, id)), (table, id)
+
+
+# -----------------------
+# Snapshots and LRU
+# -----------------------
+def test_snapshots_are_compact_immutable_tuples(db_session):
+    user = create_user_graph(db_session, users=1)[0]
+
+    entry = snapshot(User, user)
+
+    assert isinstance(entry, tuple)
+    assert type(entry) is snapshot_type(User)
+    assert entry._fields == ("id", "email", "is_active")
+    assert entry.email == user.email
+    with pytest.raises(AttributeError):
+        entry.email = "changed"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EntityCache(maxsize=2)
+    rows = [snapshot_type(User)(id, f"u{id}@mail.com", True) for id in (1, 2, 3)]
+
+    cache.fill(User, rows[:2], token=0)
+    cache.get_many(User, [1])
+    cache.fill(User, rows[2:], token=0)
+
+    assert ("user", 1) in cache and ("user", 3) in cache and ("user", 2) not in cache
+
+
+def test_fill_is_refused_after_an_invalidation():
+    cache = EntityCache(maxsize=10)
+    row = snapshot_type(User)(1, "u@mail.com", True)
+
+    token = cache.invalidations
+    cache.invalidate([("user", 2)])
+    cache.fill(User, [row], token)
+
+    assert len(cache) == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = EntityCache(maxsize=0)
+
+    cache.fill(User, [snapshot_type(User)(1, "u@mail.com", True)], cache.invalidations)
+
+    assert not cache.enabled and len(cache) == 0
+
+
+# -----------------------
+# Read-through
+# -----------------------
+def test_lookups_are_served_across_requests(file_engine, sql_counter_for):
+    with Session(file_engine) as session:
+        create_user_graph(session, users=2)
+    request(file_engine, USER_TREE, {"id": 1})
+    statements = sql_counter_for(file_engine)
+
+    request(file_engine, USER_TREE, {"id": 1})
+
+    # only the cars of user 1; the user, its garage and house come from the cache
+    assert len(statements) == 1, statements
+    assert entity_cache.hits == 3
+
+
+def test_existence_checks_use_the_cache(file_engine, sql_counter_for):
+    with Session(file_engine) as session:
+        create_user_graph(session, users=1)
+    request(file_engine, USER_TREE, {"id": 1})
+    statements = sql_counter_for(file_engine)
+
+    request(file_engine, 'mutation { createCar(model: "C", ownerId: 1, garageId: 1) { id } }')
+
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT")
+
+
+def test_old_transaction_cannot_fill_after_a_write(file_engine):
+    with Session(file_engine) as session:
+        create_user_graph(session, users=2)
+
+    with Session(file_engine) as reader:
+        watch(reader)
+        reader.exec(select(User.id)).all()  # the reader's transaction begins here
+
+        request(file_engine, "mutation { assignGarageToHouse(garageId: 1, houseId: 2) { id } }")
+        [garage] = load_by_pk_cached(reader, Garage, [1])
+
+    # whatever a transaction older than the write read is returned, never cached
+    assert garage.id == 1
+    assert ("garage", 1) not in entity_cache
+    with Session(file_engine) as session:
+        assert load_by_pk_cached(session, Garage, [1])[0].house_id == 2
+
+
+# -----------------------
+# Consistency under interleaved writes
+# -----------------------
+def test_interleaved_mutations_and_reads_stay_consistent(file_engine):
+    users = 5
+    with Session(file_engine) as session:
+        create_user_graph(session, users=users, cars_per_garage=3)
+    rng = random.Random(13)
+
+    for _ in range(300):
+        user_id = rng.randint(1, users)
+        op = rng.random()
+        if op < 0.25:
+            request(
+                file_engine,
+                ASSIGN_GARAGE,
+                {"g": rng.randint(1, users), "h": rng.choice([None, *range(1, users + 1)])},
+            )
+        elif op < 0.5:
+            request(
+                file_engine,
+                TRANSFER_CAR,
+                {"c": rng.randint(1, users * 3), "o": user_id, "g": rng.choice([None, *range(1, users + 1)])},
+            )
+        else:
+            assert request(file_engine, USER_TREE, {"id": user_id}) == expected_tree(file_engine, user_id)
+
+    assert entity_cache.hits > 0
+    assert_cache_matches_database(file_engine)
+
+
+def test_concurrent_mutations_and_reads_leave_no_stale_entries(file_engine):
+    users = 4
+    with Session(file_engine) as session:
+        create_user_graph(session, users=users)
+    errors = []
+
+    def writer(seed: int):
+        rng = random.Random(seed)
+        for _ in range(40):
+            request(
+                file_engine,
+                ASSIGN_GARAGE,
+                {"g": rng.randint(1, users), "h": rng.randint(1, users)},
+            )
+
+    def reader(seed: int):
+        rng = random.Random(seed)
+        for _ in range(80):
+            request(file_engine, USER_TREE, {"id": rng.randint(1, users)})
+
+    def run(target, seed):
+        try:
+            target(seed)
+        except Exception as exc:  # reported below, a thread can't fail the test itself
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(writer, seed)) for seed in range(2)]
+    threads += [threading.Thread(target=run, args=(reader, seed)) for seed in range(2, 6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert_cache_matches_database(file_engine)
+    for user_id in range(1, users + 1):
+        assert request(file_engine, USER_TREE, {"id": user_id}) == expected_tree(file_engine, user_id)
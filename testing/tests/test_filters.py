@@ -0,0 +1,147 @@
+import asyncio
+import shutil
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import sqlite
+from sqlmodel import select
+
+from app.db import init_db, make_engine
+from app.filters import Spec, apply, prefix_upper_bound
+from app.models import User, Garage, Car
+from testing.generators.graph_generator import create_user_graph
+from testing.tests.test_indexes import COMMITTED_DB
+
+pytestmark = pytest.mark.filters
+
+
+@pytest.fixture
+def graph(db_session):
+    """Two users with two cars each, a car without a garage and a garage without a house."""
+    create_user_graph(db_session, users=2)
+    db_session.add(Car(model="Tesla S", owner_id=1))
+    db_session.add(Garage(title="Spare", owner_id=2))
+    db_session.add(User(email="idle@mail.com", is_active=False))
+    db_session.commit()
+
+
+@pytest.fixture
+def migrated_engine(tmp_path):
+    path = tmp_path / "legacy.db"
+    shutil.copy(COMMITTED_DB, path)
+    engine = make_engine(f"sqlite:///{path}", mode="sync")
+    asyncio.run(init_db(engine))
+    yield engine
+    engine.dispose()
+
+
+def query_plan(conn, statement) -> str:
+    sql = str(statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    return " | ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_root_lists_are_filtered_in_sql(graph, execute, sql_counter):
+    sql_counter.clear()
+
+    data = execute(
+        """
+        query {
+        prefix: allCars(where: {model: {startsWith: "Model 1"}}) { model }
+        active: allUsers(where: {isActive: true}) { id }
+        homeless: allGarages(where: {houseId: {isNull: true}}) { title }
+        }
+        """
+    )
+
+    assert [c["model"] for c in data["prefix"]] == ["Model 1-0", "Model 1-1"]
+    assert [u["id"] for u in data["active"]] == [1, 2]
+    assert data["homeless"] == [{"title": "Spare"}]
+    assert len(sql_counter) == 3
+    assert all("WHERE" in statement for statement in sql_counter)
+
+
+def test_order_by_several_columns(graph, execute):
+    query = "query { allCars(orderBy: [{field: OWNER_ID, direction: DESC}, {field: MODEL}]) { model } }"
+
+    models = [c["model"] for c in execute(query)["allCars"]]
+
+    assert models == ["Model 1-0", "Model 1-1", "Model 0-0", "Model 0-1", "Tesla S"]
+
+
+def test_filters_combine_and_take_variables(graph, execute):
+    query = """
+        query Cars($where: CarWhere) {
+        allCars(where: $where, orderBy: [{field: ID, direction: DESC}]) { id }
+        }
+    """
+
+    data = execute(query, {"where": {"ownerId": {"in": [1]}, "garageId": {"isNull": False}, "id": {"gte": 2}}})
+
+    assert data["allCars"] == [{"id": 2}]
+    assert execute(query, {"where": {"id": {"in": []}}})["allCars"] == []
+
+
+def test_nested_filters_are_batched_across_parents(graph, execute, sql_counter):
+    sql_counter.clear()
+
+    users = execute(
+        """
+        query {
+        allUsers {
+            cars(where: {model: {startsWith: "Model"}}, orderBy: [{field: MODEL, direction: DESC}]) { model }
+            garages(where: {houseId: {isNull: false}}) { title }
+        }
+        }
+        """
+    )["allUsers"]
+
+    assert [[c["model"] for c in u["cars"]] for u in users] == [["Model 0-1", "Model 0-0"], ["Model 1-1", "Model 1-0"], []]
+    assert [[g["title"] for g in u["garages"]] for u in users] == [["Garage 0"], ["Garage 1"], []]
+    # users, then one query per filtered list; nothing is eagerly loaded for them
+    assert len(sql_counter) == 3
+
+
+def test_unfiltered_alias_of_a_filtered_list_is_complete(graph, execute):
+    users = execute(
+        """
+        query {
+        allUsers(where: {id: {eq: 1}}) {
+            all: cars { model }
+            parked: cars(where: {garageId: {isNull: false}}) { model }
+        }
+        }
+        """
+    )["allUsers"]
+
+    assert [c["model"] for c in users[0]["all"]] == ["Model 0-0", "Model 0-1", "Tesla S"]
+    assert [c["model"] for c in users[0]["parked"]] == ["Model 0-0", "Model 0-1"]
+
+
+def test_prefix_upper_bound():
+    assert prefix_upper_bound("Te") == "Tf"
+    assert prefix_upper_bound("a\U0010ffff") == "b"
+    assert prefix_upper_bound("a\ud7ff") == "a\ue000"
+    assert prefix_upper_bound("") is None
+
+
+@pytest.mark.parametrize(
+    "model, spec, expected",
+    [
+        (Car, Spec(conditions=(("model", "starts_with", "Tes"),)), "SEARCH car USING INDEX ix_car_model (model>? AND model<?)"),
+        (Car, Spec(conditions=(("model", "eq", "Tesla S"),)), "SEARCH car USING INDEX ix_car_model (model=?)"),
+        (User, Spec(conditions=(("email", "starts_with", "ann"),)), "SEARCH user USING INDEX ix_user_email (email>? AND email<?)"),
+        (User, Spec(conditions=(("is_active", "eq", False),)), "SEARCH user USING INDEX ix_user_is_active (is_active=?)"),
+        (Garage, Spec(conditions=(("house_id", "is_null", True),)), "SEARCH garage USING INDEX ix_garage_house_id (house_id=?)"),
+        (Garage, Spec(order=(("title", "asc"),)), "SCAN garage USING INDEX ix_garage_title"),
+    ],
+    ids=["prefix", "equality", "email-prefix", "inactive", "no-house", "order"],
+)
+def test_filters_use_indexes(migrated_engine, model, spec, expected):
+    statement = apply(select(model), model, spec)
+
+    with migrated_engine.connect() as conn:
+        plan = query_plan(conn, statement)
+
+    assert expected in plan
+    if spec.order:
+        assert "TEMP B-TREE" not in plan
@@ -0,0 +1,17 @@
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db import get_engine
+
+pytestmark = pytest.mark.client
+
+
+def test_client_writes_to_this_workers_database(graphql_client, app_engine):
+    result = graphql_client('mutation { createUser(email: "client@mail.com") { id } }')
+
+    assert get_engine() is app_engine
+    database = (app_engine.sync_engine if isinstance(app_engine, AsyncEngine) else app_engine).url.database
+    assert os.path.basename(database) == f"{os.environ.get('PYTEST_XDIST_WORKER', 'main')}.db"
+    assert result["data"]["createUser"]["id"] >= 1
@@ -0,0 +1,106 @@
+import asyncio
+import shutil
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import sqlite
+from sqlmodel import select
+
+from app.db import init_db, make_engine
+from app.migrations import LATEST_VERSION, MigrationError, schema_version
+from app.models import House, Garage, Car, DriverLicence
+
+pytestmark = pytest.mark.indexes
+
+
+COMMITTED_DB = Path(__file__).parents[2] / "test_graphql.db"
+
+FOREIGN_KEY_LOOKUPS = [
+    (House.owner_id, "ix_house_owner_id"),
+    (Garage.owner_id, "ix_garage_owner_id"),
+    (Garage.house_id, "ix_garage_house_id"),
+    (Car.owner_id, "ix_car_owner_id"),
+    (Car.garage_id, "ix_car_garage_id"),
+    (DriverLicence.user_id, "ix_driverlicence_user_id"),
+]
+
+
+@pytest.fixture
+def migrated_engine(tmp_path):
+    """A copy of the committed database, created before the indexes existed."""
+    path = tmp_path / "legacy.db"
+    shutil.copy(COMMITTED_DB, path)
+    engine = make_engine(f"sqlite:///{path}", mode="sync")
+    asyncio.run(init_db(engine))
+    yield engine
+    engine.dispose()
+
+
+def query_plan(conn, statement) -> str:
+    sql = str(statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    return " | ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_migration_brings_existing_database_to_latest_version(migrated_engine):
+    with migrated_engine.connect() as conn:
+        indexes = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        assert schema_version(conn) == LATEST_VERSION
+    assert {name for _, name in FOREIGN_KEY_LOOKUPS} <= indexes
+
+
+def test_duplicate_driver_licences_stop_the_migration(tmp_path):
+    path = tmp_path / "legacy.db"
+    shutil.copy(COMMITTED_DB, path)
+    engine = make_engine(f"sqlite:///{path}", mode="sync")
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO driverlicence (id, number, user_id) VALUES (1, 'A', 1), (2, 'B', 1), (3, 'C', 2)")
+        )
+
+    with pytest.raises(MigrationError, match=r"migration 1: .*\(user 1: licences 1, 2\)"):
+        asyncio.run(init_db(engine))
+    with engine.connect() as conn:
+        assert schema_version(conn) == 0
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM driverlicence WHERE id = 2"))
+    assert asyncio.run(init_db(engine)) == LATEST_VERSION
+    engine.dispose()
+
+
+def test_migrations_are_idempotent_on_fresh_database(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'fresh.db'}", mode="sync")
+
+    assert asyncio.run(init_db(engine)) == LATEST_VERSION
+    assert asyncio.run(init_db(engine)) == LATEST_VERSION
+    engine.dispose()
+
+
+@pytest.mark.parametrize("column, index", FOREIGN_KEY_LOOKUPS, ids=[name for _, name in FOREIGN_KEY_LOOKUPS])
+def test_foreign_key_lookups_use_index(migrated_engine, column, index):
+    model = column.class_
+    statement = select(model).where(column.in_([1, 2, 3]))
+
+    with migrated_engine.connect() as conn:
+        plan = query_plan(conn, statement)
+
+    assert f"USING INDEX {index}" in plan
+    assert "SCAN" not in plan
+
+
+def test_second_driver_licence_is_rejected_by_unique_index(execute, execute_raw):
+    user = execute('mutation { createUser(email: "licenced@mail.com") { id } }')["createUser"]
+    query = """
+        mutation CreateLicence($userId: Int!, $number: String!) {
+        createDriverLicense(userId: $userId, number: $number) {
+            id
+        }
+        }
+    """
+    execute(query, {"userId": user["id"], "number": "DL-1"})
+
+    result = execute_raw(query, {"userId": user["id"], "number": "DL-2"})
+
+    assert "User already has driver licence" in result.errors[0].message
+    assert execute("query { allUsers { driverLicense { number } } }")["allUsers"][0]["driverLicense"]["number"] == "DL-1"
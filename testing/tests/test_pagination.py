@@ -0,0 +1,109 @@
+import pytest
+from app.pagination import MAX_PAGE_SIZE
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.pagination
+
+
+USERS_PAGE_QUERY = """
+    query UsersPage($first: Int, $after: String) {
+    usersConnection(first: $first, after: $after) {
+        edges {
+            cursor
+            node {
+                id
+                email
+            }
+        }
+        pageInfo {
+            hasNextPage
+            hasPreviousPage
+            endCursor
+        }
+    }
+    }
+"""
+
+NESTED_CARS_PAGE_QUERY = """
+    query UsersCars($first: Int, $after: String) {
+    usersConnection(first: 50) {
+        edges {
+            node {
+                id
+                carsConnection(first: $first, after: $after) {
+                    edges {
+                        node {
+                            id
+                            model
+                        }
+                    }
+                    pageInfo {
+                        hasNextPage
+                        endCursor
+                    }
+                }
+            }
+        }
+    }
+    }
+"""
+
+
+def test_walking_all_pages_returns_every_user_once(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=7)
+    seen, after, pages = [], None, 0
+
+    while True:
+        sql_counter.clear()
+        connection = execute(USERS_PAGE_QUERY, {"first": 3, "after": after})["usersConnection"]
+        pages += 1
+        seen += [edge["node"]["id"] for edge in connection["edges"]]
+        assert connection["pageInfo"]["hasPreviousPage"] is (after is not None)
+        assert "WHERE user.id > ?" in sql_counter[0]
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        after = connection["pageInfo"]["endCursor"]
+
+    assert pages == 3
+    assert seen == sorted(seen)
+    assert len(set(seen)) == 7
+
+
+def test_nested_pages_are_loaded_with_one_query(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=10, cars_per_garage=5)
+    sql_counter.clear()
+
+    users = execute(NESTED_CARS_PAGE_QUERY, {"first": 2})["usersConnection"]["edges"]
+
+    # users page + one windowed query for every user's first car page
+    assert len(sql_counter) == 2
+    for edge in users:
+        cars = edge["node"]["carsConnection"]
+        assert len(cars["edges"]) == 2
+        assert cars["pageInfo"]["hasNextPage"] is True
+
+
+def test_nested_page_continues_after_cursor(db_session, execute):
+    create_user_graph(db_session, users=1, cars_per_garage=5)
+    first_page = execute(NESTED_CARS_PAGE_QUERY, {"first": 3})["usersConnection"]["edges"][0]["node"]
+    cursor = first_page["carsConnection"]["pageInfo"]["endCursor"]
+
+    second_page = execute(NESTED_CARS_PAGE_QUERY, {"first": 3, "after": cursor})["usersConnection"]["edges"][0]["node"]
+
+    models = [edge["node"]["model"] for edge in second_page["carsConnection"]["edges"]]
+    assert models == ["Model 0-3", "Model 0-4"]
+    assert second_page["carsConnection"]["pageInfo"]["hasNextPage"] is False
+
+
+@pytest.mark.parametrize(
+    "variables, error_message",
+    [
+        ({"first": MAX_PAGE_SIZE + 1}, f"'first' must not exceed {MAX_PAGE_SIZE}"),
+        ({"first": -1}, "'first' must not be negative"),
+        ({"after": "not-a-cursor"}, "Invalid cursor"),
+    ],
+)
+def test_invalid_page_arguments_are_rejected(execute_raw, variables, error_message):
+    result = execute_raw(USERS_PAGE_QUERY, variables)
+
+    assert error_message in result.errors[0].message
@@ -0,0 +1,129 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import app
+from app.persisted_queries import DocumentCache, CachedDocument, document_cache, query_hash
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.persisted_queries
+
+
+QUERY = "{ allUsers { id email } }"
+
+
+def persisted(query: str) -> dict:
+    return {"persistedQuery": {"version": 1, "sha256Hash": query_hash(query)}}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    document_cache.clear()
+    yield
+    document_cache.clear()
+
+
+def test_repeated_query_is_served_from_cache(db_session, execute):
+    create_user_graph(db_session, users=2)
+
+    first = execute(QUERY)
+    second = execute(QUERY)
+
+    assert first == second
+    assert document_cache.info()[:2] == (1, 1)  # hits, misses
+    assert len(document_cache) == 1
+
+
+def test_cached_document_skips_parse_and_validate(db_session, execute, monkeypatch):
+    execute(QUERY)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("document should come from the cache")
+
+    monkeypatch.setattr("strawberry.schema.schema.parse", fail)
+    monkeypatch.setattr("strawberry.schema.schema.validate_document", fail)
+
+    assert execute(QUERY) == {"allUsers": []}
+
+
+def test_validation_errors_are_cached(execute_raw):
+    query = "{ allUsers { nope } }"
+
+    first = execute_raw(query)
+    second = execute_raw(query)
+
+    assert first.errors[0].message == second.errors[0].message
+    assert "nope" in second.errors[0].message
+    assert document_cache.hits == 1
+
+
+def test_syntax_errors_are_not_cached(execute_raw):
+    result = execute_raw("{ allUsers { id ")
+
+    assert result.errors
+    assert len(document_cache) == 0
+
+
+def test_unknown_hash_asks_for_the_query(execute_raw):
+    result = execute_raw(None, extensions=persisted(QUERY))
+
+    assert result.data is None
+    assert result.errors[0].message == "PersistedQueryNotFound"
+    assert result.errors[0].extensions == {"code": "PERSISTED_QUERY_NOT_FOUND"}
+
+
+def test_hash_alone_runs_a_registered_query(db_session, execute_raw):
+    create_user_graph(db_session, users=1)
+
+    registered = execute_raw(QUERY, extensions=persisted(QUERY))
+    result = execute_raw(None, extensions=persisted(QUERY))
+
+    assert registered.errors is None
+    assert result.errors is None
+    assert result.data == registered.data
+    assert [user["id"] for user in result.data["allUsers"]] == [1]
+
+
+def test_hash_must_match_query(execute_raw):
+    result = execute_raw(QUERY, extensions=persisted("{ allHouses { id } }"))
+
+    assert result.errors[0].message == "provided sha does not match query"
+    assert len(document_cache) == 0
+
+
+def test_unsupported_version_is_rejected(execute_raw):
+    extensions = {"persistedQuery": {"version": 2, "sha256Hash": query_hash(QUERY)}}
+
+    result = execute_raw(QUERY, extensions=extensions)
+
+    assert result.errors[0].message == "Unsupported persisted query version"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = DocumentCache(maxsize=2)
+    for key in ("a", "b"):
+        cache.put(key, CachedDocument(key, None, []))
+
+    cache.get("a")
+    cache.put("c", CachedDocument("c", None, []))
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.info() == (1, 0, 2, 2)
+
+
+def test_cache_size_must_be_positive():
+    with pytest.raises(ValueError):
+        DocumentCache(maxsize=0)
+
+
+def test_apq_round_trip_over_http():
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/graphql", json={"extensions": persisted(QUERY)})
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.json()["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
@@ -0,0 +1,69 @@
+import orjson
+import pytest
+
+from app import eager
+from app.main import graphql_app
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.projection
+
+
+LIST_QUERIES = [
+    "query { allUsers { id } }",
+    "query { allUsers { email isActive carCount } }",
+    "query { allCars(where: {model: {startsWith: \"Model 1\"}}) { model } }",
+    "query { allGarages { title cars(orderBy: [{field: ID, direction: DESC}]) { id } } }",
+    "query { usersConnection(first: 2) { edges { cursor node { email } } pageInfo { hasNextPage } } }",
+    "query { allUsers { ...Info } } fragment Info on UserType { id email }",
+]
+
+
+def test_only_selected_columns_are_read(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=3)
+    sql_counter.clear()
+
+    execute("query { allUsers { email } allCars { model } }")
+
+    assert sql_counter[0].startswith('SELECT user.id, user.email \nFROM user ORDER BY user.id')
+    assert sql_counter[1].startswith("SELECT car.id, car.model \nFROM car ORDER BY car.id")
+
+
+def test_lean_rows_skip_the_identity_map(db_session, execute):
+    create_user_graph(db_session, users=3)
+    db_session.expunge_all()
+
+    users = execute("query { allUsers { id email } }")["allUsers"]
+
+    assert len(users) == 3
+    assert len(db_session.identity_map) == 0
+
+
+def test_relationships_keep_the_orm_path(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=2)
+    db_session.expunge_all()
+    sql_counter.clear()
+
+    execute("query { allCars { id owner { email } } }")
+
+    assert "FROM car LEFT OUTER JOIN user" in sql_counter[0]
+    assert len(db_session.identity_map) > 0
+
+
+@pytest.mark.parametrize("query", LIST_QUERIES)
+def test_lean_and_orm_paths_agree(db_session, execute, monkeypatch, query):
+    create_user_graph(db_session, users=3)
+
+    lean = execute(query)
+    monkeypatch.setattr(eager, "LEAN_READS", False)
+    orm = execute(query)
+
+    assert lean == orm
+
+
+def test_responses_are_encoded_with_orjson(client, db_session):
+    create_user_graph(db_session, users=2)
+
+    response = client.post("/graphql", json={"query": "{ allUsers { id email } }"})
+
+    assert response.content == orjson.dumps(response.json())
+    assert graphql_app.encode_json({"data": {"n": 1}}) == b'{"data":{"n":1}}'
@@ -0,0 +1,127 @@
+import pytest
+from app.main import schema
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.batching
+
+
+ALL_API_DATA_QUERY = """
+    query {
+    allUsers {
+        id
+        email
+        isActive
+        houses {
+            id
+            title
+        }
+        garages {
+            id
+            title
+        }
+        cars {
+            id
+            model
+        }
+        driverLicense {
+            id
+            number
+        }
+    }
+    }
+"""
+
+BACK_REFERENCES_QUERY = """
+    query {
+    allCars {
+        id
+        owner {
+            id
+            email
+        }
+        garage {
+            id
+            house {
+                id
+                owner {
+                    id
+                }
+            }
+        }
+    }
+    }
+"""
+
+
+def count_statements(execute, sql_counter, query):
+    sql_counter.clear()
+    data = execute(query)
+    return len(sql_counter), data
+
+
+@pytest.mark.parametrize("query", [ALL_API_DATA_QUERY, BACK_REFERENCES_QUERY])
+def test_statement_count_does_not_grow_with_rows(db_session, execute, sql_counter, query):
+    create_user_graph(db_session, users=2)
+    small, _ = count_statements(execute, sql_counter, query)
+
+    create_user_graph(db_session, users=25)
+    large, _ = count_statements(execute, sql_counter, query)
+
+    assert small == large
+
+
+def test_all_api_data_runs_one_query_per_relationship(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=10)
+
+    statements, data = count_statements(execute, sql_counter, ALL_API_DATA_QUERY)
+
+    # allUsers joined with driverLicense + houses + garages + cars
+    assert statements == 4
+    assert len(data["allUsers"]) == 10
+    for user in data["allUsers"]:
+        assert len(user["houses"]) == 1
+        assert len(user["garages"]) == 1
+        assert len(user["cars"]) == 2
+        assert user["driverLicense"]["number"].startswith("DL-")
+
+
+def test_aliased_user_lookups_are_merged(db_session, execute, sql_counter):
+    users = create_user_graph(db_session, users=2)
+    query = """
+        query Users($first: Int!, $second: Int!) {
+        Alex: user(id: $first) {
+            id
+            email
+        }
+        Bob: user(id: $second) {
+            id
+            email
+        }
+        }
+    """
+    (first, first_email), (second, second_email) = [(u.id, u.email) for u in users]
+    sql_counter.clear()
+
+    data = execute(query, {"first": first, "second": second})
+
+    assert len(sql_counter) == 1
+    assert data["Alex"]["email"] == first_email
+    assert data["Bob"]["email"] == second_email
+
+
+def test_back_references_go_straight_to_target(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=10)
+
+    statements, data = count_statements(execute, sql_counter, BACK_REFERENCES_QUERY)
+
+    # allCars joined with owner and garage -> house -> owner
+    assert statements == 1
+    for car in data["allCars"]:
+        assert car["owner"]["id"] == car["garage"]["house"]["owner"]["id"]
+
+
+@pytest.mark.parametrize("type_name", ["DriverLicenceType", "CarType", "GarageType", "HouseType"])
+def test_foreign_keys_are_not_exposed_in_schema(type_name):
+    fields = {field.name for field in schema.get_type_by_name(type_name).fields}
+
+    assert not fields & {"owner_id", "house_id", "garage_id", "user_id"}
@@ -0,0 +1,101 @@
+import pytest
+from graphql import parse
+
+from app.cost import DEFAULT_LIST_SIZE, FIELD_WEIGHTS, LIST_SIZES, MAX_QUERY_COST, MAX_QUERY_DEPTH, QueryCost
+from app.main import schema
+from app.pagination import DEFAULT_PAGE_SIZE
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.cost
+
+
+def measure(query: str, variables: dict = None):
+    return QueryCost(schema._schema, parse(query), variables=variables).measure()
+
+
+def nested_cars(levels: int) -> str:
+    """allCars { owner { cars { owner { cars ... { id } } } } }"""
+    inner = "id"
+    for _ in range(levels):
+        inner = f"owner {{ cars {{ {inner} }} }}"
+    return f"{{ allCars {{ {inner} }} }}"
+
+
+def test_scalars_are_free_and_lists_multiply():
+    assert measure("{ user(id: 1) { id email } }") == (1, 2)
+    assert measure("{ allUsers { id } }") == (1, 2)
+    assert measure("{ allUsers { id cars { id } } }") == (1 + LIST_SIZES["Query.allUsers"] * (1 + 0), 3)
+
+    cost, _ = measure("{ allUsers { houses { garages { id } } } }")
+    assert cost == 1 + LIST_SIZES["Query.allUsers"] * (1 + DEFAULT_LIST_SIZE * 1)
+
+
+def test_connections_multiply_by_page_size():
+    query = "query ($n: Int) { usersConnection(first: $n) { edges { node { id houses { id } } } pageInfo { hasNextPage } } }"
+
+    small, depth = measure(query, {"n": 2})
+    default, _ = measure(query, {})
+
+    # usersConnection + edges + pageInfo, then node + houses per edge
+    assert small == 1 + 1 + 1 + 2 * (1 + 1)
+    assert default == 1 + 1 + 1 + DEFAULT_PAGE_SIZE * (1 + 1)
+    assert depth == 5
+
+
+def test_fragments_are_counted():
+    with_fragment = "{ allUsers { ...U } } fragment U on UserType { cars { id } }"
+    inline = "{ allUsers { ... on UserType { cars { id } } } }"
+
+    assert measure(with_fragment) == measure("{ allUsers { cars { id } } }")
+    assert measure(inline) == measure("{ allUsers { cars { id } } }")
+
+
+def test_introspection_is_not_charged():
+    assert measure("{ __schema { types { name fields { name type { ofType { ofType { name } } } } } } }") == (0, 1)
+
+
+@pytest.mark.parametrize("key", [*LIST_SIZES, *FIELD_WEIGHTS])
+def test_weights_name_schema_fields(key):
+    type_name, field = key.split(".")
+    assert field in schema._schema.type_map[type_name].fields
+
+
+def test_cost_is_reported_in_extensions(db_session, execute_raw):
+    create_user_graph(db_session, users=1)
+
+    result = execute_raw("{ allUsers { id cars { id } } }")
+
+    assert result.errors is None
+    assert result.extensions["cost"] == {
+        "requested": 1 + LIST_SIZES["Query.allUsers"],
+        "maximum": MAX_QUERY_COST,
+        "depth": 3,
+        "maxDepth": MAX_QUERY_DEPTH,
+    }
+
+
+def test_too_deep_query_is_rejected_before_any_sql(execute_raw, sql_counter):
+    result = execute_raw(nested_cars(5))
+
+    assert result.data is None
+    assert result.errors[0].message == f"Query depth 12 exceeds the maximum of {MAX_QUERY_DEPTH}"
+    assert result.errors[0].extensions == {"code": "QUERY_TOO_DEEP"}
+    assert sql_counter == []
+
+
+def test_too_expensive_query_is_rejected_before_any_sql(execute_raw, sql_counter):
+    # every car's owner's whole tree: 1 + 100 * (1 + 10 * (1 + 1 + 10 * (1 + 10)))
+    result = execute_raw("{ allUsers { cars { owner { houses { garages { cars { id } } } } } } }")
+
+    assert result.data is None
+    assert result.errors[0].message == f"Query cost 112101 exceeds the maximum of {MAX_QUERY_COST}"
+    assert result.errors[0].extensions == {"code": "QUERY_TOO_EXPENSIVE"}
+    assert result.extensions["cost"]["requested"] == 112101
+    assert sql_counter == []
+
+
+def test_verdict_follows_variables_not_the_document_cache(execute_raw):
+    query = "query ($n: Int) { usersConnection(first: $n) { edges { node { houses { garages { cars { id } } } } } } }"
+
+    assert execute_raw(query, {"n": 1000}).errors[0].extensions == {"code": "QUERY_TOO_EXPENSIVE"}
+    assert execute_raw(query, {"n": 10}).errors is None
@@ -0,0 +1,15 @@
+"""The mutation tests again, with every single-row mutation going through the write queue."""
+import pytest
+
+from app import write_queue
+from testing.tests.test_create_user_negative import test_create_user_with_the_same_email_is_forbidden  # noqa: F401
+from testing.tests.test_create_user_positive import *  # noqa: F401,F403
+from testing.tests.test_entity_cache import *  # noqa: F401,F403
+from testing.tests.test_write_path import *  # noqa: F401,F403
+
+pytestmark = pytest.mark.write_queue
+
+
+@pytest.fixture(autouse=True)
+def queued(monkeypatch):
+    monkeypatch.setattr(write_queue, "WRITE_QUEUE_ENABLED", True)
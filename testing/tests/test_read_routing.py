@@ -0,0 +1,151 @@
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import db
+from app.db import get_read_engine, make_engine, read_engines_of, read_only_url
+
+pytestmark = pytest.mark.read_routing
+
+
+def sync_engine_of(engine):
+    return engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'routing.db'}")
+    yield engine
+    if not isinstance(engine, AsyncEngine):  # `client` disposes async engines on its event loop
+        engine.dispose()
+
+
+@pytest.fixture
+def client_engine(engine):
+    """A file database: an in-memory one is read through the writer."""
+    return engine
+
+
+@pytest.fixture
+def statements(engine):
+    """SQL statements sent through the writer and through the read engine."""
+    sent = {"writer": [], "reader": []}
+    listeners = []
+    for name, e in (("writer", engine), ("reader", get_read_engine(engine))):
+        listener = lambda conn, cursor, statement, *_, sent=sent[name]: sent.append(statement)  # noqa: E731
+        event.listen(sync_engine_of(e), "before_cursor_execute", listener)
+        listeners.append((sync_engine_of(e), listener))
+    yield sent
+    for e, listener in listeners:
+        event.remove(e, "before_cursor_execute", listener)
+
+
+def post(client, query: str):
+    response = client.post("/graphql", json={"query": query})
+    response.raise_for_status()
+    return response.json()
+
+
+# -----------------------
+# Engines
+# -----------------------
+def test_read_only_url():
+    url = make_url(read_only_url("sqlite:///./app.db"))
+    assert (url.database, dict(url.query)) == ("file:./app.db", {"mode": "ro", "uri": "true"})
+    assert read_only_url("sqlite://") == "sqlite://"
+    assert read_only_url("postgresql://reader@replica/app") == "postgresql://reader@replica/app"
+
+
+def test_read_connections_refuse_writes(engine, client):
+    reader = make_engine(str(sync_engine_of(engine).url.set(drivername="sqlite")), mode="sync", read_only=True)
+    try:
+        with reader.connect() as conn:
+            assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+            with pytest.raises(OperationalError, match="readonly"):
+                conn.execute(text("INSERT INTO user (email, is_active) VALUES ('ro@mail.com', 1)"))
+    finally:
+        reader.dispose()
+
+
+def test_in_memory_databases_are_read_through_the_writer(db_engine):
+    assert get_read_engine(db_engine) is db_engine
+
+
+def test_read_engine_is_shared_per_writer(engine):
+    assert get_read_engine(engine) is get_read_engine(engine)
+    assert get_read_engine(engine) is not engine
+
+
+def test_read_database_urls_are_taken_in_turn(tmp_path, engine, monkeypatch):
+    urls = [f"sqlite:///{tmp_path / 'replica1.db'}", f"sqlite:///{tmp_path / 'replica2.db'}"]
+    monkeypatch.setattr(db, "READ_DATABASE_URLS", urls)
+    other_mode = "sync" if isinstance(engine, AsyncEngine) else "async"
+    other = make_engine(f"sqlite:///{tmp_path / 'other.db'}", mode=other_mode)
+    try:
+        picked = [get_read_engine(engine) for _ in range(4)]
+        get_read_engine(other)
+
+        replicas = [f"file:{tmp_path / name}" for name in ("replica1.db", "replica2.db")]
+        assert [sync_engine_of(e).url.database for e in picked] == replicas * 2
+        assert picked[0] is picked[2] and picked[1] is picked[3]
+        assert read_engines_of(engine) == picked[:2]
+        # replicas of its own for every writer, in that writer's mode
+        assert not set(read_engines_of(other)) & set(picked)
+        assert [isinstance(e, AsyncEngine) for e in read_engines_of(other)] == [other_mode == "async"] * 2
+    finally:
+        # nothing connected yet, so async engines need no event loop to be disposed
+        for e in (*read_engines_of(engine), other, *read_engines_of(other)):
+            sync_engine_of(e).dispose()
+
+
+# -----------------------
+# Routing
+# -----------------------
+def test_queries_run_on_the_read_engine(client, statements):
+    post(client, 'mutation { createUser(email: "r@mail.com") { id } }')
+    statements["writer"].clear()
+
+    result = post(client, "{ allUsers { email houses { id } } user(id: 1) { email } }")
+
+    assert result["data"]["user"] == {"email": "r@mail.com"}
+    assert statements["reader"]
+    assert statements["writer"] == []
+
+
+def test_mutations_never_run_on_a_read_connection(client, statements):
+    post(client, 'mutation { createUser(email: "w@mail.com") { id } }')
+    result = post(
+        client,
+        """
+        mutation {
+          createHouse(title: "H", ownerId: 1) { id owner { email houses { title } } }
+          createCar(model: "C", ownerId: 1) { owner { cars { model } } }
+        }
+        """,
+    )
+
+    assert result["data"]["createHouse"]["owner"] == {"email": "w@mail.com", "houses": [{"title": "H"}]}
+    assert result["data"]["createCar"]["owner"] == {"cars": [{"model": "C"}]}
+    assert any(s.startswith("INSERT") for s in statements["writer"])
+    assert statements["reader"] == []
+
+
+def test_batches_stay_on_the_writer(client, statements):
+    response = client.post(
+        "/graphql",
+        json=[{"query": 'mutation { createUser(email: "b@mail.com") { id } }'}, {"query": "{ allUsers { email } }"}],
+    )
+
+    assert response.json()[0]["data"] == {"createUser": {"id": 1}}
+    assert statements["reader"] == []
+
+
+def test_routing_can_be_turned_off(client, statements, monkeypatch):
+    monkeypatch.setattr(db, "READ_ROUTING", False)
+
+    post(client, "{ allUsers { id } }")
+
+    assert statements["writer"]
+    assert statements["reader"] == []
@@ -0,0 +1,142 @@
+import pytest
+
+from app import batching
+from app.entity_cache import entity_cache
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.request_batching
+
+
+USER_QUERY = "query ($id: Int!) { user(id: $id) { id email } }"
+CARS_QUERY = "{ allCars { id model owner { id } } }"
+
+
+def user_selects(statements) -> list:
+    return [s for s in statements if "\nFROM user" in s]
+
+
+def test_batch_returns_one_result_per_operation_in_order(client, db_session):
+    create_user_graph(db_session, users=3)
+
+    response = client.post(
+        "/graphql",
+        json=[
+            {"query": USER_QUERY, "variables": {"id": 2}},
+            {"query": CARS_QUERY},
+            {"query": USER_QUERY, "variables": {"id": 1}},
+        ],
+    )
+
+    assert response.status_code == 200
+    first, cars, last = response.json()
+    assert first["data"]["user"]["id"] == 2
+    assert len(cars["data"]["allCars"]) == 6
+    assert last["data"]["user"]["id"] == 1
+
+
+def test_operations_share_loaders(client, db_session, sql_counter):
+    create_user_graph(db_session, users=3)
+    sql_counter.clear()
+
+    response = client.post("/graphql", json=[{"query": USER_QUERY, "variables": {"id": id}} for id in (1, 2, 1, 3, 2)])
+
+    assert [r["data"]["user"]["id"] for r in response.json()] == [1, 2, 1, 3, 2]
+    # five lookups across five operations, one query for the three distinct users
+    (select,) = user_selects(sql_counter)
+    assert "IN (?, ?, ?)" in select
+
+
+def test_batch_issues_fewer_statements_than_separate_requests(client, db_session, sql_counter):
+    create_user_graph(db_session, users=3)
+    operations = [{"query": USER_QUERY, "variables": {"id": id}} for id in (1, 2, 3)] + [{"query": CARS_QUERY}]
+
+    sql_counter.clear()
+    separate = [client.post("/graphql", json=operation).json() for operation in operations]
+    separate_statements = len(sql_counter)
+    # or the batch would find every user in the entity cache
+    entity_cache.clear()
+    sql_counter.clear()
+    batched = client.post("/graphql", json=operations).json()
+
+    assert batched == separate
+    assert len(sql_counter) < separate_statements
+
+
+def test_failing_operations_do_not_fail_the_batch(client, db_session):
+    create_user_graph(db_session, users=1)
+
+    response = client.post(
+        "/graphql",
+        json=[
+            {"query": "{ allUsers { nope } }"},
+            {"query": USER_QUERY, "variables": {"id": 1}},
+            {"variables": {"id": 1}},
+            "{ allUsers { id } }",
+            {"query": 42},
+            {"query": USER_QUERY, "variables": "1"},
+            {"query": "{ allUsers { id } }", "extensions": "x"},
+            {"query": 'mutation { createHouse(title: "H", ownerId: 999) { id } }'},
+            {"query": "subscription { userCreated { id } }"},
+            {"query": "query A { stats { users } }", "operationName": "B"},
+        ],
+    )
+
+    assert response.status_code == 200
+    (
+        invalid,
+        ok,
+        missing,
+        not_an_object,
+        not_a_string,
+        bad_variables,
+        bad_extensions,
+        not_found,
+        subscription,
+        unknown,
+    ) = response.json()
+    assert "nope" in invalid["errors"][0]["message"]
+    assert ok["data"]["user"]["id"] == 1 and "errors" not in ok
+    assert missing["errors"][0]["message"] == "No GraphQL query found in the request"
+    assert not_an_object["errors"][0]["message"] == "Each batched operation must be a JSON object."
+    assert "`query` must be a string" in not_a_string["errors"][0]["message"]
+    assert "`variables` must be an object" in bad_variables["errors"][0]["message"]
+    assert "`extensions` must be an object" in bad_extensions["errors"][0]["message"]
+    assert not_found["errors"][0]["message"] == "404: Owner not found"
+    assert subscription == {"data": None, "errors": [{"message": "Subscription operations can't be batched."}]}
+    assert unknown["errors"][0]["message"] == 'Unknown operation named "B".'
+
+
+def test_mutations_in_a_batch_are_committed(client, db_session):
+    response = client.post(
+        "/graphql",
+        json=[
+            {"query": 'mutation { createUser(email: "b1@mail.com") { id } }'},
+            {"query": 'mutation { createUser(email: "b2@mail.com") { id } }'},
+        ],
+    )
+    assert all("errors" not in result for result in response.json())
+
+    users = client.post("/graphql", json={"query": "{ allUsers { email } }"}).json()
+    assert sorted(u["email"] for u in users["data"]["allUsers"]) == ["b1@mail.com", "b2@mail.com"]
+
+
+def test_oversized_batch_is_rejected(client, monkeypatch):
+    monkeypatch.setitem(batching.batching_config, "max_operations", 2)
+
+    response = client.post("/graphql", json=[{"query": "{ stats { users } }"}] * 3)
+
+    assert response.status_code == 400
+    assert "Too many operations" in response.text
+
+
+def test_single_operation_is_not_wrapped(client):
+    response = client.post("/graphql", json={"query": "{ stats { users } }"})
+
+    assert response.json()["data"] == {"stats": {"users": 0}}
+
+
+def test_empty_batch_returns_an_empty_array(client):
+    response = client.post("/graphql", json=[])
+
+    assert response.status_code == 200
+    assert response.json() == []
@@ -0,0 +1,162 @@
+import pytest
+from graphql import parse
+
+from app import response_cache as response_cache_module
+from app.main import schema
+from app.response_cache import CacheBackend, InMemoryBackend, parse_ttls, plan, response_cache
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.response_cache
+
+
+USERS = "{ allUsers { id email } }"
+USER_CARS = "query ($id: Int!) { user(id: $id) { id cars { id model } } }"
+
+
+@pytest.fixture(autouse=True)
+def enabled_cache(monkeypatch):
+    response_cache.clear()
+    monkeypatch.setattr(response_cache, "enabled", True)
+    yield
+    response_cache.clear()
+
+
+def test_repeated_query_skips_the_database(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=2)
+    sql_counter.clear()
+
+    first = execute(USERS)
+    statements = len(sql_counter)
+    second = execute(USERS)
+
+    assert first == second
+    assert statements > 0
+    assert len(sql_counter) == statements
+    assert response_cache.stats() == (1, 1, 0.5)
+
+
+def test_key_covers_variables_and_ignores_formatting(db_session, execute):
+    create_user_graph(db_session, users=2)
+
+    one = execute(USER_CARS, {"id": 1})
+    two = execute(USER_CARS, {"id": 2})
+    reformatted = execute("query($id:Int!){user(id:$id){id cars{id model}}}", {"id": 1})
+
+    assert one != two
+    assert reformatted == one
+    assert response_cache.stats()[:2] == (1, 2)
+
+
+@pytest.mark.parametrize(
+    "mutation",
+    [
+        'mutation { createCar(model: "New", ownerId: 1, garageId: 1) { id } }',
+        "mutation { transferCar(carId: 3, newOwnerId: 1, newGarageId: 1) { id } }",
+        'mutation { createCars(cars: [{model: "New", ownerId: 1, garageId: 1}]) { created { id } } }',
+    ],
+)
+def test_mutations_invalidate_tables_they_write(db_session, execute, mutation):
+    create_user_graph(db_session, users=2)
+    before = execute(USER_CARS, {"id": 1})
+
+    execute(mutation)
+    after = execute(USER_CARS, {"id": 1})
+
+    assert len(after["user"]["cars"]) == len(before["user"]["cars"]) + 1
+
+
+def test_writes_to_unrelated_tables_keep_entries(db_session, execute):
+    create_user_graph(db_session, users=1)
+    execute(USER_CARS, {"id": 1})
+
+    execute('mutation { createHouse(title: "H", ownerId: 1) { id } }')
+    execute(USER_CARS, {"id": 1})
+
+    assert response_cache.stats().hits == 1
+
+
+def test_failed_mutation_does_not_invalidate(db_session, execute, execute_raw):
+    create_user_graph(db_session, users=1)
+    execute(USER_CARS, {"id": 1})
+
+    assert execute_raw('mutation { createCar(model: "C", ownerId: 1, garageId: 999) { id } }').errors
+    execute(USER_CARS, {"id": 1})
+
+    assert response_cache.stats().hits == 1
+
+
+def test_mutations_and_errors_are_not_cached(db_session, execute, execute_raw):
+    create_user_graph(db_session, users=1)
+
+    execute('mutation { createHouse(title: "H", ownerId: 1) { id } }')
+    execute('mutation { createHouse(title: "H", ownerId: 1) { id } }')
+    execute_raw("{ usersConnection(first: -1) { edges { node { id } } } }")
+    execute_raw("{ usersConnection(first: -1) { edges { node { id } } } }")
+
+    assert response_cache.stats().hits == 0
+    assert len(response_cache.backend) == 0
+
+
+def test_ttl_is_the_smallest_among_selected_types_and_fields(monkeypatch):
+    monkeypatch.setattr(response_cache_module, "RESPONSE_CACHE_TTLS", {"CarType": 5, "Query.user": 30})
+
+    cars = plan(schema._schema, parse(USER_CARS), None)
+    user = plan(schema._schema, parse("{ user(id: 1) { id } }"), None)
+    houses = plan(schema._schema, parse("{ allHouses { id } }"), None)
+
+    assert cars == ({"user", "car"}, 5)
+    assert user == ({"user"}, 30)
+    assert houses == ({"house"}, response_cache_module.RESPONSE_CACHE_TTL)
+
+
+def test_ttls_setting_is_parsed():
+    assert parse_ttls("UserType=5, Query.allCars=1.5,") == {"UserType": 5.0, "Query.allCars": 1.5}
+    assert parse_ttls("") == {}
+    with pytest.raises(ValueError):
+        parse_ttls("UserType")
+    with pytest.raises(ValueError):
+        parse_ttls("UserType=soon")
+
+
+def test_backends_must_implement_every_operation():
+    class Partial(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_zero_ttl_keeps_operation_out_of_the_cache(db_session, execute, monkeypatch):
+    monkeypatch.setattr(response_cache_module, "RESPONSE_CACHE_TTLS", {"Query.allUsers": 0})
+
+    execute(USERS)
+    execute(USERS)
+
+    assert response_cache.stats() == (0, 0, 0.0)
+
+
+def test_backend_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(response_cache_module.time, "monotonic", lambda: now[0])
+    backend = InMemoryBackend(maxsize=2)
+
+    backend.set("a", 1, ttl=10)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == (1, None, 3)
+
+    now[0] = 111.0
+    assert backend.get("a") is None
+    assert backend.get("c") == 3
+
+
+def test_versions_survive_eviction():
+    backend = InMemoryBackend(maxsize=1)
+
+    backend.incr("version:car")
+    backend.set("a", 1)
+    backend.set("b", 2)
+
+    assert backend.get("version:car") == 1
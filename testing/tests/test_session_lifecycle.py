@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+from app import db
+from app.db import POOL_SIZE, get_read_engine, make_engine
+
+pytestmark = pytest.mark.soak
+
+
+REQUESTS = 300
+
+CREATE_USER_MUTATION = """
+    mutation CreateUser($email: String!) {
+    createUser(email: $email) {
+        id
+    }
+    }
+"""
+
+CREATE_HOUSE_FOR_MISSING_OWNER_MUTATION = """
+    mutation {
+    createHouse(title: "Nobody's house", ownerId: 100000) {
+        id
+    }
+    }
+"""
+
+ALL_USERS_QUERY = """
+    query {
+    allUsers {
+        id
+        cars { id }
+    }
+    }
+"""
+
+
+@pytest.fixture
+def client_engine(tmp_path):
+    """A file database with a real connection pool, for `client`."""
+    engine = make_engine(f"sqlite:///{tmp_path / 'soak.db'}", mode="sync")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_open_connections_stay_flat_under_sustained_load(client, client_engine, monkeypatch):
+    # mutations run on the writer's pool, the query on the read engine's (see app.routing)
+    monkeypatch.setattr(db, "READ_ROUTING", True)
+    pools = {"writer": client_engine.pool, "reader": get_read_engine(client_engine).pool}
+    open_connections = {name: [] for name in pools}
+
+    for i in range(REQUESTS):
+        if i % 3 == 0:
+            payload = {"query": CREATE_USER_MUTATION, "variables": {"email": f"soak{i}@mail.com"}}
+        elif i % 3 == 1:
+            payload = {"query": CREATE_HOUSE_FOR_MISSING_OWNER_MUTATION}
+        else:
+            payload = {"query": ALL_USERS_QUERY}
+        response = client.post("/graphql", json=payload)
+        assert response.status_code == 200
+
+        for name, pool in pools.items():
+            assert pool.checkedout() == 0, f"request {i} left a {name} connection checked out"
+            open_connections[name].append(pool.checkedin())
+
+    for name, counts in open_connections.items():
+        assert 0 < max(counts) <= POOL_SIZE, name
+        assert counts[-1] == counts[REQUESTS // 10], name
+    assert len(client.post("/graphql", json={"query": ALL_USERS_QUERY}).json()["data"]["allUsers"]) == REQUESTS // 3
+
+
+def test_connections_use_wal_and_tuned_pragmas(client_engine):
+    with client_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -64000
@@ -0,0 +1,212 @@
+import asyncio
+import time
+
+import pytest
+
+from app import pubsub
+from app.main import CarType, build_context, schema
+from app.pubsub import Broker, InProcessBroker, SubscriberTooSlow, decode_event, encode_event
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.subscriptions
+
+
+@pytest.fixture(autouse=True)
+def broker():
+    """A broker of the test's own, so no subscriber outlives its test."""
+    broker = InProcessBroker(queue_size=10)
+    previous = pubsub.set_broker(broker)
+    yield broker
+    pubsub.set_broker(previous)
+
+
+async def wait_for_subscribers(broker: InProcessBroker, topic: str, count: int = 1):
+    for _ in range(1000):
+        if broker.subscriber_count(topic) >= count:
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError(f"{topic} never got {count} subscribers")
+
+
+def subscribe(session, query: str):
+    async def start():
+        return await schema.subscribe(query, context_value=build_context(session))
+
+    return start()
+
+
+# -----------------------
+# Broker
+# -----------------------
+def test_fan_out_shares_one_event_object(broker):
+    async def run():
+        event = {"id": 1}
+        async with broker.subscribe("t") as first, broker.subscribe("t") as second:
+            assert broker.subscriber_count("t") == 2
+            await broker.publish("t", [event])
+            assert await anext(first) is event
+            assert await anext(second) is event
+        assert broker.subscriber_count("t") == 0
+
+    asyncio.run(run())
+
+
+def test_publish_without_subscribers_is_a_no_op(broker):
+    asyncio.run(broker.publish("nobody", [{"id": 1}]))
+
+    assert broker.subscriber_count("nobody") == 0
+
+
+def test_slow_subscriber_is_dropped_without_blocking_others(broker):
+    async def run():
+        async with broker.subscribe("t") as slow, broker.subscribe("t") as fast:
+            for i in range(15):
+                await broker.publish("t", [{"id": i}])
+                assert (await anext(fast))["id"] == i
+            assert broker.subscriber_count("t") == 1
+            with pytest.raises(SubscriberTooSlow):
+                await anext(slow)
+
+    asyncio.run(run())
+
+
+def test_queue_size_must_be_positive():
+    with pytest.raises(ValueError):
+        InProcessBroker(queue_size=0)
+
+
+def test_wire_format_round_trip(db_session):
+    create_user_graph(db_session, users=1)
+    row = db_session.connection().exec_driver_sql("SELECT id, model, owner_id, garage_id FROM car").first()
+
+    topic, events = decode_event(encode_event(pubsub.CAR_CREATED, [row]))
+
+    assert topic == pubsub.CAR_CREATED
+    assert CarType.from_row(events[0]) == CarType.from_row(row)
+
+
+# -----------------------
+# Schema
+# -----------------------
+def test_transfer_is_delivered_to_matching_subscriptions(db_session, broker):
+    create_user_graph(db_session, users=2)
+
+    async def run():
+        mine = await subscribe(db_session, "subscription { carTransferred(ownerId: 2) { id owner { id email } } }")
+        other = await subscribe(db_session, "subscription { carTransferred(ownerId: 1) { id } }")
+        received = asyncio.ensure_future(anext(mine))
+        ignored = asyncio.ensure_future(anext(other))
+        await wait_for_subscribers(broker, pubsub.CAR_TRANSFERRED, 2)
+
+        result = await schema.execute(
+            "mutation { transferCar(carId: 1, newOwnerId: 2) { id } }", context_value=build_context(db_session)
+        )
+        assert result.errors is None
+
+        event = await asyncio.wait_for(received, 1)
+        await asyncio.sleep(0.01)
+        assert not ignored.done()
+        ignored.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await ignored
+        await mine.aclose()
+        await other.aclose()
+        return event
+
+    event = asyncio.run(run())
+
+    assert event.errors is None
+    assert event.data["carTransferred"]["id"] == 1
+    assert event.data["carTransferred"]["owner"]["id"] == 2
+
+
+def test_bulk_mutation_publishes_every_created_row(db_session, broker):
+    create_user_graph(db_session, users=1)
+
+    async def run():
+        stream = await subscribe(db_session, "subscription { carCreated(ownerId: 1) { model } }")
+        first = asyncio.ensure_future(anext(stream))
+        await wait_for_subscribers(broker, pubsub.CAR_CREATED)
+        await schema.execute(
+            'mutation { createCars(cars: [{model: "A", ownerId: 1}, {model: "B", ownerId: 1}]) { created { id } } }',
+            context_value=build_context(db_session),
+        )
+        models = [(await first).data["carCreated"]["model"], (await anext(stream)).data["carCreated"]["model"]]
+        await stream.aclose()
+        return models
+
+    assert asyncio.run(run()) == ["A", "B"]
+
+
+def test_failed_mutation_publishes_nothing(db_session, broker):
+    async def run():
+        async with broker.subscribe(pubsub.HOUSE_CREATED) as stream:
+            result = await schema.execute(
+                'mutation { createHouse(title: "H", ownerId: 999) { id } }', context_value=build_context(db_session)
+            )
+            assert result.errors
+            assert stream.queue.empty()
+
+    asyncio.run(run())
+
+
+class RelayBroker(Broker):
+    """Sends every event through the wire format, as a broker between processes would."""
+
+    def __init__(self):
+        self.local = InProcessBroker()
+        self.messages = []
+
+    async def publish(self, topic, events):
+        message = encode_event(topic, events)
+        self.messages.append(message)
+        await self.local.publish(*decode_event(message))
+
+    def subscribe(self, topic):
+        return self.local.subscribe(topic)
+
+
+def test_pluggable_broker_carries_decoded_events(db_session):
+    create_user_graph(db_session, users=1)
+    relay = RelayBroker()
+    pubsub.set_broker(relay)
+
+    async def run():
+        stream = await subscribe(db_session, "subscription { userCreated { id email houses { id } } }")
+        event = asyncio.ensure_future(anext(stream))
+        await wait_for_subscribers(relay.local, pubsub.USER_CREATED)
+        await schema.execute('mutation { createUser(email: "relay@mail.com") { id } }', context_value=build_context(db_session))
+        result = await event
+        await stream.aclose()
+        return result
+
+    result = asyncio.run(run())
+
+    assert result.errors is None
+    assert result.data["userCreated"] == {"id": 2, "email": "relay@mail.com", "houses": []}
+    assert len(relay.messages) == 1
+
+
+# -----------------------
+# WebSocket
+# -----------------------
+def test_subscription_over_websocket(client, db_session, broker):
+    create_user_graph(db_session, users=1)
+
+    with client.websocket_connect("/graphql", subprotocols=["graphql-transport-ws"]) as ws:
+        ws.send_json({"type": "connection_init"})
+        assert ws.receive_json() == {"type": "connection_ack"}
+        ws.send_json(
+            {"id": "1", "type": "subscribe", "payload": {"query": "subscription { carCreated { model owner { id } } }"}}
+        )
+        deadline = time.monotonic() + 5
+        while broker.subscriber_count(pubsub.CAR_CREATED) == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+
+        client.post("/graphql", json={"query": 'mutation { createCar(model: "Live", ownerId: 1) { id } }'})
+
+        message = ws.receive_json()  # a text frame, whatever the HTTP encoder returns
+        assert message["id"] == "1" and message["type"] == "next"
+        assert message["payload"]["data"] == {"carCreated": {"model": "Live", "owner": {"id": 1}}}
+        ws.send_json({"id": "1", "type": "complete"})
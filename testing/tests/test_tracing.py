@@ -0,0 +1,134 @@
+import asyncio
+import logging
+
+import pytest
+from sqlmodel import SQLModel, Session
+
+from app import tracing
+from app.db import make_engine, new_session
+from app.main import build_context, schema
+from app.metrics import CACHE_LOOKUPS
+from app.response_cache import response_cache
+from app.tracing import DEBUG_HEADER, OPERATION_SECONDS, SQL_STATEMENTS
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.tracing
+
+
+USERS_QUERY = "{ allUsers { id cars { id garage { id } } } }"
+
+
+def test_debug_header_returns_the_trace(client, db_session, sql_counter):
+    create_user_graph(db_session, users=3)
+    sql_counter.clear()
+
+    response = client.post("/graphql", json={"query": USERS_QUERY}, headers={DEBUG_HEADER: "1"})
+    trace = response.json()["extensions"]["tracing"]
+
+    assert trace["sql"]["statements"] == len(sql_counter)
+    assert trace["sql"]["rows"] == 3 + 6 + 3  # users, cars, garages
+    assert trace["durationMs"] >= trace["sql"]["durationMs"] > 0
+    paths = {resolver["path"] for resolver in trace["resolvers"]}
+    assert {"allUsers", "allUsers.0.cars", "allUsers.2.cars.1.garage"} <= paths
+    fields = {resolver["field"] for resolver in trace["resolvers"]}
+    assert fields == {"Query.allUsers", "UserType.cars", "CarType.garage"}
+
+
+def test_trace_is_not_returned_without_the_header(client):
+    response = client.post("/graphql", json={"query": USERS_QUERY})
+
+    assert "tracing" not in (response.json().get("extensions") or {})
+
+
+def test_metrics_route_serves_prometheus_histograms(client, db_session):
+    # a user, so UserType.cars gets resolved even when no earlier test did it in this process
+    create_user_graph(db_session, users=1)
+    before = OPERATION_SECONDS.count("query")
+
+    client.post("/graphql", json={"query": USERS_QUERY})
+    client.post("/graphql", json={"query": 'mutation { createUser(email: "m@mail.com") { id } }'})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert OPERATION_SECONDS.count("query") == before + 1
+    lines = response.text.splitlines()
+    assert "# TYPE graphql_operation_duration_seconds histogram" in lines
+    assert f'graphql_operation_duration_seconds_count{{operation="query"}} {before + 1}' in lines
+    assert any(line.startswith('graphql_sql_statements_bucket{operation="mutation",le="+Inf"}') for line in lines)
+    assert any(line.startswith('graphql_resolver_duration_seconds_count{field="UserType.cars"}') for line in lines)
+
+
+def test_metrics_route_serves_cache_lookups(client, monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", True)
+    response_cache.clear()
+    lookups = [("document", "hit"), ("response", "hit"), ("response", "miss")]
+    before = {lookup: CACHE_LOOKUPS.value(*lookup) for lookup in lookups}
+
+    for _ in range(2):
+        client.post("/graphql", json={"query": "{ allUsers { id email } }"})
+    # the counters outlive a cleared cache, as a Prometheus counter must
+    response_cache.clear()
+    lines = client.get("/metrics").text.splitlines()
+
+    # the second request finds both the parsed document and the response
+    assert CACHE_LOOKUPS.value("document", "hit") >= before["document", "hit"] + 1
+    assert CACHE_LOOKUPS.value("response", "hit") == before["response", "hit"] + 1
+    assert CACHE_LOOKUPS.value("response", "miss") == before["response", "miss"] + 1
+    assert "# TYPE graphql_cache_lookups_total counter" in lines
+    hits = CACHE_LOOKUPS.value("response", "hit")
+    assert f'graphql_cache_lookups_total{{cache="response",result="hit"}} {hits}' in lines
+
+
+def test_statements_are_charged_to_their_operation_in_async_mode(tmp_path):
+    url = f"sqlite:///{tmp_path / 'traced.db'}"
+    sync_engine = make_engine(url, mode="sync")
+    SQLModel.metadata.create_all(sync_engine)
+    with Session(sync_engine) as session:
+        create_user_graph(session, users=2)
+    sync_engine.dispose()
+
+    async def run():
+        engine = make_engine(url, mode="async")
+        session = new_session(engine)
+        try:
+            return await schema.execute(USERS_QUERY, context_value=build_context(session, debug=True))
+        finally:
+            await session.close()
+            await engine.dispose()
+
+    before = SQL_STATEMENTS.count("query")
+    result = asyncio.run(run())
+
+    assert result.errors is None
+    # users, then their cars with garages joined in (eager loading)
+    assert result.extensions["tracing"]["sql"]["statements"] == 2
+    assert result.extensions["tracing"]["sql"]["rows"] == 2 + 4 + 2
+    assert SQL_STATEMENTS.count("query") == before + 1
+
+
+def test_slow_queries_are_logged_with_their_plan(db_session, execute, caplog, monkeypatch):
+    create_user_graph(db_session, users=1)
+    monkeypatch.setattr(tracing, "SLOW_QUERY_MS", 0)
+
+    with caplog.at_level(logging.WARNING, logger="app.slow_queries"):
+        execute("{ user(id: 1) { id houses { id } } }")
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("FROM house" in message and "SEARCH house USING INDEX" in message for message in messages), messages
+    assert any("FROM user" in message and "SEARCH user USING INTEGER PRIMARY KEY" in message for message in messages)
+
+
+def test_slow_executemany_logs_only_the_first_parameter_set(db_engine, caplog, monkeypatch):
+    monkeypatch.setattr(tracing, "SLOW_QUERY_MS", 0)
+    tracing.instrument()
+
+    with caplog.at_level(logging.WARNING, logger="app.slow_queries"):
+        with db_engine.begin() as conn:
+            conn.exec_driver_sql(
+                'INSERT INTO "user" (email, is_active) VALUES (?, ?)', [(f"u{i}@mail.com", True) for i in range(50)]
+            )
+
+    message = caplog.records[-1].getMessage()
+    assert "('u0@mail.com', True) (1 of 50 parameter sets)" in message
+    assert "u1@mail.com" not in message
@@ -0,0 +1,107 @@
+import pytest
+
+from app import eager
+from app.models import User, House, Garage, Car
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.tree
+
+
+USER_TREE = """
+    query ($id: Int!) {
+    user(id: $id) {
+        email
+        houseCount
+        houses {
+            id title garageCount
+            garages { id title carCount cars { id model garage { id } } house { id } }
+        }
+    }
+    }
+"""
+
+
+@pytest.fixture
+def wide_user(db_session):
+    """A user with 3 houses of 40 garages of 25 cars, an empty house and an empty garage."""
+    user = User(email="wide@mail.com")
+    for h in range(3):
+        house = House(title=f"House {h}", owner=user)
+        for g in range(40):
+            garage = Garage(title=f"Garage {h}-{g}", owner=user, house=house)
+            for c in range(25):
+                Car(model=f"Car {h}-{g}-{c}", owner=user, garage=garage)
+    empty = House(title="Empty", owner=user)
+    Garage(title="Bare", owner=user, house=empty)
+    House(title="No garages", owner=user)
+    db_session.add(user)
+    db_session.commit()
+    return user.id
+
+
+def test_user_tree_is_one_join(db_session, execute, sql_counter, monkeypatch):
+    create_user_graph(db_session, users=3)
+
+    sql_counter.clear()
+    joined = execute(USER_TREE, {"id": 2})
+    statements = list(sql_counter)
+
+    monkeypatch.setattr(eager, "TREE_READS", False)
+    sql_counter.clear()
+    per_level = execute(USER_TREE, {"id": 2})
+
+    assert joined == per_level
+    # the user, then houses, garages and cars together
+    assert len(statements) == 2
+    assert "LEFT OUTER JOIN garage" in statements[1] and "LEFT OUTER JOIN car" in statements[1]
+    # the user, then per level its list and its count, then the cars' garage back-reference
+    assert len(sql_counter) == 8
+
+
+def test_wide_tree_is_assembled_in_id_order(db_session, execute, sql_counter, wide_user):
+    sql_counter.clear()
+
+    user = execute(USER_TREE, {"id": wide_user})["user"]
+
+    assert len(sql_counter) == 2
+    assert user["houseCount"] == 5
+    houses = user["houses"]
+    assert [h["title"] for h in houses[3:]] == ["Empty", "No garages"]
+    assert [h["garageCount"] for h in houses] == [40, 40, 40, 1, 0]
+    garages = [g for h in houses for g in h["garages"]]
+    assert [g["id"] for g in garages] == sorted(g["id"] for g in garages)
+    assert sum(g["carCount"] for g in garages) == len([c for g in garages for c in g["cars"]]) == 3000
+    assert garages[-1] == {"id": garages[-1]["id"], "title": "Bare", "carCount": 0, "cars": [], "house": {"id": houses[3]["id"]}}
+    assert all(c["garage"]["id"] == g["id"] for g in garages for c in g["cars"])
+    assert [c["model"] for c in garages[0]["cars"][:3]] == ["Car 0-0-0", "Car 0-0-1", "Car 0-0-2"]
+
+
+def test_shallow_selection_joins_only_what_is_selected(db_session, execute, sql_counter, wide_user):
+    sql_counter.clear()
+
+    user = execute("query ($id: Int!) { user(id: $id) { houses { garages { title } } } }", {"id": wide_user})["user"]
+
+    assert len(user["houses"]) == 5
+    assert len(sql_counter) == 2
+    assert "JOIN garage" in sql_counter[1] and "car" not in sql_counter[1]
+
+
+def test_filtered_level_is_left_to_the_loaders(db_session, execute, sql_counter):
+    create_user_graph(db_session, users=1)
+    sql_counter.clear()
+
+    user = execute(
+        'query { user(id: 1) { houses { garages { cars(where: {model: {startsWith: "Model 0-1"}}) { model } } } } }'
+    )["user"]
+
+    assert user["houses"][0]["garages"][0]["cars"] == [{"model": "Model 0-1"}]
+    # user, houses joined with garages, then the filtered cars
+    assert len(sql_counter) == 3
+    assert "JOIN car" not in sql_counter[1]
+
+
+def test_missing_user_loads_no_tree(execute, sql_counter):
+    sql_counter.clear()
+
+    assert execute(USER_TREE, {"id": 42})["user"] is None
+    assert len(sql_counter) == 1
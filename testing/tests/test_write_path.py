@@ -0,0 +1,59 @@
+import pytest
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.writes
+
+
+MUTATIONS = {
+    "createUser": 'mutation { createUser(email: "w@mail.com") { id email isActive } }',
+    "createHouse": 'mutation { createHouse(title: "H", ownerId: 1) { id title } }',
+    "createGarage": 'mutation { createGarage(title: "G", ownerId: 1, houseId: 1) { id title } }',
+    "createCar": 'mutation { createCar(model: "C", ownerId: 1, garageId: 1) { id model } }',
+    "assignGarageToHouse": "mutation { assignGarageToHouse(garageId: 1, houseId: 2) { id title } }",
+    "transferCar": "mutation { transferCar(carId: 1, newOwnerId: 2, newGarageId: 2) { id model } }",
+}
+
+
+@pytest.mark.parametrize("name", MUTATIONS)
+def test_mutation_runs_at_most_two_statements(db_session, execute, sql_counter, name):
+    create_user_graph(db_session, users=2)
+    sql_counter.clear()
+
+    data = execute(MUTATIONS[name])[name]
+
+    assert len(sql_counter) <= 2, sql_counter
+    assert "RETURNING" in sql_counter[-1]
+    assert isinstance(data["id"], int)
+
+
+def test_transfer_car_returns_updated_references(db_session, execute):
+    create_user_graph(db_session, users=2)
+
+    car = execute(
+        "mutation { transferCar(carId: 1, newOwnerId: 2, newGarageId: 2) { id owner { id } garage { id } } }"
+    )["transferCar"]
+
+    assert car == {"id": 1, "owner": {"id": 2}, "garage": {"id": 2}}
+
+
+@pytest.mark.parametrize(
+    "mutation, error_message",
+    [
+        ('mutation { createHouse(title: "H", ownerId: 999) { id } }', "Owner not found"),
+        ('mutation { createGarage(title: "G", ownerId: 1, houseId: 999) { id } }', "House not found"),
+        ('mutation { createGarage(title: "G", ownerId: 999, houseId: 999) { id } }', "Owner not found"),
+        ('mutation { createCar(model: "C", ownerId: 1, garageId: 999) { id } }', "Garage not found"),
+        ('mutation { createDriverLicense(number: "X", userId: 999) { id } }', "User not found"),
+        ("mutation { assignGarageToHouse(garageId: 999, houseId: 999) { id } }", "Garage not found"),
+        ("mutation { assignGarageToHouse(garageId: 1, houseId: 999) { id } }", "House not found"),
+        ("mutation { transferCar(carId: 999, newOwnerId: 999) { id } }", "Car not found"),
+        ("mutation { transferCar(carId: 1, newOwnerId: 999) { id } }", "New owner not found"),
+        ("mutation { transferCar(carId: 1, newOwnerId: 1, newGarageId: 999) { id } }", "Garage not found"),
+    ],
+)
+def test_missing_references_keep_their_404_messages(db_session, execute_raw, mutation, error_message):
+    create_user_graph(db_session, users=1)
+
+    result = execute_raw(mutation)
+
+    assert result.errors[0].message == f"404: {error_message}"
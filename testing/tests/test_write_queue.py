@@ -0,0 +1,254 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session, create_engine
+
+from app import write_queue
+from app.db import close_session, init_db, make_engine, new_session
+from app.entity_cache import entity_cache, snapshot
+from app.main import build_context, schema
+from app.models import Car
+from app.write_queue import WriteQueue, queue_for
+from testing.generators.graph_generator import create_user_graph
+
+pytestmark = pytest.mark.write_queue
+
+
+@pytest.fixture
+def url(tmp_path):
+    """A file database: the writer needs a connection of its own."""
+    return f"sqlite:///{tmp_path / 'queue.db'}"
+
+
+@pytest.fixture
+def engine(url, monkeypatch):
+    """The application's engine (sync or async, as DATABASE_MODE says), with the write queue on."""
+    monkeypatch.setattr(write_queue, "WRITE_QUEUE_ENABLED", True)
+    engine = make_engine(url)
+    asyncio.run(init_db(engine))
+    yield engine
+    if isinstance(engine, AsyncEngine):
+        asyncio.run(engine.dispose())
+    else:
+        engine.dispose()
+
+
+@pytest.fixture
+def client_engine(engine):
+    return engine
+
+
+@pytest.fixture
+def plain(url, engine):
+    """A sync engine on the same file, to seed and check the database from the test."""
+    plain = create_engine(url)
+    yield plain
+    plain.dispose()
+
+
+@pytest.fixture
+def seeded(engine, plain):
+    with Session(plain) as session:
+        create_user_graph(session, users=2)
+    return engine
+
+
+@pytest.fixture
+def commits(engine):
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    counted = []
+    listener = lambda conn: counted.append(1)  # noqa: E731
+    event.listen(sync_engine, "commit", listener)
+    yield counted
+    event.remove(sync_engine, "commit", listener)
+
+
+async def execute_concurrently(engine, *operations, debug: bool = False):
+    """Run each operation as its own request: own session, own context, all at once."""
+
+    async def run(query):
+        session = new_session(engine)
+        try:
+            return await schema.execute(query, context_value=build_context(session, debug=debug))
+        finally:
+            await close_session(session)
+
+    try:
+        return await asyncio.gather(*(run(query) for query in operations))
+    finally:
+        await queue_for(engine).close()
+
+
+def scalar(plain, sql: str):
+    with plain.connect() as conn:
+        return conn.execute(text(sql)).scalar()
+
+
+def test_concurrent_mutations_share_one_commit(engine, plain, commits):
+    operations = [f'mutation {{ createUser(email: "q{i}@mail.com") {{ id email }} }}' for i in range(20)]
+
+    results = asyncio.run(execute_concurrently(engine, *operations))
+
+    assert [r.errors for r in results] == [None] * 20
+    assert [r.data["createUser"]["email"] for r in results] == [f"q{i}@mail.com" for i in range(20)]
+    assert len({r.data["createUser"]["id"] for r in results}) == 20
+    assert queue_for(engine).groups == 1
+    assert len(commits) == 1
+    assert scalar(plain, "SELECT count(*) FROM user") == 20
+
+
+def test_statements_are_charged_to_the_caller(engine):
+    async def run():
+        first = await execute_concurrently(engine, 'mutation { createUser(email: "t0@mail.com") { id } }', debug=True)
+        rest = await execute_concurrently(
+            engine, *(f'mutation {{ createUser(email: "t{i}@mail.com") {{ id }} }}' for i in (1, 2)), debug=True
+        )
+        return first + rest
+
+    results = asyncio.run(run())
+
+    # each caller's savepoint and INSERT; the group's BEGIN IMMEDIATE and COMMIT are nobody's
+    assert [r.extensions["tracing"]["sql"]["statements"] for r in results] == [3, 3, 3]
+
+
+def test_each_event_loop_gets_its_own_writer(engine):
+    """A second loop (TestClient runs the app on one beside the test's own) submitting mid-group."""
+    in_group, other_submitted = threading.Event(), threading.Event()
+
+    def select(session, value):
+        return session.execute(text("SELECT :value"), {"value": value}).scalar()
+
+    def wait_for_the_other_loop(session):
+        in_group.set()
+        other_submitted.wait(5)
+        return "a0"
+
+    async def other_loop():
+        in_group.wait(5)
+        queue = queue_for(engine)
+        first = asyncio.ensure_future(queue.submit(select, "b0"))
+        await asyncio.sleep(0)  # queued on this loop's writer
+        other_submitted.set()
+        return [await first] + [await queue.submit(select, f"b{i}") for i in range(1, 5)]
+
+    async def run():
+        # one job per group: "a1" waits in this loop's queue while the other loop submits
+        queue = write_queue._queues[engine] = WriteQueue(engine, batch_size=1)
+        other = asyncio.get_running_loop().run_in_executor(None, asyncio.run, other_loop())
+        try:
+            here = asyncio.gather(queue.submit(wait_for_the_other_loop), queue.submit(select, "a1"))
+            return await asyncio.wait_for(asyncio.gather(here, other), 10)
+        finally:
+            await queue.close()
+
+    here, there = asyncio.run(run())
+
+    assert here == ["a0", "a1"]
+    assert there == [f"b{i}" for i in range(5)]
+
+
+def test_failed_writes_are_isolated_per_caller(seeded, plain):
+    results = asyncio.run(
+        execute_concurrently(
+            seeded,
+            'mutation { createCar(model: "Good", ownerId: 1) { model } }',
+            'mutation { createCar(model: "Orphan", ownerId: 999) { model } }',
+            'mutation { createDriverLicense(number: "DUP", userId: 1) { number } }',
+            'mutation { createDriverLicense(number: "NONE", userId: 999) { number } }',
+            'mutation { transferCar(carId: 1, newOwnerId: 2) { owner { id } } }',
+        )
+    )
+
+    good, orphan, duplicate, missing_user, transfer = results
+    assert good.errors is None and good.data == {"createCar": {"model": "Good"}}
+    assert str(orphan.errors[0].message) == "404: Owner not found"
+    assert str(duplicate.errors[0].message) == "400: User already has driver licence"
+    assert str(missing_user.errors[0].message) == "404: User not found"
+    assert transfer.errors is None and transfer.data == {"transferCar": {"owner": {"id": 2}}}
+    assert queue_for(seeded).groups == 1
+    assert scalar(plain, "SELECT count(*) FROM car WHERE model IN ('Good', 'Orphan')") == 1
+    assert scalar(plain, "SELECT count(*) FROM driverlicence WHERE number IN ('DUP', 'NONE')") == 0
+    assert scalar(plain, "SELECT owner_id FROM car WHERE id = 1") == 2
+
+
+def test_failed_commit_fails_every_caller(engine, plain):
+    def insert(session, email):
+        session.execute(text("INSERT INTO user (email, is_active) VALUES (:email, 1)"), {"email": email})
+        return email
+
+    def poison(session):
+        session.info["fail_commit"] = True
+
+    def fail(session):
+        # the outer commit only: releasing a savepoint fires `before_commit` too
+        if session.info.get("fail_commit") and not session.in_nested_transaction():
+            raise RuntimeError("disk full")
+
+    async def run():
+        queue = queue_for(engine)
+        try:
+            return await asyncio.gather(
+                queue.submit(insert, "a@mail.com"), queue.submit(poison), return_exceptions=True
+            )
+        finally:
+            await queue.close()
+
+    event.listen(Session, "before_commit", fail)
+    try:
+        outcomes = asyncio.run(run())
+    finally:
+        event.remove(Session, "before_commit", fail)
+
+    assert [str(o) for o in outcomes] == ["disk full", "disk full"]
+    assert scalar(plain, "SELECT count(*) FROM user") == 0
+
+
+def test_entity_cache_is_invalidated_after_the_group_commits(seeded, plain):
+    with Session(plain) as session:
+        car = session.get(Car, 1)
+        entity_cache.fill(Car, [snapshot(Car, car)], entity_cache.invalidations)
+    assert ("car", 1) in entity_cache
+
+    (result,) = asyncio.run(
+        execute_concurrently(seeded, "mutation { transferCar(carId: 1, newOwnerId: 2) { owner { id } } }")
+    )
+
+    assert result.data == {"transferCar": {"owner": {"id": 2}}}
+    assert ("car", 1) not in entity_cache
+
+
+def test_nested_fields_read_the_committed_write(seeded):
+    (result,) = asyncio.run(
+        execute_concurrently(
+            seeded, 'mutation { createHouse(title: "New", ownerId: 1) { id owner { houses { title } } } }'
+        )
+    )
+
+    assert result.errors is None
+    assert {"title": "New"} in result.data["createHouse"]["owner"]["houses"]
+
+
+def test_mutations_over_http(client):
+    first = client.post("/graphql", json={"query": 'mutation { createUser(email: "h1@mail.com") { id } }'})
+    second = client.post("/graphql", json={"query": 'mutation { createUser(email: "h2@mail.com") { id } }'})
+
+    assert first.json()["data"]["createUser"]["id"] == 1
+    assert second.json()["data"]["createUser"]["id"] == 2
+
+
+def test_batch_size_must_be_positive(engine):
+    with pytest.raises(ValueError):
+        WriteQueue(engine, batch_size=0)
+
+
+def test_batch_size_splits_groups(engine):
+    queue = write_queue._queues[engine] = WriteQueue(engine, batch_size=4)
+    operations = [f'mutation {{ createUser(email: "s{i}@mail.com") {{ id }} }}' for i in range(10)]
+
+    results = asyncio.run(execute_concurrently(engine, *operations))
+
+    assert all(r.errors is None for r in results)
+    assert queue.groups == 3